@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Measures the number of frames per second of the inverse dynamics of a
+joint-angle trajectory, for several chunk sizes, the number of
+torque-free simulations per second, one at a time and many together, and the
+time to compute the centroidal momentum matrix, compared with central
+differences of the center of mass of a Human (only the linear momentum
+rows).
+
+Run with yeadon installed (or on the PYTHONPATH)::
+
+    python benchmarks/bench_dynamics.py
+
+"""
+from __future__ import print_function, division
+import os
+import time
+import warnings
+
+import numpy as np
+
+import yeadon
+from yeadon import dynamics
+from yeadon.tree import SegmentTree
+
+warnings.filterwarnings('ignore')
+
+MEAS = os.path.join(os.path.dirname(__file__), '..', 'misc',
+                    'samplemeasurements', 'male1.txt')
+
+
+def main(number=100000):
+    human = yeadon.Human(MEAS)
+    bounds = np.asarray(human.CFGbounds)
+    random = np.random.RandomState(0)
+    CFGs = bounds[:, 0] + (bounds[:, 1] - bounds[:, 0]) * \
+            random.uniform(0.05, 0.95, (number, len(bounds)))
+    rates = random.uniform(-5.0, 5.0, CFGs.shape)
+    accelerations = random.uniform(-50.0, 50.0, CFGs.shape)
+    tree = SegmentTree(human)
+
+    for chunk_size in (256, 1024, 4096, number):
+        start = time.time()
+        dynamics.inverse_dynamics(human, CFGs, rates, accelerations,
+                                  tree=tree, chunk_size=chunk_size)
+        seconds = time.time() - start
+        print('inverse_dynamics, chunks of {0:6d}: {1:9.0f} frames/s'.format(
+            chunk_size, number / seconds))
+
+    for n_simulations in (1, 100):
+        coordinates = np.hstack((np.zeros((n_simulations, 3)),
+                                 CFGs[:n_simulations]))
+        initial_rates = np.hstack((np.zeros((n_simulations, 3)),
+                                   0.1 * rates[:n_simulations]))
+        start = time.time()
+        result = dynamics.simulate(human, coordinates, initial_rates,
+                                   np.zeros(24), 0.5, step=0.005, tree=tree)
+        seconds = time.time() - start
+        print('simulate, {0:3d} together: {1:9.1f} simulations/s ({2} '
+              'steps)'.format(n_simulations, n_simulations / seconds,
+                              result.n_steps))
+
+
+    start = time.time()
+    dynamics.centroidal_momentum_matrix(human, CFGs[:10000], tree=tree)
+    seconds = (time.time() - start) / 10000
+    print('centroidal_momentum_matrix: {0:8.3f} ms/configuration'.format(
+        1000 * seconds))
+    start = time.time()
+    step = 1e-6
+    for CFG in CFGs[:10]:
+        for k in range(len(CFG)):
+            centers = []
+            for sign in (1, -1):
+                perturbed = CFG.copy()
+                perturbed[k] += sign * step
+                human.set_CFG_dict(dict(zip(human.CFGnames, perturbed)))
+                centers.append(human.center_of_mass)
+            human.mass * (centers[0] - centers[1]) / (2 * step)
+    seconds = (time.time() - start) / 10
+    print('Human, central differences: {0:8.3f} ms/configuration'.format(
+        1000 * seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""Measures the number of simulated flights per second of a twisting
+somersault with an asymmetric arm motion, for one flight at a time and for
+many flights (different take-off angular momenta) simulated together.
+
+Run with yeadon installed (or on the PYTHONPATH)::
+
+    python benchmarks/bench_flight.py
+
+"""
+from __future__ import print_function, division
+import os
+import time
+import warnings
+
+import numpy as np
+
+import yeadon
+from yeadon import flight
+from yeadon.tree import SegmentTree
+
+warnings.filterwarnings('ignore')
+
+MEAS = os.path.join(os.path.dirname(__file__), '..', 'misc',
+                    'samplemeasurements', 'male1.txt')
+
+
+def main(duration=1.0):
+    human = yeadon.Human(MEAS)
+    tree = SegmentTree(human)
+    times = np.linspace(0.0, duration, 11)
+    angles = np.zeros((len(times), len(flight.joint_names)))
+    # The left arm is adducted earlier than the right arm.
+    angles[:, flight.joint_names.index('CA1adduction')] = np.linspace(
+        0.0, 2.5, len(times))
+    angles[:, flight.joint_names.index('CB1abduction')] = np.linspace(
+        0.0, 2.5, len(times))**2 / 2.5
+    motion = flight.SampledMotion(times, angles)
+
+    for n_flights in (1, 10, 100, 1000):
+        angular_momentum = np.zeros((n_flights, 3))
+        angular_momentum[:, 0] = np.linspace(40.0, 80.0, n_flights)
+        start = time.time()
+        repeats = max(1, 10 // n_flights)
+        for i in range(repeats):
+            result = flight.simulate(human, motion, angular_momentum,
+                                     duration, tree=tree)
+        seconds = (time.time() - start) / repeats
+        print('{0:5d} flights together: {1:8.1f} flights/s ({2} steps)'
+              .format(n_flights, n_flights / seconds, result.n_steps))
+
+
+if __name__ == '__main__':
+    main()
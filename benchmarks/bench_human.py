@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""Measures the time and memory it takes to construct a Human, to update it,
+and to change one measurement.
+
+Run with yeadon installed (or on the PYTHONPATH)::
+
+    python benchmarks/bench_human.py
+
+"""
+from __future__ import print_function, division
+import os
+import timeit
+import tracemalloc
+import warnings
+
+import yeadon
+
+warnings.filterwarnings('ignore')
+
+MEAS = os.path.join(os.path.dirname(__file__), '..', 'misc',
+                    'samplemeasurements', 'male1.txt')
+
+
+def main(number=50):
+    human = yeadon.Human(MEAS)
+    meas = dict(human.meas)
+
+    seconds = min(timeit.repeat(lambda: yeadon.Human(dict(meas)), number=number,
+                                repeat=3)) / number
+    print('Human construction:   {0:8.3f} ms'.format(1000 * seconds))
+
+    seconds = min(timeit.repeat(human.update, number=number,
+                                repeat=3)) / number
+    print('Human.update():       {0:8.3f} ms'.format(1000 * seconds))
+
+    for name in ('Lj3p', 'Lj3L'):
+        value = human.meas[name]
+        seconds = min(timeit.repeat(
+            lambda: human.set_measurement(name, value), number=number,
+            repeat=3)) / number
+        print('set_measurement({0!r}): {1:6.3f} ms'.format(name,
+                                                           1000 * seconds))
+
+    tracemalloc.start()
+    humans = [yeadon.Human(dict(meas)) for i in range(number)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('Memory per Human:     {0:8.1f} kB'.format(size / number / 1024))
+
+
+if __name__ == '__main__':
+    main()
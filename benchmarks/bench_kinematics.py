@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""Measures the time it takes to compute the joint centers and the end
+points of all solids for many configurations, with the batched kinematics of
+SegmentTree and by updating a Human per configuration.
+
+Run with yeadon installed (or on the PYTHONPATH)::
+
+    python benchmarks/bench_kinematics.py
+
+"""
+from __future__ import print_function, division
+import os
+import time
+import warnings
+
+import numpy as np
+
+import yeadon
+from yeadon.tree import SegmentTree
+
+warnings.filterwarnings('ignore')
+
+MEAS = os.path.join(os.path.dirname(__file__), '..', 'misc',
+                    'samplemeasurements', 'male1.txt')
+
+
+def main(number=1000):
+    human = yeadon.Human(MEAS)
+    bounds = np.asarray(human.CFGbounds)
+    CFGs = bounds[:, 0] + (bounds[:, 1] - bounds[:, 0]) * \
+            np.random.RandomState(0).uniform(0.05, 0.95,
+                                             (number, len(bounds)))
+
+    start = time.time()
+    for CFG in CFGs[:number // 10]:
+        human.set_CFG_dict(dict(zip(human.CFGnames, CFG)))
+        [segment.pos for segment in human.segments]
+        [solid.end_pos for segment in human.segments
+         for solid in segment.solids]
+    seconds = (time.time() - start) / (number // 10)
+    print('Human.set_CFG_dict:   {0:8.3f} ms/configuration'.format(
+        1000 * seconds))
+
+    start = time.time()
+    tree = SegmentTree(human)
+    rot_mats, positions = tree.forward_kinematics(CFGs)
+    tree.solid_points(CFGs, rot_mats, positions)
+    seconds = (time.time() - start) / number
+    print('SegmentTree:          {0:8.3f} ms/configuration'.format(
+        1000 * seconds))
+
+
+if __name__ == '__main__':
+    main()
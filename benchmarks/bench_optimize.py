@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""Measures the time to optimize the arm and hip technique of a twisting
+somersault for the twist at landing, for one start and for many starts in a
+pool of processes.
+
+Run with yeadon installed (or on the PYTHONPATH)::
+
+    python benchmarks/bench_optimize.py
+
+"""
+from __future__ import print_function, division
+import os
+import time
+import warnings
+
+import yeadon
+from yeadon import optimize
+
+warnings.filterwarnings('ignore')
+
+MEAS = os.path.join(os.path.dirname(__file__), '..', 'misc',
+                    'samplemeasurements', 'male1.txt')
+
+
+def main(duration=1.0, max_iterations=10):
+    human = yeadon.Human(MEAS)
+    problem = optimize.TechniqueProblem(human, duration, [60.0, 0.0, 0.0])
+
+    start = time.time()
+    value, gradient = problem.gradient(problem.x0)
+    seconds = time.time() - start
+    print('gradient of {0} parameters: {1:.3f} s ({2:.1f} flights/s)'.format(
+        problem.n_parameters, seconds,
+        (2 * problem.n_parameters + 1) / seconds))
+
+    result = optimize.optimize(problem, max_iterations=max_iterations)
+    print('one start: {0!r}'.format(result))
+
+    for processes in (1, None):
+        start = time.time()
+        results = optimize.multi_start(problem, n_starts=8,
+                                       processes=processes, seed=0,
+                                       max_iterations=max_iterations)
+        print('8 starts, {0} processes: {1:.2f} s, best objective '
+              '{2:.4g}'.format(processes or 'all', time.time() - start,
+                               results[0].objective))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""Measures the throughput of the headless matplotlib renderer, in one
+process and in a pool of processes.
+
+Run with yeadon and matplotlib installed (or on the PYTHONPATH)::
+
+    python benchmarks/bench_render.py
+
+"""
+from __future__ import print_function, division
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+import yeadon
+from yeadon import render
+
+warnings.filterwarnings('ignore')
+
+MEAS = os.path.join(os.path.dirname(__file__), '..', 'misc',
+                    'samplemeasurements', 'male1.txt')
+
+
+def main(number=32, mesh_level='low'):
+    human = yeadon.Human(MEAS)
+    bounds = np.asarray(human.CFGbounds)
+    CFGs = bounds[:, 0] + (bounds[:, 1] - bounds[:, 0]) * \
+            np.random.RandomState(0).uniform(0.05, 0.95,
+                                             (number, len(bounds)))
+    tmpdir = tempfile.mkdtemp()
+    try:
+        pattern = os.path.join(tmpdir, 'posture{0:04d}.png')
+        for processes in sorted(set([1, multiprocessing.cpu_count()])):
+            start = time.time()
+            render.render_configurations(human, CFGs, pattern,
+                                         processes=processes,
+                                         mesh_level=mesh_level)
+            seconds = time.time() - start
+            print('{0:2d} process(es):        {1:8.1f} figures/s'.format(
+                processes, number / seconds))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,9 @@ setup(
     install_requires=['numpy>=1.6.1',
                       'pyyaml>=3.10'],
     extras_require={'gui': ['mayavi>=4.0'],
+                    'hdf5': ['h5py'],
+                    'zarr': ['zarr'],
+                    'render': ['matplotlib'],
                     'doc': ['sphinx', 'numpydoc']},
     tests_require=['nose'],
     test_suite='nose.collector',
@@ -0,0 +1,199 @@
+"""The animation module precomputes ("bakes") everything that is needed to
+animate a human along a trajectory of joint angles: the vertices of all
+solids, the center of mass, and the inertia ellipsoid, for every frame. All
+frames are computed at once with batched rotations (see
+:py:class:`yeadon.tree.SegmentTree`), instead of updating the Human object
+frame by frame, so that a player only has to stream the arrays at display
+rate.
+
+The frames can be played with MayaVi (:py:func:`play_mayavi`), or passed to
+any other renderer: the surface is one triangle mesh whose faces are shared
+by all frames.
+
+"""
+# Use Python3 integer division rules.
+from __future__ import division
+
+import numpy as np
+try:
+    from mayavi import mlab
+except ImportError:
+    pass
+
+from . import mesh
+from .human import Human
+from .tree import SegmentTree
+
+
+class AnimationFrames(object):
+    """The baked frames of a trajectory. Create them with
+    :py:func:`bake_frames`.
+
+    Attributes
+    ----------
+    CFGs : np.ndarray, shape(T, 21)
+        Joint angles of each frame, in the order of Human.CFGnames.
+    vertices : np.ndarray, shape(T, V, 3)
+        Vertices of the surface of the human in each frame, in the global
+        frame.
+    faces : np.ndarray of int, shape(F, 3)
+        Indices of the vertices of each triangle, the same in all frames.
+    face_segments : np.ndarray of int, shape(F,)
+        Index (into Human.segments) of the segment of each triangle.
+    colors : list of tuple
+        Color of each segment, as used by Human.draw.
+    mass : float
+        Mass of the human.
+    center_of_mass : np.ndarray, shape(T, 3)
+        Center of mass of the human in each frame.
+    inertia : np.ndarray, shape(T, 3, 3)
+        Inertia tensor of the human about its center of mass in each frame.
+    ellipsoid_axes : np.ndarray, shape(T, 3)
+        Semi-axes of the inertia ellipsoid in each frame, 1 / sqrt(I_i) for
+        the principal moments of inertia I_i, in increasing order of the
+        moments.
+    ellipsoid_orientations : np.ndarray, shape(T, 3, 3)
+        Orientation of the inertia ellipsoid in each frame: the columns are
+        the principal axes.
+
+    """
+
+    def __init__(self, CFGs, vertices, faces, face_segments, colors, mass,
+                 center_of_mass, inertia):
+        self.CFGs = CFGs
+        self.vertices = vertices
+        self.faces = faces
+        self.face_segments = face_segments
+        self.colors = colors
+        self.mass = mass
+        self.center_of_mass = center_of_mass
+        self.inertia = inertia
+        moments, self.ellipsoid_orientations = np.linalg.eigh(inertia)
+        self.ellipsoid_axes = 1.0 / np.sqrt(moments)
+
+    def __len__(self):
+        return len(self.vertices)
+
+    def ellipsoid_points(self, mesh_level='medium'):
+        """Returns the x, y, and z coordinates of a mesh of the inertia
+        ellipsoid in each frame, in the layout of
+        Human._make_inertia_ellipsoid_pos.
+
+        Parameters
+        ----------
+        mesh_level : str, optional
+            Level of detail, one of yeadon.solid.mesh_levels.
+
+        Returns
+        -------
+        points : np.ndarray, shape(T, 3, N, N)
+
+        """
+        sphere = Human._unit_sphere_mesh(mesh_level)
+        scaled = (self.ellipsoid_orientations *
+                  self.ellipsoid_axes[:, np.newaxis, :])
+        points = np.einsum('tij,jk->tik', scaled, sphere.reshape((3, -1)))
+        points += self.center_of_mass[:, :, np.newaxis]
+        return points.reshape((len(self), 3) + sphere.shape[1:])
+
+
+def bake_frames(human, CFGs, mesh_level=None):
+    """Computes the frames of an animation of a human along a trajectory of
+    joint angles. The human itself is not modified.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    CFGs : dict, sequence of dict, or array_like, shape(T, 21)
+        Configuration of each frame, see
+        :py:meth:`yeadon.Human.CFG_to_array`.
+    mesh_level : str, optional
+        Level of detail of the surface. By default, the human's
+        `mesh_level`.
+
+    Returns
+    -------
+    frames : :py:class:`AnimationFrames`
+
+    """
+    CFGs = human.CFG_to_array(CFGs)
+    tree = SegmentTree(human)
+    rot_mats, positions = tree.forward_kinematics(CFGs)
+    vertices, faces = mesh.segment_template(human, mesh_level, tree)
+    segment_vertices = np.repeat(np.arange(len(vertices)),
+                                 [len(v) for v in vertices])
+    center_of_mass, inertia = tree.mass_properties(CFGs, rot_mats, positions)
+    return AnimationFrames(CFGs,
+                           mesh.pose_vertices(vertices, rot_mats, positions),
+                           faces, segment_vertices[faces[:, 0]],
+                           [segment.color for segment in human.segments],
+                           tree.mass, center_of_mass, inertia)
+
+
+def play_mayavi(frames, mlabobj=None, delay=40, gui=False,
+                show_mass_center=True, show_inertia_ellipsoid=False):
+    """Plays baked frames in MayaVi. Only the vertices of the existing
+    meshes are updated from frame to frame. The animation loops until the
+    window is closed.
+
+    Parameters
+    ----------
+    frames : :py:class:`AnimationFrames`
+    mlabobj : mayavi.mlab, optional
+        A mayavi mlab object. If None, mayavi.mlab is used.
+    delay : int, optional
+        Time between frames, in milliseconds.
+    gui : bool, optional
+        If False, mlab.show() is called and the scene is displayed.
+    show_mass_center : bool, optional
+        Draws a sphere at the center of mass.
+    show_inertia_ellipsoid : bool, optional
+        Draws the inertia ellipsoid, centered at the center of mass.
+
+    Returns
+    -------
+    animator : mayavi.tools.animator.Animator
+        Controls the animation.
+
+    """
+    if mlabobj is None:
+        try:
+            mlabobj = mlab
+        except NameError:
+            raise ImportError('MayaVi is not installed, this function is '
+                              'not available.')
+
+    x, y, z = frames.vertices[0].T
+    meshes = [mlabobj.triangular_mesh(x, y, z,
+                                      frames.faces[frames.face_segments == i],
+                                      color=color, opacity=0.5)
+              for i, color in enumerate(frames.colors)]
+    if show_mass_center:
+        # 75 kg person has a 0.1 m diameter sphere, as in Human.
+        sphere = mlabobj.points3d(*frames.center_of_mass[0],
+                                  scale_factor=frames.mass / 75.0 * 0.1)
+    if show_inertia_ellipsoid:
+        ellipsoid_points = frames.ellipsoid_points()
+        ellipsoid = mlabobj.mesh(*ellipsoid_points[0], color=(1, 1, 1),
+                                 opacity=0.2)
+
+    @mlabobj.animate(delay=delay)
+    def animate():
+        while True:
+            for t in range(len(frames)):
+                x, y, z = frames.vertices[t].T
+                for segment_mesh in meshes:
+                    segment_mesh.mlab_source.set(x=x, y=y, z=z)
+                if show_mass_center:
+                    sphere.mlab_source.set(x=frames.center_of_mass[t, 0],
+                                           y=frames.center_of_mass[t, 1],
+                                           z=frames.center_of_mass[t, 2])
+                if show_inertia_ellipsoid:
+                    ex, ey, ez = ellipsoid_points[t]
+                    ellipsoid.mlab_source.set(x=ex, y=ey, z=ez)
+                yield
+
+    animator = animate()
+    if gui == False:
+        mlabobj.show()
+    return animator
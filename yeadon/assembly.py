@@ -0,0 +1,376 @@
+"""The assembly module combines humans with rigid bodies (e.g. a bicycle, a
+pole, or a partner) into one system whose inertia properties are those of
+all components together, as in the bicycle-rider example.
+
+Each component has its own frame: the global frame of a
+:py:class:`yeadon.Human` (see :py:meth:`yeadon.Human.translate_coord_sys`),
+or the frame in which the center of mass and the inertia tensor of a
+:py:class:`RigidBody` are given. A pose places that frame in the frame of the
+assembly with a position and an orientation, such that a vector v_c in the
+component's frame is R * v_c in the assembly's frame.
+
+The mass, first moment of mass, and inertia tensor about the origin of the
+assembly of every component are cached. Moving a component, or changing the
+configuration of a human, only recomputes the contribution of that
+component; the properties of the assembly are then sums of the cached
+contributions.
+
+"""
+# Use Python3 integer division rules.
+from __future__ import division
+from collections import OrderedDict
+
+import numpy as np
+
+from . import inertia
+from .human import Human
+from .tree import SegmentTree
+
+
+class RigidBody(object):
+    """A rigid body, given by its mass, center of mass, and inertia tensor in
+    its own frame.
+
+    Attributes
+    ----------
+    mass : float
+        Mass of the body (kg).
+    center_of_mass : np.ndarray, shape(3,)
+        Center of mass of the body, from the origin of its frame (m).
+    inertia : np.ndarray, shape(3, 3)
+        Inertia tensor of the body about its center of mass, in its frame
+        (kg-m^2).
+
+    """
+
+    def __init__(self, mass, center_of_mass=(0.0, 0.0, 0.0), inertia=None):
+        if mass <= 0.0:
+            raise ValueError("The mass of a rigid body must be positive, not "
+                             "{0}.".format(mass))
+        self.mass = float(mass)
+        self.center_of_mass = np.ravel(np.asarray(center_of_mass,
+                                                  dtype=float))
+        if inertia is None:
+            inertia = np.zeros((3, 3))
+        self.inertia = np.asarray(inertia, dtype=float).reshape((3, 3))
+
+    def __repr__(self):
+        return 'RigidBody(mass={0}, center_of_mass={1})'.format(
+            self.mass, self.center_of_mass.tolist())
+
+
+def _rotation_matrices(orientation):
+    """Returns rotation matrices, shape(..., 3, 3), from rotation matrices
+    or from Euler 1-2-3 angles, shape(..., 3). An array of shape(3, 3) is a
+    rotation matrix."""
+    orientation = np.asarray(orientation, dtype=float)
+    if orientation.shape[-2:] == (3, 3):
+        return orientation
+    if orientation.shape[-1:] != (3,):
+        raise ValueError("An orientation must be a rotation matrix or three "
+                         "Euler 1-2-3 angles, not an array of shape "
+                         "{0}.".format(orientation.shape))
+    return inertia.euler_123_batch(orientation)
+
+
+def _point_mass_inertia(masses, points):
+    """Returns the inertia tensors, shape(..., 3, 3), of point masses about
+    the origin, m (|r|^2 I - r r^T)."""
+    return np.asarray(masses)[..., np.newaxis, np.newaxis] * (
+        np.einsum('...i,...i->...', points, points)
+        [..., np.newaxis, np.newaxis] * np.eye(3) -
+        points[..., np.newaxis] * points[..., np.newaxis, :])
+
+
+def _contribution(mass, center_of_mass, inertia_tensor, position,
+                  rotation):
+    """Returns the first moment of mass, shape(..., 3), and the inertia
+    tensor about the origin of the assembly, shape(..., 3, 3), of a body
+    with the given center of mass and inertia in its own frame, placed with
+    a position and rotation matrix. The inputs broadcast against each
+    other."""
+    center = position + np.matmul(rotation,
+                                  center_of_mass[..., np.newaxis])[..., 0]
+    # The inertia is expressed in the frame of the assembly, R * I * R^T
+    # (see yeadon.inertia.rotate_inertia with the inverse rotation).
+    rotated = inertia.rotate_inertia_batch(np.swapaxes(rotation, -1, -2),
+                                           inertia_tensor)
+    return mass * center, rotated + _point_mass_inertia(mass, center)
+
+
+class Assembly(object):
+    """Humans and rigid bodies placed relative to each other, whose combined
+    inertia properties are evaluated from cached contributions of each
+    component, in the current poses and configurations or for many poses
+    and configurations at once.
+
+    The properties of a human are read from the human in its current
+    configuration (Human.mass, Human.center_of_mass, and Human.inertia), so
+    a human that is changed, e.g. with :py:meth:`yeadon.Human.set_CFG`, is
+    noticed by the assembly.
+
+    Attributes
+    ----------
+    components : OrderedDict
+        The humans and rigid bodies, by name.
+
+    """
+
+    def __init__(self):
+        self.components = OrderedDict()
+        self._poses = dict()
+        self._cache = dict()
+        self._trees = dict()
+        self._total = None
+
+    def __len__(self):
+        return len(self.components)
+
+    def __contains__(self, name):
+        return name in self.components
+
+    def add_human(self, name, human, position=(0.0, 0.0, 0.0),
+                  orientation=np.eye(3)):
+        """Adds a human to the assembly.
+
+        Parameters
+        ----------
+        name : str
+            Name of the component, unique in the assembly.
+        human : :py:class:`yeadon.Human`
+        position : array_like, shape(3,), optional
+            Position of the origin of the human's global frame in the frame
+            of the assembly (m).
+        orientation : array_like, shape(3, 3) or shape(3,), optional
+            Rotation matrix of the human's global frame relative to the frame
+            of the assembly, or its body-fixed 1-2-3 Euler angles (see
+            :py:func:`yeadon.inertia.euler_123`).
+
+        """
+        if not isinstance(human, Human):
+            raise ValueError("'{0}' is not a Human.".format(name))
+        self._add(name, human, position, orientation)
+
+    def add_body(self, name, body, position=(0.0, 0.0, 0.0),
+                 orientation=np.eye(3)):
+        """Adds a rigid body to the assembly.
+
+        Parameters
+        ----------
+        name : str
+            Name of the component, unique in the assembly.
+        body : :py:class:`RigidBody` or tuple
+            The body, or the arguments of :py:class:`RigidBody` (mass,
+            center of mass, inertia tensor).
+        position, orientation : array_like, optional
+            Pose of the frame of the body, see :py:meth:`add_human`.
+
+        """
+        if not isinstance(body, RigidBody):
+            body = RigidBody(*body)
+        self._add(name, body, position, orientation)
+
+    def _add(self, name, component, position, orientation):
+        if name in self.components:
+            raise ValueError("The assembly already has a component named "
+                             "'{0}'.".format(name))
+        self.components[name] = component
+        self.set_pose(name, position, orientation)
+
+    def remove(self, name):
+        """Removes a component from the assembly."""
+        self._check_name(name)
+        del self.components[name]
+        del self._poses[name]
+        self._cache.pop(name, None)
+        self._trees.pop(name, None)
+        self._total = None
+
+    def _check_name(self, name):
+        if name not in self.components:
+            raise ValueError("The assembly has no component named "
+                             "'{0}'.".format(name))
+
+    def pose(self, name):
+        """Returns the position, shape(3,), and the rotation matrix,
+        shape(3, 3), of a component."""
+        self._check_name(name)
+        return self._poses[name]
+
+    def set_pose(self, name, position=None, orientation=None):
+        """Moves a component. Only the contribution of this component is
+        recomputed.
+
+        Parameters
+        ----------
+        name : str
+        position, orientation : array_like, optional
+            See :py:meth:`add_human`. By default, they are unchanged.
+
+        """
+        self._check_name(name)
+        old_position, old_rotation = self._poses.get(name, (None, None))
+        if position is not None:
+            position = np.ravel(np.asarray(position, dtype=float))
+            if position.shape != (3,):
+                raise ValueError("A position must have 3 components, not "
+                                 "{0}.".format(len(position)))
+        if orientation is not None:
+            orientation = _rotation_matrices(orientation)
+            if orientation.shape != (3, 3):
+                raise ValueError("The orientation of a component must be a "
+                                 "rotation matrix or three angles.")
+        self._poses[name] = (old_position if position is None else position,
+                             old_rotation if orientation is None else
+                             orientation)
+        self._cache.pop(name, None)
+        self._total = None
+
+    def invalidate(self, name=None):
+        """Discards the cached contribution of a component, or of all
+        components. The contributions of humans are checked for changes
+        automatically, but :py:meth:`evaluate_batch` keeps a
+        :py:class:`yeadon.tree.SegmentTree` of each human, which must be
+        discarded with this method if its measurements or densities
+        change."""
+        names = list(self.components) if name is None else [name]
+        for name in names:
+            self._check_name(name)
+            self._cache.pop(name, None)
+            self._trees.pop(name, None)
+        self._total = None
+
+    def _properties(self, name):
+        """Returns the mass, center of mass, and inertia of a component in
+        its own frame."""
+        component = self.components[name]
+        if isinstance(component, Human):
+            return (component.mass, np.ravel(component.center_of_mass),
+                    np.asarray(component.inertia))
+        return component.mass, component.center_of_mass, component.inertia
+
+    def contribution(self, name):
+        """Returns the mass, the first moment of mass, shape(3,), and the
+        inertia tensor about the origin of the assembly, shape(3, 3), of a
+        component, in the frame of the assembly. The result is cached."""
+        self._check_name(name)
+        mass, center_of_mass, inertia_tensor = self._properties(name)
+        # A human may have been changed since its contribution was cached.
+        key = (mass, center_of_mass.tobytes(), inertia_tensor.tobytes())
+        cached = self._cache.get(name)
+        if cached is None or cached[0] != key:
+            position, rotation = self._poses[name]
+            moment, about_origin = _contribution(mass, center_of_mass,
+                                                 inertia_tensor, position,
+                                                 rotation)
+            cached = (key, mass, moment, about_origin)
+            self._cache[name] = cached
+            self._total = None
+        return cached[1:]
+
+    def _totals(self):
+        """Returns the sums of the contributions of all components."""
+        contributions = [self.contribution(name) for name in self.components]
+        if self._total is None:
+            if not contributions:
+                raise ValueError("The assembly has no components.")
+            self._total = tuple(sum(values) for values in
+                                zip(*contributions))
+        return self._total
+
+    @property
+    def mass(self):
+        """Mass of the assembly (kg)."""
+        return self._totals()[0]
+
+    @property
+    def center_of_mass(self):
+        """Center of mass of the assembly, np.ndarray shape(3,), in the frame
+        of the assembly (m)."""
+        mass, moment, about_origin = self._totals()
+        return moment / mass
+
+    @property
+    def inertia(self):
+        """Inertia tensor of the assembly about its center of mass, in the
+        frame of the assembly, np.ndarray shape(3, 3) (kg-m^2)."""
+        mass, moment, about_origin = self._totals()
+        return about_origin - _point_mass_inertia(mass, moment / mass)
+
+    def component_properties(self, name):
+        """Returns the mass, center of mass, shape(3,), and inertia tensor
+        about its center of mass, shape(3, 3), of a component, in the frame
+        of the assembly."""
+        mass, moment, about_origin = self.contribution(name)
+        return (mass, moment / mass,
+                about_origin - _point_mass_inertia(mass, moment / mass))
+
+    def evaluate_batch(self, poses=None, CFGs=None):
+        """Returns the inertia properties of the assembly for many poses of
+        some components and many configurations of some humans. The other
+        components keep their current poses and configurations, and their
+        cached contributions are used. The components and humans are not
+        modified.
+
+        Parameters
+        ----------
+        poses : dict, optional
+            For some components, their poses as a tuple (positions,
+            orientations): positions of shape(N, 3) or shape(3,), and
+            rotation matrices of shape(N, 3, 3) or shape(3, 3), or Euler
+            angles of shape(N, 3). Either may be None for the current one.
+        CFGs : dict, optional
+            For some humans, their configurations, shape(N, 21), see
+            :py:meth:`yeadon.Human.CFG_to_array`.
+
+        Returns
+        -------
+        mass : float
+        centers_of_mass : np.ndarray, shape(N, 3)
+            Center of mass of the assembly in each sample, in its frame.
+        inertias : np.ndarray, shape(N, 3, 3)
+            Inertia tensor of the assembly about its center of mass, in its
+            frame.
+
+        """
+        poses = dict() if poses is None else poses
+        CFGs = dict() if CFGs is None else CFGs
+        for name in list(poses) + list(CFGs):
+            self._check_name(name)
+        for name in CFGs:
+            if not isinstance(self.components[name], Human):
+                raise ValueError("'{0}' is not a Human.".format(name))
+        moment = np.zeros(3)
+        about_origin = np.zeros((3, 3))
+        mass = 0.0
+        for name in self.components:
+            if name not in poses and name not in CFGs:
+                component_mass, component_moment, component_inertia = \
+                        self.contribution(name)
+            else:
+                position, rotation = self._poses[name]
+                if name in poses:
+                    new_position, new_orientation = poses[name]
+                    if new_position is not None:
+                        position = np.asarray(new_position, dtype=float)
+                    if new_orientation is not None:
+                        rotation = _rotation_matrices(new_orientation)
+                component_mass, center_of_mass, inertia_tensor = \
+                        self._properties(name)
+                if name in CFGs:
+                    if name not in self._trees:
+                        self._trees[name] = SegmentTree(self.components[name])
+                    center_of_mass, inertia_tensor = \
+                            self._trees[name].mass_properties(
+                                Human.CFG_to_array(CFGs[name]))
+                component_moment, component_inertia = _contribution(
+                        component_mass, center_of_mass, inertia_tensor,
+                        position, rotation)
+            mass += component_mass
+            moment = moment + component_moment
+            about_origin = about_origin + component_inertia
+        moment = np.atleast_2d(moment)
+        about_origin = about_origin.reshape((-1, 3, 3))
+        centers_of_mass = moment / mass
+        return (mass, centers_of_mass,
+                about_origin - _point_mass_inertia(mass, centers_of_mass))
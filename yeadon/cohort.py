@@ -0,0 +1,528 @@
+"""The cohort module stores the measurements of many humans in a columnar
+layout. A cohort is a directory of NumPy ``.npy`` files, so that it can be
+memory-mapped and streamed through without reading every subject into memory.
+The layout of a cohort directory is:
+
+``meas.npy``
+    float64 array, shape(S, 95). One row per subject, with the columns in
+    the order of :py:attr:`yeadon.Human.measnames`. Values are in the units
+    of the measurement input files that the cohort was created from.
+``measnames.npy``
+    str array, shape(95,). The column names, used to check the column order
+    when loading.
+``subject_ids.npy``
+    str array, shape(S,). An identifier for each subject.
+``measurementconversionfactor.npy``
+    float64 array, shape(S,). Converts each row of ``meas.npy`` into meters.
+``totalmass.npy``
+    float64 array, shape(S,). The measured mass of each subject in kg, or -1
+    if it was not measured (as in the measurement input files).
+``metadata.yaml``
+    ``float_totalmass``: the indices of the subjects whose mass is a whole
+    number but was written with a decimal point in the measurement input
+    file (e.g. 80.0), so that it is written back the same way. Whole-number
+    masses of other subjects are written as integers.
+
+"""
+# Use Python3 integer division rules.
+from __future__ import division
+import glob
+import io
+import os
+
+import numpy as np
+import yaml
+
+from .human import Human
+from .validation import validate_measurements, ValidationReport
+
+
+def average_limbs(meas):
+    """Returns measurements in which the left and right limbs are averaged,
+    as :py:class:`yeadon.Human` does when `symmetric` is True.
+
+    Parameters
+    ----------
+    meas : array_like, shape(S, 95)
+        Measurements, with columns in the order of
+        :py:attr:`yeadon.Human.measnames`.
+
+    Returns
+    -------
+    averaged : np.ndarray, shape(S, 95)
+
+    """
+    averaged = np.array(meas, dtype=float)
+    avg = 0.5 * (averaged[:, Human._left_limb_indices] +
+                 averaged[:, Human._right_limb_indices])
+    averaged[:, Human._left_limb_indices] = avg
+    averaged[:, Human._right_limb_indices] = avg
+    return averaged
+
+
+def _mass_is_int(masses, float_masses=(), start=0):
+    """Returns whether each of the masses is written as an integer: whole
+    numbers are, unless the index (offset by `start`) of the subject is in
+    `float_masses`."""
+    return [mass.is_integer() and start + i not in float_masses
+            for i, mass in enumerate(masses)]
+
+
+def format_meas_for_ISEG(meas, totalmass=-1):
+    """Returns the contents of input files for Yeadon's ISEG fortran code,
+    one per subject. The contents are the same as those written by
+    :py:meth:`yeadon.Human.write_meas_for_ISEG`.
+
+    Parameters
+    ----------
+    meas : array_like, shape(S, 95)
+        Measurements in meters, with columns in the order of
+        :py:attr:`yeadon.Human.measnames`.
+    totalmass : float or array_like, shape(S,), optional
+        The measured mass of each subject, in kg. A non-positive value means
+        that the mass was not measured, and ISEG's default is written.
+
+    Returns
+    -------
+    contents : list of str
+
+    """
+    masses = np.broadcast_to(np.asarray(totalmass, dtype=float),
+                             (len(meas),)).tolist()
+    return _format_meas_for_ISEG(meas, masses, _mass_is_int(masses))
+
+
+def _format_meas_for_ISEG(meas, masses, is_int):
+    """Returns the contents of ISEG input files, see
+    :py:func:`format_meas_for_ISEG`, with each of the `masses` written as an
+    integer if `is_int` is True for it."""
+    meas = np.asarray(meas, dtype=float)
+    # Convert units.
+    SI = 1./1000.
+    indices = [Human.measnames.index(name) for name in Human._ISEG_names]
+    values = meas[:, indices] / SI
+    # XHEIGHT and XMASS, with the mass written as in the measurement input
+    # file.
+    tails = [(500, int(mass) if mass_is_int else mass) if mass > 0
+             else (500, 200) for mass, mass_is_int in zip(masses, is_int)]
+    template = Human._ISEG_template
+    return [template % (tuple(row) + tail)
+            for row, tail in zip(values.tolist(), tails)]
+
+
+def write_meas_for_ISEG(meas, path, totalmass=-1, subject_ids=None,
+                        concatenate=False, chunk_size=1024):
+    """Writes input files for Yeadon's ISEG fortran code for many subjects.
+    The output for each subject is byte-identical to that of
+    :py:meth:`yeadon.Human.write_meas_for_ISEG`.
+
+    Parameters
+    ----------
+    meas : array_like, shape(S, 95)
+        Measurements in meters, with columns in the order of
+        :py:attr:`yeadon.Human.measnames`. The rows are formatted in chunks,
+        so this can be a memory-mapped array.
+    path : str
+        If `concatenate` is False, the directory in which one file per
+        subject is written (created if it does not exist). Otherwise, the
+        file to which the inputs of all subjects are written, one after the
+        other.
+    totalmass : float or array_like, shape(S,), optional
+        The measured mass of each subject, in kg. -1 (not measured) by
+        default.
+    subject_ids : sequence of str, optional
+        Names of the per-subject files, without the '.txt' extension. By
+        default, the row indices.
+    concatenate : bool, optional
+        Write a single stream instead of one file per subject.
+    chunk_size : int, optional
+        Number of subjects that are formatted at a time.
+
+    """
+    n = len(meas)
+    totalmass = np.broadcast_to(np.asarray(totalmass, dtype=float),
+                                (n,)).tolist()
+    if subject_ids is None:
+        subject_ids = [str(i) for i in range(n)]
+    chunks = ((subject_ids[start:start + chunk_size],
+               meas[start:start + chunk_size],
+               totalmass[start:start + chunk_size],
+               _mass_is_int(totalmass[start:start + chunk_size]))
+              for start in range(0, n, chunk_size))
+    _write_ISEG_chunks(chunks, path, concatenate)
+
+
+def _write_ISEG_chunks(chunks, path, concatenate):
+    """Writes ISEG input files for chunks of subjects, see
+    :py:func:`write_meas_for_ISEG`.
+
+    Parameters
+    ----------
+    chunks : iterable
+        Yields the subject IDs, measurements (in meters), total masses, and
+        whether each mass is written as an integer, of a chunk of subjects.
+    path : str
+        Output directory, or output file if `concatenate` is True.
+    concatenate : bool
+        Write a single stream instead of one file per subject.
+
+    """
+    if concatenate:
+        stream = io.open(path, 'w', buffering=2**20)
+    elif not os.path.isdir(path):
+        os.makedirs(path)
+    try:
+        for subject_ids, meas, totalmass, is_int in chunks:
+            contents = _format_meas_for_ISEG(meas, totalmass, is_int)
+            if concatenate:
+                stream.write(u''.join(contents))
+            else:
+                for subject_id, content in zip(subject_ids, contents):
+                    fname = os.path.join(path, str(subject_id) + '.txt')
+                    with io.open(fname, 'w') as fid:
+                        fid.write(u'' + content)
+    finally:
+        if concatenate:
+            stream.close()
+
+
+class Cohort(object):
+    """The measurements of many humans, stored column-wise."""
+
+    _fields = ('meas', 'measnames', 'subject_ids',
+               'measurementconversionfactor', 'totalmass')
+
+    def __init__(self, meas, subject_ids=None, measurementconversionfactor=1,
+                 totalmass=-1):
+        """Defines a cohort from a measurement matrix.
+
+        Parameters
+        ----------
+        meas : array_like, shape(S, 95)
+            The measurements of S subjects, with the columns in the order of
+            :py:attr:`yeadon.Human.measnames`.
+        subject_ids : sequence of str, optional
+            An identifier for each subject. By default, the row indices are
+            used.
+        measurementconversionfactor : float or array_like, shape(S,), optional
+            Converts the measurements of each subject into meters. 1 by
+            default, i.e. the measurements are in meters.
+        totalmass : float or array_like, shape(S,), optional
+            The measured mass of each subject, in kg. A non-positive value
+            means that the mass was not measured. -1 by default.
+
+        """
+        if np.ndim(meas) != 2 or np.shape(meas)[1] != len(Human.measnames):
+            raise ValueError("Measurements must have shape (S, {0}), not "
+                    "{1}.".format(len(Human.measnames), np.shape(meas)))
+        self.meas = meas
+        n = len(meas)
+        if subject_ids is None:
+            subject_ids = [str(i) for i in range(n)]
+        self.subject_ids = np.asarray(subject_ids, dtype=str)
+        self.measurementconversionfactor = np.broadcast_to(
+                np.asarray(measurementconversionfactor, dtype=float), (n,))
+        self.totalmass = np.broadcast_to(
+                np.asarray(totalmass, dtype=float), (n,))
+        self.measnames = np.asarray(Human.measnames)
+        # Indices of subjects whose whole-number mass was written as a float
+        # in their measurement input file.
+        self._float_masses = frozenset()
+        if len(self.subject_ids) != n:
+            raise ValueError("There are {0} subject IDs for {1} "
+                    "subjects.".format(len(self.subject_ids), n))
+
+    def __len__(self):
+        return len(self.meas)
+
+    @classmethod
+    def load(cls, dirname, mmap_mode='r'):
+        """Loads a cohort that was written with :py:meth:`Cohort.save`.
+
+        Parameters
+        ----------
+        dirname : str
+            Path to the cohort directory.
+        mmap_mode : str or None, optional
+            Passed on to ``numpy.load``. By default, the arrays are
+            memory-mapped read-only, so that subjects are only read from disk
+            when they are accessed. Use None to read the cohort into memory.
+
+        Returns
+        -------
+        cohort : :py:class:`Cohort`
+
+        """
+        arrays = dict()
+        for field in cls._fields:
+            arrays[field] = np.load(os.path.join(dirname, field + '.npy'),
+                                    mmap_mode=mmap_mode)
+        if tuple(arrays['measnames']) != Human.measnames:
+            raise ValueError("The columns of the cohort in {0!r} are not in "
+                    "the order of Human.measnames.".format(dirname))
+        cohort = cls(arrays['meas'], arrays['subject_ids'],
+                     arrays['measurementconversionfactor'],
+                     arrays['totalmass'])
+        # Cohorts saved without metadata write whole-number masses as
+        # integers.
+        fname = os.path.join(dirname, 'metadata.yaml')
+        if os.path.exists(fname):
+            with open(fname) as fid:
+                metadata = yaml.safe_load(fid)
+            cohort._float_masses = frozenset(metadata['float_totalmass'])
+        return cohort
+
+    def save(self, dirname):
+        """Writes the cohort to a directory of .npy files, which is created
+        if it does not exist.
+
+        Parameters
+        ----------
+        dirname : str
+            Path to the cohort directory.
+
+        """
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        for field in self._fields:
+            np.save(os.path.join(dirname, field + '.npy'),
+                    np.asarray(getattr(self, field)))
+        self._save_metadata(dirname)
+
+    def _save_metadata(self, dirname):
+        """Writes metadata.yaml to a cohort directory."""
+        with open(os.path.join(dirname, 'metadata.yaml'), 'w') as fid:
+            yaml.safe_dump({'float_totalmass': sorted(self._float_masses)},
+                           fid, default_flow_style=False)
+
+    @classmethod
+    def from_measurement_files(cls, fnames, dirname=None):
+        """Creates a cohort from measurement input .txt files, such as those
+        read by :py:class:`yeadon.Human`.
+
+        Parameters
+        ----------
+        fnames : str or sequence of str
+            Paths to the measurement input files, or the path to a directory,
+            in which case all of its .txt files are read (in sorted order).
+            The subject IDs are the file names without their extension.
+        dirname : str, optional
+            If provided, the cohort is written to this directory one subject
+            at a time, and the returned cohort is memory-mapped from it. This
+            keeps memory usage independent of the number of subjects.
+
+        Returns
+        -------
+        cohort : :py:class:`Cohort`
+
+        """
+        if isinstance(fnames, str):
+            fnames = sorted(glob.glob(os.path.join(fnames, '*.txt')))
+        subject_ids = [os.path.splitext(os.path.basename(fname))[0]
+                       for fname in fnames]
+        n = len(fnames)
+        shape = (n, len(Human.measnames))
+        if dirname is None:
+            meas = np.empty(shape)
+        else:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            meas = np.lib.format.open_memmap(
+                    os.path.join(dirname, 'meas.npy'), mode='w+',
+                    dtype=float, shape=shape)
+        factors = np.empty(n)
+        masses = np.empty(n)
+        float_masses = []
+        for i, fname in enumerate(fnames):
+            row, factors[i], totalmass = Human._parse_measurement_file(fname)
+            meas[i] = [row[name] for name in Human.measnames]
+            masses[i] = -1 if totalmass is None else totalmass
+            if isinstance(totalmass, float) and totalmass.is_integer():
+                float_masses.append(i)
+        cohort = cls(meas, subject_ids, factors, masses)
+        cohort._float_masses = frozenset(float_masses)
+        if dirname is None:
+            return cohort
+        meas.flush()
+        del meas
+        for field in cls._fields[1:]:
+            np.save(os.path.join(dirname, field + '.npy'),
+                    np.asarray(getattr(cohort, field)))
+        cohort._save_metadata(dirname)
+        return cls.load(dirname)
+
+    def to_measurement_files(self, dirname):
+        """Writes one measurement input .txt file per subject, named after
+        the subject's ID. The files can be read by :py:class:`yeadon.Human`.
+
+        Parameters
+        ----------
+        dirname : str
+            Path to the output directory, which is created if it does not
+            exist.
+
+        """
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        for i in range(len(self)):
+            mydict = dict(zip(Human.measnames,
+                              [float(val) for val in self.meas[i]]))
+            mydict['totalmass'] = self._totalmass(i)
+            mydict['measurementconversionfactor'] = \
+                    float(self.measurementconversionfactor[i])
+            fname = os.path.join(dirname, self.subject_ids[i] + '.txt')
+            with open(fname, 'w') as fid:
+                yaml.dump(mydict, fid, default_flow_style=False)
+
+    def _totalmass(self, i):
+        """Returns the mass of a subject as it was read from its measurement
+        input file, an int or a float."""
+        mass = float(self.totalmass[i])
+        if _mass_is_int([mass], self._float_masses, i)[0]:
+            return int(mass)
+        return mass
+
+    def meas_in_meters(self, start=0, stop=None):
+        """Returns the measurements of a range of subjects, in meters. Only
+        the requested rows are read from a memory-mapped cohort.
+
+        Parameters
+        ----------
+        start : int, optional
+            Index of the first subject.
+        stop : int, optional
+            One past the index of the last subject. By default, the last
+            subject of the cohort.
+
+        Returns
+        -------
+        meas : np.ndarray, shape(stop - start, 95)
+
+        """
+        return (np.asarray(self.meas[start:stop]) *
+                self.measurementconversionfactor[start:stop, np.newaxis])
+
+    def iter_chunks(self, chunk_size=1024):
+        """Iterates through the cohort in blocks of subjects, reading one
+        block at a time.
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            Number of subjects per block.
+
+        Yields
+        ------
+        start : int
+            Index of the first subject in the block.
+        meas : np.ndarray, shape(n, 95)
+            The measurements of the subjects in the block, in meters.
+
+        """
+        for start in range(0, len(self), chunk_size):
+            yield start, self.meas_in_meters(start, start + chunk_size)
+
+    def validate(self, asymmetry_tolerance=0.2, chunk_size=65536):
+        """Checks the measurements of all subjects, one chunk at a time. See
+        :py:func:`yeadon.validation.validate_measurements`.
+
+        Parameters
+        ----------
+        asymmetry_tolerance : float, optional
+            Largest acceptable relative difference between left and right
+            limbs.
+        chunk_size : int, optional
+            Number of subjects that are read and checked at a time.
+
+        Returns
+        -------
+        report : :py:class:`yeadon.validation.ValidationReport`
+
+        """
+        issues = []
+        for start, meas in self.iter_chunks(chunk_size):
+            chunk_issues = validate_measurements(
+                    meas, asymmetry_tolerance=asymmetry_tolerance).issues
+            chunk_issues['subject'] += start
+            issues.append(chunk_issues)
+        if issues:
+            issues = np.concatenate(issues)
+        else:
+            issues = np.empty(0, dtype=ValidationReport.dtype)
+        return ValidationReport(issues, self.subject_ids)
+
+    def meas_dict(self, i):
+        """Returns the measurements of one subject as a dict, in meters,
+        which can be passed to :py:class:`yeadon.Human`.
+
+        Parameters
+        ----------
+        i : int
+            Index of the subject.
+
+        """
+        row = self.meas_in_meters(i, i + 1)[0]
+        return dict(zip(Human.measnames, [float(val) for val in row]))
+
+    def write_meas_for_ISEG(self, path, symmetric=True, concatenate=False,
+                            chunk_size=1024):
+        """Writes input files for Yeadon's ISEG fortran code for all
+        subjects, named after the subjects' IDs. See
+        :py:func:`write_meas_for_ISEG`. The output for each subject is the
+        same as that of :py:meth:`yeadon.Human.write_meas_for_ISEG` for a
+        human constructed from the subject's measurement file.
+
+        Parameters
+        ----------
+        path : str
+            Output directory, or output file if `concatenate` is True.
+        symmetric : bool, optional
+            Average the left and right limbs, as :py:class:`yeadon.Human`
+            does by default.
+        concatenate : bool, optional
+            Write a single stream instead of one file per subject.
+        chunk_size : int, optional
+            Number of subjects that are read and formatted at a time.
+
+        """
+        chunks = ((self.subject_ids[start:start + len(meas)],
+                   average_limbs(meas) if symmetric else meas,
+                   self.totalmass[start:start + len(meas)].tolist(),
+                   _mass_is_int(
+                       self.totalmass[start:start + len(meas)].tolist(),
+                       self._float_masses, start))
+                  for start, meas in self.iter_chunks(chunk_size))
+        _write_ISEG_chunks(chunks, path, concatenate)
+
+    def human(self, i, **kwargs):
+        """Returns a :py:class:`yeadon.Human` for one subject. If the
+        subject's mass was measured, the human is scaled by it, as when the
+        measurements are read from a file.
+
+        Parameters
+        ----------
+        i : int
+            Index of the subject.
+        kwargs
+            Passed on to :py:class:`yeadon.Human` (e.g. ``CFG``,
+            ``symmetric``, ``density_set``).
+
+        """
+        human = Human(self.meas_dict(i), **kwargs)
+        if self.totalmass[i] > 0:
+            human.meas_mass = self._totalmass(i)
+            human.scale_human_by_mass(human.meas_mass)
+        return human
+
+    def humans(self, **kwargs):
+        """Yields a :py:class:`yeadon.Human` for each subject, in order. Only
+        one subject is read and constructed at a time.
+
+        Parameters
+        ----------
+        kwargs
+            Passed on to :py:meth:`Cohort.human`.
+
+        """
+        for i in range(len(self)):
+            yield self.human(i, **kwargs)
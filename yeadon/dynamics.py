@@ -0,0 +1,971 @@
+"""The dynamics module computes the momentum and kinetic energy of a human
+that moves along a trajectory of joint angles, e.g. from motion capture or
+from a simulation of aerial movement. All samples of the trajectory are
+processed at once with the batched kinematics of
+:py:class:`yeadon.tree.SegmentTree`; the Human object is not updated.
+
+The joint angle rates and accelerations are either given, or obtained by
+differentiating the samples of the joint angles numerically (see
+:py:func:`joint_rates`). The motion of the model itself is never
+differentiated numerically.
+
+The origin of the pelvis is fixed in the global frame, as in
+:py:class:`yeadon.Human`, so velocities and the kinetic energy are given
+relative to the center of mass of the human, and the angular momentum is
+about the center of mass. These do not depend on the motion of the center of
+mass.
+
+For multibody simulation, the human is a floating-base system with 24
+generalized coordinates (see `coordinate_names`): the translation of the
+origin of the pelvis in the global frame, followed by the 21 joint angles of
+Human.CFGnames (the three orientation angles of the pelvis and the 18 joint
+angles, with the axes of :py:func:`yeadon.inertia.euler_123`). The
+equations of motion are formed with spatial (6D) vectors expressed in the
+global frame, about its origin: a spatial velocity is (omega, v), where v is
+the velocity of the body-fixed point at the global origin. The human can be
+simulated from generalized forces (e.g. joint torques) with
+:py:func:`simulate`, for many initial states at once.
+
+"""
+# Use Python3 integer division rules.
+from __future__ import division
+
+import numpy as np
+
+from . import integrate
+from .human import Human
+from .tree import SegmentTree
+
+# The generalized coordinates of the floating-base human: the translation of
+# the origin of the pelvis (m), and the joint angles (rad).
+coordinate_names = ('x', 'y', 'z') + tuple(Human.CFGnames)
+
+
+def joint_rates(CFGs, times):
+    """Returns the time derivatives of sampled joint angles, with second
+    order finite differences.
+
+    Parameters
+    ----------
+    CFGs : array_like, shape(N, 21)
+        Joint angles at each sample, N >= 3.
+    times : float or array_like, shape(N,)
+        Time step between the samples (s), or the time of each sample.
+
+    Returns
+    -------
+    CFG_rates : np.ndarray, shape(N, 21)
+        Joint angle rates (rad/s).
+
+    """
+    CFGs = np.asarray(CFGs, dtype=float)
+    if len(CFGs) < 3:
+        raise ValueError("At least 3 samples are needed to differentiate "
+                         "the joint angles, not {0}.".format(len(CFGs)))
+    return np.gradient(CFGs, times, axis=0, edge_order=2)
+
+
+def _derivatives(human, CFGs, derivatives, times, name):
+    """Returns given joint angle derivatives as an array, or else
+    differentiates `CFGs` at `times`."""
+    if derivatives is None:
+        if times is None:
+            raise ValueError("Either {0} or times must be given.".format(
+                name))
+        return joint_rates(CFGs, times)
+    derivatives = human.CFG_to_array(derivatives)
+    if derivatives.shape != CFGs.shape:
+        raise ValueError("{0} must have shape {1}, not {2}.".format(
+            name, CFGs.shape, derivatives.shape))
+    return derivatives
+
+
+class Momentum(object):
+    """Momentum and kinetic energy of a human along a trajectory. Create it
+    with :py:func:`momentum`.
+
+    Attributes
+    ----------
+    CFGs : np.ndarray, shape(N, 21)
+        Joint angles of each sample, in the order of Human.CFGnames.
+    CFG_rates : np.ndarray, shape(N, 21)
+        Joint angle rates of each sample (rad/s).
+    mass : float
+        Mass of the human.
+    center_of_mass : np.ndarray, shape(N, 3)
+        Center of mass of the human.
+    angular_velocities : np.ndarray, shape(N, 11, 3)
+        Angular velocity of each segment (rad/s), in the global frame.
+    segment_velocities : np.ndarray, shape(N, 11, 3)
+        Velocity of the center of mass of each segment relative to the
+        center of mass of the human (m/s).
+    segment_inertias : np.ndarray, shape(N, 11, 3, 3)
+        Inertia tensor of each segment about its center of mass, in the
+        global frame.
+    segment_angular_momenta : np.ndarray, shape(N, 11, 3)
+        Angular momentum of each segment about the center of mass of the
+        human (kg-m^2/s): the local term, I * omega, plus the remote term,
+        m * r x v.
+    angular_momentum : np.ndarray, shape(N, 3)
+        Angular momentum of the human about its center of mass, the sum of
+        `segment_angular_momenta`.
+    segment_rotational_energies : np.ndarray, shape(N, 11)
+        Rotational kinetic energy of each segment, 0.5 * omega . I * omega
+        (J).
+    rotational_kinetic_energy : np.ndarray, shape(N,)
+        Sum of `segment_rotational_energies`.
+    kinetic_energy : np.ndarray, shape(N,)
+        Kinetic energy of the human relative to its center of mass: the
+        rotational energy plus the energy of the segments' motion relative
+        to the center of mass.
+
+    """
+
+    def __init__(self, CFGs, CFG_rates, masses, center_of_mass,
+                 angular_velocities, segment_velocities, segment_inertias,
+                 segment_offsets):
+        self.CFGs = CFGs
+        self.CFG_rates = CFG_rates
+        self.mass = masses.sum()
+        self.center_of_mass = center_of_mass
+        self.angular_velocities = angular_velocities
+        self.segment_velocities = segment_velocities
+        self.segment_inertias = segment_inertias
+        local = np.matmul(segment_inertias,
+                          angular_velocities[..., np.newaxis])[..., 0]
+        self.segment_angular_momenta = local + masses[:, np.newaxis] * \
+                np.cross(segment_offsets, segment_velocities)
+        self.angular_momentum = self.segment_angular_momenta.sum(axis=1)
+        self.segment_rotational_energies = 0.5 * np.einsum(
+                'nsi,nsi->ns', angular_velocities, local)
+        self.rotational_kinetic_energy = \
+                self.segment_rotational_energies.sum(axis=1)
+        self.kinetic_energy = self.rotational_kinetic_energy + 0.5 * \
+                np.einsum('s,nsi,nsi->n', masses, segment_velocities,
+                          segment_velocities)
+
+    def __len__(self):
+        return len(self.CFGs)
+
+
+def momentum(human, CFGs, CFG_rates=None, times=None, tree=None):
+    """Computes the angular momentum and kinetic energy of a human for many
+    configurations and joint angle rates, e.g. the samples of a trajectory.
+    The human itself is not modified.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    CFGs : dict, sequence of dict, or array_like, shape(N, 21)
+        Configurations, see :py:meth:`yeadon.Human.CFG_to_array`.
+    CFG_rates : dict, sequence of dict, or array_like, shape(N, 21), optional
+        Joint angle rates (rad/s), in the same layout as `CFGs`.
+    times : float or array_like, shape(N,), optional
+        If `CFG_rates` is not given, the rates are obtained by
+        differentiating `CFGs` (see :py:func:`joint_rates`), which are then
+        samples at these times, or with this time step.
+    tree : :py:class:`yeadon.tree.SegmentTree`, optional
+        The tree of the human, if it has already been created.
+
+    Returns
+    -------
+    momentum : :py:class:`Momentum`
+
+    Notes
+    -----
+    The inertia tensor of each segment in the global frame is R * I * R^T,
+    for the rotation matrix R of the segment and its inertia I in the
+    segment's frame. Note that :py:attr:`yeadon.Human.inertia` and
+    :py:meth:`yeadon.tree.SegmentTree.mass_properties` use R^T * I * R
+    instead (see :py:func:`yeadon.inertia.rotate_inertia`); the two agree
+    when the segments are not rotated.
+
+    """
+    CFGs = human.CFG_to_array(CFGs)
+    CFG_rates = _derivatives(human, CFGs, CFG_rates, times, 'CFG_rates')
+    if tree is None:
+        tree = SegmentTree(human)
+
+    rot_mats, positions = tree.forward_kinematics(CFGs)
+    angular_velocities, velocities = tree.velocities(CFGs, CFG_rates,
+                                                     rot_mats, positions)
+    arms = np.einsum('nsij,sj->nsi', rot_mats, tree.rel_centers_of_mass)
+    segment_coms = positions + arms
+    segment_velocities = velocities + np.cross(angular_velocities, arms)
+    weights = tree.masses / tree.mass
+    center_of_mass = np.einsum('s,nsi->ni', weights, segment_coms)
+    segment_velocities -= np.einsum('s,nsi->ni', weights,
+                                    segment_velocities)[:, np.newaxis]
+    segment_inertias = np.matmul(np.matmul(rot_mats, tree.rel_inertias),
+                                 np.swapaxes(rot_mats, 2, 3))
+    return Momentum(CFGs, CFG_rates, tree.masses, center_of_mass,
+                    angular_velocities, segment_velocities, segment_inertias,
+                    segment_coms - center_of_mass[:, np.newaxis])
+
+
+def center_of_mass_motion(human, CFGs, CFG_rates=None,
+                          CFG_accelerations=None, times=None, tree=None):
+    """Computes the position, velocity, and acceleration of the center of
+    mass of a human for many configurations, e.g. the samples of a
+    trajectory, from the joint angles and their derivatives. The human
+    itself is not modified.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    CFGs : dict, sequence of dict, or array_like, shape(N, 21)
+        Configurations, see :py:meth:`yeadon.Human.CFG_to_array`.
+    CFG_rates : dict, sequence of dict, or array_like, shape(N, 21), optional
+        Joint angle rates (rad/s), in the same layout as `CFGs`.
+    CFG_accelerations : dict, sequence of dict, or array_like, optional
+        Joint angle accelerations (rad/s^2), in the same layout as `CFGs`.
+    times : float or array_like, shape(N,), optional
+        If the rates or the accelerations are not given, they are obtained
+        by differentiating `CFGs`, or `CFG_rates`, respectively (see
+        :py:func:`joint_rates`), which are then samples at these times, or
+        with this time step.
+    tree : :py:class:`yeadon.tree.SegmentTree`, optional
+        The tree of the human, if it has already been created.
+
+    Returns
+    -------
+    centers_of_mass : np.ndarray, shape(N, 3)
+        Center of mass of the human (m).
+    velocities : np.ndarray, shape(N, 3)
+        Velocity of the center of mass (m/s), J * q'.
+    accelerations : np.ndarray, shape(N, 3)
+        Acceleration of the center of mass (m/s^2), J * q'' + J' * q'.
+
+    Notes
+    -----
+    J is the Jacobian of the center of mass (see
+    :py:meth:`yeadon.tree.SegmentTree.center_of_mass_jacobian`). The term
+    J' * q' is the acceleration of the center of mass with zero joint angle
+    accelerations, which is obtained by propagating the accelerations of
+    the segments down the tree.
+
+    """
+    CFGs = human.CFG_to_array(CFGs)
+    CFG_rates = _derivatives(human, CFGs, CFG_rates, times, 'CFG_rates')
+    CFG_accelerations = _derivatives(human, CFG_rates, CFG_accelerations,
+                                     times, 'CFG_accelerations')
+    if tree is None:
+        tree = SegmentTree(human)
+
+    rot_mats, positions = tree.forward_kinematics(CFGs)
+    jacobian = tree.center_of_mass_jacobian(CFGs, rot_mats, positions)
+    angular_velocities, angular_accelerations, accelerations = \
+            tree.accelerations(CFGs, CFG_rates, np.zeros(CFGs.shape),
+                               rot_mats, positions)
+    arms = np.einsum('nsij,sj->nsi', rot_mats, tree.rel_centers_of_mass)
+    bias = accelerations + np.cross(angular_accelerations, arms) + \
+            np.cross(angular_velocities, np.cross(angular_velocities, arms))
+    weights = tree.masses / tree.mass
+    centers_of_mass = np.einsum('s,nsi->ni', weights, positions + arms)
+    velocities = np.matmul(jacobian, CFG_rates[..., np.newaxis])[..., 0]
+    accelerations = (np.matmul(jacobian,
+                               CFG_accelerations[..., np.newaxis])[..., 0] +
+                     np.einsum('s,nsi->ni', weights, bias))
+    return centers_of_mass, velocities, accelerations
+
+
+def _skew(vectors):
+    """Returns the cross product matrices of vectors, shape(..., 3, 3)."""
+    x, y, z = np.rollaxis(np.asarray(vectors), -1)
+    zero = np.zeros_like(x)
+    return np.stack((np.stack((zero, -z, y), axis=-1),
+                     np.stack((z, zero, -x), axis=-1),
+                     np.stack((-y, x, zero), axis=-1)), axis=-2)
+
+
+def _coordinate_segments(tree):
+    """Returns the index of the segment that each generalized coordinate
+    moves (the pelvis, for the translation)."""
+    segments = np.zeros(len(coordinate_names), dtype=int)
+    for i, indices in enumerate(tree.joint_indices):
+        segments[3 + indices[indices >= 0]] = i
+    return segments
+
+
+def _ancestry(tree):
+    """Returns a boolean array, shape(11, 11), that is True at [i, j] if
+    segment j is segment i or one of its ancestors."""
+    ancestry = np.eye(len(tree.parents), dtype=bool)
+    for i, parent in enumerate(tree.parents):
+        if parent >= 0:
+            ancestry[i] |= ancestry[parent]
+    return ancestry
+
+
+def motion_subspaces(tree, CFGs, rot_mats=None, positions=None):
+    """Returns the spatial velocity that each generalized coordinate, at
+    unit rate, gives to the segment it moves (and to the segments distal to
+    it).
+
+    Parameters
+    ----------
+    tree : :py:class:`yeadon.tree.SegmentTree`
+    CFGs : array_like, shape(N, 21)
+        Joint angles, with columns in the order of Human.CFGnames.
+    rot_mats, positions : np.ndarray, optional
+        The output of :py:meth:`yeadon.tree.SegmentTree.forward_kinematics`
+        for `CFGs`, if it has already been computed.
+
+    Returns
+    -------
+    subspaces : np.ndarray, shape(N, 24, 6)
+        For each generalized coordinate of `coordinate_names`, the angular
+        velocity and the velocity of the body-fixed point at the global
+        origin, in the global frame.
+
+    """
+    CFGs = np.asarray(CFGs, dtype=float)
+    if rot_mats is None or positions is None:
+        rot_mats, positions = tree.forward_kinematics(CFGs)
+    axes = tree.joint_axes(CFGs)
+    subspaces = np.zeros((len(CFGs), len(coordinate_names), 6))
+    subspaces[:, :3, 3:] = np.eye(3)
+    for i, parent in enumerate(tree.parents):
+        if parent >= 0:
+            axes[:, i] = np.matmul(rot_mats[:, parent], axes[:, i])
+        for k, index in enumerate(tree.joint_indices[i]):
+            if index >= 0:
+                # A rotation about the axis u through the joint center p.
+                u = axes[:, i, :, k]
+                subspaces[:, 3 + index, :3] = u
+                subspaces[:, 3 + index, 3:] = np.cross(positions[:, i], u)
+    return subspaces
+
+
+def spatial_inertias(tree, rot_mats, positions):
+    """Returns the spatial inertia of each segment, in the global frame and
+    about the global origin.
+
+    Parameters
+    ----------
+    tree : :py:class:`yeadon.tree.SegmentTree`
+    rot_mats, positions : np.ndarray, shape(N, 11, 3, 3) and shape(N, 11, 3)
+        The output of :py:meth:`yeadon.tree.SegmentTree.forward_kinematics`.
+
+    Returns
+    -------
+    inertias : np.ndarray, shape(N, 11, 6, 6)
+        [[I + m C C^T, m C], [m C^T, m E]], for the inertia I of the segment
+        about its center of mass c (rotated as R * I * R^T) and the cross
+        product matrix C of c. The kinetic energy of the segment is
+        V^T * inertia * V / 2 for its spatial velocity V.
+
+    """
+    centers = positions + np.einsum('nsij,sj->nsi', rot_mats,
+                                    tree.rel_centers_of_mass)
+    C = _skew(centers)
+    m = tree.masses[:, np.newaxis, np.newaxis]
+    inertias = np.empty(rot_mats.shape[:2] + (6, 6))
+    inertias[..., :3, :3] = np.matmul(np.matmul(rot_mats, tree.rel_inertias),
+                                      np.swapaxes(rot_mats, 2, 3)) + \
+            m * np.matmul(C, np.swapaxes(C, 2, 3))
+    inertias[..., :3, 3:] = m * C
+    inertias[..., 3:, :3] = m * np.swapaxes(C, 2, 3)
+    inertias[..., 3:, 3:] = m * np.eye(3)
+    return inertias
+
+
+def mass_matrix(human, CFGs, tree=None):
+    """Computes the joint-space mass matrix M(q) of the floating-base human
+    for many configurations, with the composite rigid body algorithm: the
+    kinetic energy is q'^T * M(q) * q' / 2 for the rates q' of the
+    generalized coordinates of `coordinate_names`. The mass matrix does not
+    depend on the translation of the human.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    CFGs : dict, sequence of dict, or array_like, shape(N, 21)
+        Configurations, see :py:meth:`yeadon.Human.CFG_to_array`.
+    tree : :py:class:`yeadon.tree.SegmentTree`, optional
+        The tree of the human, if it has already been created.
+
+    Returns
+    -------
+    M : np.ndarray, shape(N, 24, 24)
+        Symmetric, positive definite mass matrix of each configuration.
+
+    Notes
+    -----
+    The spatial inertias of the segments are summed over each subtree in one
+    backward pass (the composite inertias). The entry of coordinates k and l
+    is S_l^T * Ic * S_k, where S are the motion subspaces of the coordinates
+    (see :py:func:`motion_subspaces`) and Ic is the composite inertia of the
+    deeper of their two segments, if one segment is distal to the other, and
+    zero otherwise. As in :py:func:`momentum`, the segment inertias are
+    rotated as R * I * R^T.
+
+    """
+    CFGs = human.CFG_to_array(CFGs)
+    if tree is None:
+        tree = SegmentTree(human)
+    kinematics = _kinematics(tree, CFGs, np.zeros(CFGs.shape))
+    return np.moveaxis(_composite_rigid_body(tree, kinematics), -1, 0).copy()
+
+
+def centroidal_momentum_matrix(human, CFGs=None, tree=None):
+    """Computes the centroidal momentum matrix A(q) of the human, which maps
+    the joint angle rates to the angular momentum about the center of mass
+    and the linear momentum: [H; P] = A(q) * q'. The origin of the pelvis
+    is fixed, as in :py:func:`momentum`.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    CFGs : dict, sequence of dict, or array_like, shape(N, 21), optional
+        Configurations, see :py:meth:`yeadon.Human.CFG_to_array`. By
+        default, the human's current configuration.
+    tree : :py:class:`yeadon.tree.SegmentTree`, optional
+        The tree of the human, if it has already been created.
+
+    Returns
+    -------
+    A : np.ndarray, shape(N, 6, 21), or shape(6, 21) if `CFGs` is not given
+        The columns are in the order of Human.CFGnames; the first three rows
+        give the angular momentum about the center of mass (kg-m^2/s), and
+        the last three the linear momentum (kg-m/s), in the global frame.
+
+    Notes
+    -----
+    Column k is the spatial momentum, about the center of mass, of the
+    subtree that angle k moves, rotating at unit rate about the angle's axis:
+    the composite inertia of :py:func:`mass_matrix` times the motion
+    subspace of the angle, moved from the global origin to the center of
+    mass. As in :py:func:`momentum`, the segment inertias are rotated as
+    R * I * R^T.
+
+    """
+    single = CFGs is None
+    CFGs = human.CFG_to_array(human.CFG if single else CFGs)
+    if tree is None:
+        tree = SegmentTree(human)
+    kinematics = _kinematics(tree, CFGs, np.zeros(CFGs.shape))
+    w, v, torques, forces, masses, moments = _spatial_momenta(tree,
+                                                              kinematics)
+    center_of_mass = (moments[:, 0] / masses[0])[:, np.newaxis]
+    A = np.empty((len(CFGs), 6, len(human.CFGnames)))
+    A[:, :3] = np.moveaxis(torques[:, 3:] -
+                           _cross(center_of_mass, forces[:, 3:]), -1, 0)
+    A[:, 3:] = np.moveaxis(forces[:, 3:], -1, 0)
+    return A[0] if single else A
+
+
+def _cross(a, b):
+    """Returns the cross products of vectors stored along the first axis."""
+    return np.array((a[1] * b[2] - a[2] * b[1],
+                     a[2] * b[0] - a[0] * b[2],
+                     a[0] * b[1] - a[1] * b[0]))
+
+
+def _rotate(R, v):
+    """Returns R * v for matrices and vectors stored along the first axes."""
+    return R[:, 0] * v[0] + R[:, 1] * v[1] + R[:, 2] * v[2]
+
+
+def _kinematics(tree, CFGs, CFG_rates, CFG_accelerations=None):
+    """Returns the motion of the segments for one chunk of samples, in the
+    global frame, with the vectors and matrices stored along the first axes
+    and the samples along the last axis (e.g. shape(3, 11, N) for a vector
+    of each segment), so that every operation is on contiguous rows of
+    samples.
+
+    Returns
+    -------
+    rot_mats : np.ndarray, shape(3, 3, 11, N)
+    offsets : list of np.ndarray, shape(3, N)
+        Position of the origin of each segment relative to the origin of its
+        parent (for the pelvis, relative to the global origin).
+    axes : list of tuple of np.ndarray, shape(3, N)
+        The axes of the three angles of each joint.
+    positions, angular_velocities, velocities : np.ndarray, shape(3, 11, N)
+        Position, angular velocity, and velocity of the origin of each
+        segment.
+    angular_accelerations, accelerations : np.ndarray, shape(3, 11, N)
+        Angular acceleration and acceleration of the origin of each segment,
+        if `CFG_accelerations` is given, and otherwise None.
+
+    """
+    n = len(CFGs)
+    angles = np.transpose(tree._per_joint(CFGs), (2, 1, 0)).copy()
+    rates = np.transpose(tree._per_joint(CFG_rates), (2, 1, 0)).copy()
+    with_accelerations = CFG_accelerations is not None
+    if with_accelerations:
+        angle_accelerations = np.transpose(
+                tree._per_joint(CFG_accelerations), (2, 1, 0)).copy()
+    c1, c2, c3 = np.cos(angles)
+    s1, s2, s3 = np.sin(angles)
+    # The rotations of :py:func:`yeadon.inertia.euler_123`, shape(11, 3, 3,
+    # N).
+    local = np.empty((len(tree.parents), 3, 3, n))
+    local[:, 0, 0] = c2 * c3
+    local[:, 0, 1] = -c2 * s3
+    local[:, 0, 2] = s2
+    local[:, 1, 0] = s1 * s2 * c3 + s3 * c1
+    local[:, 1, 1] = -s1 * s2 * s3 + c3 * c1
+    local[:, 1, 2] = -s1 * c2
+    local[:, 2, 0] = -c1 * s2 * c3 + s3 * s1
+    local[:, 2, 1] = c1 * s2 * s3 + c3 * s1
+    local[:, 2, 2] = c1 * c2
+
+    # The axes of the angles of a joint are, in the global frame, the first
+    # column of the parent's rotation, the second column of the parent's
+    # rotation turned by the first angle, and the third column of the
+    # segment's rotation.
+    zero = np.zeros((3, n))
+    root = tree.root_orientation[..., np.newaxis]
+    rot_mats, positions, offsets, axes = [], [], [], []
+    omegas, velocities, alphas, accelerations = [], [], [], []
+    for i, parent in enumerate(tree.parents):
+        if parent < 0:
+            R_parent, omega, velocity = root, zero, zero
+            alpha = acceleration = zero
+            offset = position = zero + tree.joint_offsets[i][:, np.newaxis]
+        else:
+            R_parent = rot_mats[parent]
+            omega, alpha = omegas[parent], alphas[parent]
+            offset = _rotate(R_parent, tree.joint_offsets[i])
+            position = positions[parent] + offset
+            turn = _cross(omega, offset)
+            velocity = velocities[parent] + turn
+            if with_accelerations:
+                acceleration = (accelerations[parent] +
+                                _cross(alpha, offset) + _cross(omega, turn))
+        R = (R_parent[:, 0, np.newaxis] * local[i, 0] +
+             R_parent[:, 1, np.newaxis] * local[i, 1] +
+             R_parent[:, 2, np.newaxis] * local[i, 2])
+        u = (R_parent[:, 0], R_parent[:, 1] * c1[i] + R_parent[:, 2] * s1[i],
+             R[:, 2])
+        for k in range(3):
+            if tree.joint_indices[i, k] >= 0:
+                turn = rates[k, i] * u[k]
+                if with_accelerations:
+                    alpha = alpha + angle_accelerations[k, i] * u[k]
+                    if parent >= 0 or k > 0:
+                        alpha = alpha + _cross(omega, turn)
+                omega = omega + turn
+        rot_mats.append(R)
+        positions.append(position)
+        offsets.append(offset)
+        axes.append(u)
+        omegas.append(omega)
+        velocities.append(velocity)
+        alphas.append(alpha)
+        accelerations.append(acceleration)
+    if not with_accelerations:
+        alphas = accelerations = None
+    else:
+        alphas = np.stack(alphas, axis=1)
+        accelerations = np.stack(accelerations, axis=1)
+    return (np.stack(rot_mats, axis=2), offsets, axes,
+            np.stack(positions, axis=1), np.stack(omegas, axis=1),
+            np.stack(velocities, axis=1), alphas, accelerations)
+
+
+def _centroidal_terms(tree, CFGs, CFG_rates):
+    """Returns the inertia tensor of the human about its center of mass,
+    shape(N, 3, 3), and its angular momentum about its center of mass,
+    shape(N, 3), in the global frame, for one chunk of samples. As in
+    :py:func:`momentum`, the segment inertias are rotated as R * I * R^T."""
+    rot_mats, offsets, axes, positions, omega, velocities = \
+            _kinematics(tree, CFGs, CFG_rates)[:6]
+    arms = _rotate(rot_mats, tree.rel_centers_of_mass.T[..., np.newaxis])
+    masses = tree.masses[:, np.newaxis]
+    weights = masses / tree.mass
+    centers = positions + arms
+    centers -= (weights * centers).sum(axis=1)[:, np.newaxis]
+    velocities = velocities + _cross(omega, arms)
+    velocities -= (weights * velocities).sum(axis=1)[:, np.newaxis]
+    rel_inertias = np.transpose(tree.rel_inertias, (1, 2, 0))[...,
+                                                               np.newaxis]
+    # R * I * R^T, and I * omega computed in the segment's frame.
+    rotated = (rot_mats[:, 0, np.newaxis] * rel_inertias[0] +
+               rot_mats[:, 1, np.newaxis] * rel_inertias[1] +
+               rot_mats[:, 2, np.newaxis] * rel_inertias[2])
+    inertias = (rotated[:, 0, np.newaxis] * rot_mats[np.newaxis, :, 0] +
+                rotated[:, 1, np.newaxis] * rot_mats[np.newaxis, :, 1] +
+                rotated[:, 2, np.newaxis] * rot_mats[np.newaxis, :, 2])
+    weighted = masses * centers
+    inertias = inertias.sum(axis=2)
+    inertias -= (weighted[:, np.newaxis] * centers[np.newaxis]).sum(axis=2)
+    inertias += np.eye(3)[..., np.newaxis] * (weighted *
+                                              centers).sum(axis=(0, 1))
+    body_omega = (rot_mats[0] * omega[0] + rot_mats[1] * omega[1] +
+                  rot_mats[2] * omega[2])
+    momenta = (_rotate(rot_mats, _rotate(rel_inertias, body_omega)) +
+               _cross(weighted, velocities)).sum(axis=1)
+    return np.moveaxis(inertias, -1, 0), momenta.T
+
+
+def _spatial_momenta(tree, kinematics):
+    """Returns the motion subspaces (w, v) of the coordinates, each of
+    shape(3, 24, N), and the spatial momenta (torques, forces), each of
+    shape(3, 24, N), that each coordinate at unit rate gives the human,
+    about the global origin, from the output of :py:func:`_kinematics`.
+    Also returns the mass, shape(11,), and the first moment of mass,
+    shape(3, 11, N), of the subtree of each segment."""
+    rot_mats, offsets, axes, positions = kinematics[:4]
+    n = positions.shape[-1]
+    segments = _coordinate_segments(tree)
+    # The motion subspaces (w, v) of the coordinates: for a rotation about
+    # the axis u through the joint center p, (u, p x u).
+    w = np.zeros((3, len(coordinate_names), n))
+    v = np.zeros((3, len(coordinate_names), n))
+    v[:, :3] = np.eye(3)[..., np.newaxis]
+    for i, indices in enumerate(tree.joint_indices):
+        for k, index in enumerate(indices):
+            if index >= 0:
+                w[:, 3 + index] = axes[i][k]
+                v[:, 3 + index] = _cross(positions[:, i], axes[i][k])
+
+    # The composite inertias about the global origin: the mass, the first
+    # moment of mass, and the inertia tensor of each subtree.
+    masses = tree.masses.copy()
+    centers = positions + _rotate(rot_mats,
+                                  tree.rel_centers_of_mass.T[...,
+                                                             np.newaxis])
+    moments = tree.masses[:, np.newaxis] * centers
+    rel_inertias = np.transpose(tree.rel_inertias, (1, 2, 0))[...,
+                                                               np.newaxis]
+    rotated = (rot_mats[:, 0, np.newaxis] * rel_inertias[0] +
+               rot_mats[:, 1, np.newaxis] * rel_inertias[1] +
+               rot_mats[:, 2, np.newaxis] * rel_inertias[2])
+    inertias = (rotated[:, 0, np.newaxis] * rot_mats[np.newaxis, :, 0] +
+                rotated[:, 1, np.newaxis] * rot_mats[np.newaxis, :, 1] +
+                rotated[:, 2, np.newaxis] * rot_mats[np.newaxis, :, 2])
+    inertias -= moments[:, np.newaxis] * centers[np.newaxis]
+    inertias += np.eye(3)[..., np.newaxis, np.newaxis] * (moments *
+                                                          centers).sum(axis=0)
+    # The children follow their parents, so one reverse pass suffices.
+    for i in range(len(tree.parents) - 1, 0, -1):
+        parent = tree.parents[i]
+        masses[parent] += masses[i]
+        moments[:, parent] += moments[:, i]
+        inertias[:, :, parent] += inertias[:, :, i]
+
+    # The spatial momenta Ic * S of each coordinate, with the composite
+    # inertia of its segment.
+    h = moments[:, segments]
+    torques = _rotate(inertias[:, :, segments], w) + _cross(h, v)
+    forces = _cross(w, h) + masses[segments, np.newaxis] * v
+    return w, v, torques, forces, masses, moments
+
+
+def _composite_rigid_body(tree, kinematics):
+    """Returns the mass matrix, shape(24, 24, N), of one chunk of samples
+    (see :py:func:`mass_matrix`), from the output of :py:func:`_kinematics`.
+    """
+    w, v, torques, forces = _spatial_momenta(tree, kinematics)[:4]
+    segments = _coordinate_segments(tree)
+    # M[k, l] = S_l^T * Ic * S_k, for the coordinates l of the segment of k
+    # and of its ancestors.
+    ancestry = _ancestry(tree)
+    M = np.zeros((len(coordinate_names), len(coordinate_names),
+                  w.shape[-1]))
+    for k, segment in enumerate(segments):
+        others = np.flatnonzero(ancestry[segment, segments])
+        M[k, others] = ((w[:, others] * torques[:, k, np.newaxis] +
+                         v[:, others] * forces[:, k, np.newaxis]).sum(axis=0))
+        M[others, k] = M[k, others]
+    return M
+
+
+def _newton_euler(tree, kinematics, base_accelerations, gravity):
+    """Returns the generalized forces, shape(24, N), and the momentum rates,
+    shape(6, N), of one chunk of samples (see :py:func:`inverse_dynamics`),
+    from the output of :py:func:`_kinematics` with accelerations."""
+    (rot_mats, offsets, axes, positions, omega, velocities, alpha,
+     accelerations) = kinematics
+    n = positions.shape[-1]
+
+    # Newton-Euler equations of the segments. The moment is computed in the
+    # segment's frame, where its inertia is constant.
+    arms = _rotate(rot_mats, tree.rel_centers_of_mass.T[..., np.newaxis])
+    center_accelerations = (accelerations + _cross(alpha, arms) +
+                            _cross(omega, _cross(omega, arms)))
+    if base_accelerations is not None:
+        center_accelerations += base_accelerations.T[:, np.newaxis]
+    rel_inertias = np.transpose(tree.rel_inertias, (1, 2, 0))[...,
+                                                               np.newaxis]
+    body_omega = (rot_mats[0] * omega[0] + rot_mats[1] * omega[1] +
+                  rot_mats[2] * omega[2])
+    body_alpha = (rot_mats[0] * alpha[0] + rot_mats[1] * alpha[1] +
+                  rot_mats[2] * alpha[2])
+    moments = _rotate(rot_mats, _rotate(rel_inertias, body_alpha) +
+                      _cross(body_omega, _rotate(rel_inertias, body_omega)))
+    masses = tree.masses[:, np.newaxis]
+    segment_forces = masses * center_accelerations
+
+    momentum_rates = np.empty((6, n))
+    momentum_rates[3:] = segment_forces.sum(axis=1)
+    centers = positions + arms
+    center_of_mass = (masses * centers).sum(axis=1) / tree.mass
+    momentum_rates[:3] = (moments.sum(axis=1) +
+                          _cross(centers, segment_forces).sum(axis=1) -
+                          _cross(center_of_mass, momentum_rates[3:]))
+    segment_forces -= masses * np.asarray(gravity,
+                                          dtype=float)[:, np.newaxis,
+                                                       np.newaxis]
+
+    # Backward pass: the force and the moment about its joint center that
+    # each subtree receives from its parent.
+    moments += _cross(arms, segment_forces)
+    for i in range(len(tree.parents) - 1, 0, -1):
+        parent = tree.parents[i]
+        segment_forces[:, parent] += segment_forces[:, i]
+        moments[:, parent] += moments[:, i] + _cross(offsets[i],
+                                                     segment_forces[:, i])
+
+    forces = np.empty((len(coordinate_names), n))
+    forces[:3] = segment_forces[:, 0]
+    for i, indices in enumerate(tree.joint_indices):
+        for k, index in enumerate(indices):
+            if index >= 0:
+                forces[3 + index] = (axes[i][k] * moments[:, i]).sum(axis=0)
+    return forces, momentum_rates
+
+
+def inverse_dynamics(human, CFGs, CFG_rates=None, CFG_accelerations=None,
+                     times=None, base_accelerations=None,
+                     gravity=(0.0, 0.0, -9.81), tree=None, chunk_size=4096):
+    """Computes the generalized forces that produce a motion of the human,
+    with the recursive Newton-Euler algorithm, for many samples (e.g. the
+    frames of a motion capture trial). The work is linear in the number of
+    segments.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    CFGs : dict, sequence of dict, or array_like, shape(N, 21)
+        Configurations, see :py:meth:`yeadon.Human.CFG_to_array`.
+    CFG_rates : dict, sequence of dict, or array_like, shape(N, 21), optional
+        Joint angle rates (rad/s), in the same layout as `CFGs`.
+    CFG_accelerations : dict, sequence of dict, or array_like, optional
+        Joint angle accelerations (rad/s^2), in the same layout as `CFGs`.
+    times : float or array_like, shape(N,), optional
+        If the rates or the accelerations are not given, they are obtained
+        by differentiating `CFGs`, or `CFG_rates`, respectively (see
+        :py:func:`joint_rates`), which are then samples at these times, or
+        with this time step.
+    base_accelerations : array_like, shape(N, 3) or shape(3,), optional
+        Acceleration of the origin of the pelvis (m/s^2), in the global
+        frame. By default, zero.
+    gravity : array_like, shape(3,), optional
+        Gravitational acceleration (m/s^2), in the global frame.
+    tree : :py:class:`yeadon.tree.SegmentTree`, optional
+        The tree of the human, if it has already been created.
+    chunk_size : int, optional
+        Number of samples that are processed at once. Chunks of a few
+        thousand samples fit in the processor's cache.
+
+    Returns
+    -------
+    forces : np.ndarray, shape(N, 24)
+        Generalized forces of the coordinates of `coordinate_names`: for the
+        translation, the external force on the human (N); for the joint
+        angles, the torque (N-m) about the axis of the angle, exerted on the
+        segment by its parent (for the orientation of the pelvis, the
+        external moment about the origin of the pelvis).
+    momentum_rates : np.ndarray, shape(N, 6)
+        Rate of change of the angular momentum of the human about its center
+        of mass, and of its linear momentum, in the global frame.
+
+    Notes
+    -----
+    The forward pass computes the orientation, angular velocity, and angular
+    acceleration of the segments and the accelerations of their centers of
+    mass, as :py:meth:`yeadon.tree.SegmentTree.accelerations` does. The
+    Newton-Euler equations of each segment give the force m (a - g) and the
+    moment I alpha + omega x I omega about its center of mass, which the
+    backward pass accumulates to the joint center of each subtree. The
+    torque of an angle is the component of the subtree's moment along the
+    angle's axis. As in :py:func:`momentum`, the segment inertias are
+    rotated as R * I * R^T.
+
+    """
+    CFGs = human.CFG_to_array(CFGs)
+    CFG_rates = _derivatives(human, CFGs, CFG_rates, times, 'CFG_rates')
+    CFG_accelerations = _derivatives(human, CFG_rates, CFG_accelerations,
+                                     times, 'CFG_accelerations')
+    if base_accelerations is not None:
+        base_accelerations = np.broadcast_to(
+                np.asarray(base_accelerations, dtype=float), (len(CFGs), 3))
+    if tree is None:
+        tree = SegmentTree(human)
+
+    forces = np.empty((len(CFGs), len(coordinate_names)))
+    momentum_rates = np.empty((len(CFGs), 6))
+    for start in range(0, len(CFGs), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        kinematics = _kinematics(tree, CFGs[chunk], CFG_rates[chunk],
+                                 CFG_accelerations[chunk])
+        forces[chunk].T[:], momentum_rates[chunk].T[:] = _newton_euler(
+                tree, kinematics, None if base_accelerations is None else
+                base_accelerations[chunk], gravity)
+    return forces, momentum_rates
+
+
+def forward_dynamics(human, CFGs, CFG_rates, forces,
+                     gravity=(0.0, 0.0, -9.81), tree=None):
+    """Computes the accelerations of the generalized coordinates of the
+    floating-base human that result from generalized forces (e.g. joint
+    torques), for many states, by solving M(q) q'' = forces - C(q, q').
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    CFGs : dict, sequence of dict, or array_like, shape(N, 21)
+        Configurations, see :py:meth:`yeadon.Human.CFG_to_array`.
+    CFG_rates : dict, sequence of dict, or array_like, shape(N, 21)
+        Joint angle rates (rad/s), in the same layout as `CFGs`. The
+        velocity of the base does not affect the accelerations.
+    forces : array_like, shape(N, 24) or shape(24,)
+        Generalized forces of the coordinates of `coordinate_names`, as
+        returned by :py:func:`inverse_dynamics`: the external force on the
+        human, the external moment on the pelvis, and the joint torques.
+    gravity : array_like, shape(3,), optional
+        Gravitational acceleration (m/s^2), in the global frame.
+    tree : :py:class:`yeadon.tree.SegmentTree`, optional
+        The tree of the human, if it has already been created.
+
+    Returns
+    -------
+    accelerations : np.ndarray, shape(N, 24)
+        Second time derivatives of the coordinates of `coordinate_names`.
+
+    Notes
+    -----
+    The mass matrix M is formed with the composite rigid body algorithm
+    (:py:func:`mass_matrix`), and the Coriolis, centrifugal, and
+    gravitational forces C with the recursive Newton-Euler algorithm at zero
+    acceleration (:py:func:`inverse_dynamics`).
+
+    """
+    CFGs = human.CFG_to_array(CFGs)
+    CFG_rates = _derivatives(human, CFGs, CFG_rates, None, 'CFG_rates')
+    if tree is None:
+        tree = SegmentTree(human)
+    kinematics = _kinematics(tree, CFGs, CFG_rates, np.zeros(CFGs.shape))
+    M = _composite_rigid_body(tree, kinematics)
+    bias = _newton_euler(tree, kinematics, None, gravity)[0]
+    return np.linalg.solve(np.moveaxis(M, -1, 0),
+                           (forces - bias.T)[..., np.newaxis])[..., 0]
+
+
+class Simulation(object):
+    """The result of a simulation of the floating-base human driven by
+    generalized forces. Create it with :py:func:`simulate`.
+
+    Attributes
+    ----------
+    times : np.ndarray, shape(M,)
+        Times of the output samples (s).
+    coordinates : np.ndarray, shape(M, 24) or shape(F, M, 24)
+        Generalized coordinates at each sample, see `coordinate_names`.
+    rates : np.ndarray, shape(M, 24) or shape(F, M, 24)
+        Time derivatives of `coordinates`.
+    accelerations : np.ndarray, shape(M, 24) or shape(F, M, 24)
+        Second time derivatives of `coordinates`.
+    n_steps : int
+        Number of steps of the integrator.
+    n_evaluations : int
+        Number of evaluations of the forward dynamics.
+
+    """
+
+    def __init__(self, times, coordinates, rates, accelerations, solution):
+        self.times = times
+        self.coordinates = coordinates
+        self.rates = rates
+        self.accelerations = accelerations
+        self.n_steps = solution.n_steps
+        self.n_evaluations = solution.n_evaluations
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def CFGs(self):
+        """The joint angles of each sample, in the order of
+        Human.CFGnames."""
+        return self.coordinates[..., 3:]
+
+
+def simulate(human, coordinates, rates, forces, duration, times=None,
+             gravity=(0.0, 0.0, -9.81), step=None, rtol=1e-6, atol=1e-8,
+             tree=None):
+    """Simulates the motion of the floating-base human driven by generalized
+    forces (e.g. joint torques from muscle torque generators), from one or
+    many initial states.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    coordinates, rates : array_like, shape(24,) or shape(F, 24)
+        Initial generalized coordinates (see `coordinate_names`) and their
+        rates, for one simulation or for F simulations that are integrated
+        together (e.g. for a Monte Carlo analysis).
+    forces : array_like or callable
+        Generalized forces, see :py:func:`forward_dynamics`: constant, with
+        shape(24,) or shape(F, 24), or forces(t, coordinates, rates), which
+        returns them from the time and the state, each of shape(F, 24).
+    duration : float
+        Simulated time (s).
+    times : array_like, shape(M,), optional
+        Times at which the state is returned, between 0 and `duration`. By
+        default, at the start and at the end of every step.
+    gravity : array_like, shape(3,), optional
+        Gravitational acceleration (m/s^2), in the global frame.
+    step : float, optional
+        If given, the equations of motion are integrated with the fixed step
+        fourth order Runge-Kutta method, with steps no longer than this (see
+        :py:func:`yeadon.integrate.runge_kutta`). By default, with the
+        adaptive Dormand-Prince method (see
+        :py:func:`yeadon.integrate.dormand_prince`).
+    rtol, atol : float, optional
+        Tolerances of the adaptive method.
+    tree : :py:class:`yeadon.tree.SegmentTree`, optional
+        The tree of the human, if it has already been created.
+
+    Returns
+    -------
+    simulation : :py:class:`Simulation`
+
+    """
+    if tree is None:
+        tree = SegmentTree(human)
+    coordinates = np.asarray(coordinates, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    batched = coordinates.ndim == 2 or rates.ndim == 2 or \
+            (not callable(forces) and np.ndim(forces) == 2)
+    n = len(coordinate_names)
+    state = np.concatenate(np.broadcast_arrays(np.atleast_2d(coordinates),
+                                               np.atleast_2d(rates)), axis=1)
+
+    def state_rates(t, state):
+        q, u = state[:, :n], state[:, n:]
+        applied = forces(t, q, u) if callable(forces) else forces
+        return np.concatenate((u, forward_dynamics(
+                human, q[:, 3:], u[:, 3:], applied, gravity, tree)), axis=1)
+
+    if step is None:
+        solution = integrate.dormand_prince(state_rates, 0.0, duration,
+                                            state, rtol=rtol, atol=atol,
+                                            times=times)
+    else:
+        solution = integrate.runge_kutta(state_rates, 0.0, duration, state,
+                                         step, times=times)
+    # Swap the simulations to the first axis.
+    states = np.swapaxes(solution.states, 0, 1)
+    derivatives = np.swapaxes(solution.rates, 0, 1)
+    coordinates, rates = states[..., :n], states[..., n:]
+    accelerations = derivatives[..., n:]
+    if not batched:
+        coordinates, rates = coordinates[0], rates[0]
+        accelerations = accelerations[0]
+    return Simulation(solution.times, coordinates, rates, accelerations,
+                      solution)
@@ -0,0 +1,272 @@
+"""The flight module simulates the aerial movement of a human, as in Yeadon
+(1990): the 18 joint angles other than the orientation of the pelvis (see
+`joint_names`) are prescribed functions of time, and the orientation of the
+pelvis (somersault, tilt, and twist) follows from the conservation of the
+angular momentum about the center of mass, given at take-off.
+
+The orientation is integrated with the adaptive Dormand-Prince method of
+:py:mod:`yeadon.integrate`. The inertia of the human and the angular momentum
+of the joint motion depend only on the joint angles and their rates, so they
+are evaluated with the batched kinematics of
+:py:class:`yeadon.tree.SegmentTree` for all stages of a step at once, and for
+many flights at once; the Human object is never updated.
+
+The orientation angles are those of Human.CFG, i.e. the body-fixed 1-2-3
+rotation of :py:func:`yeadon.inertia.euler_123`, which is singular at a tilt
+of +/- pi/2.
+
+"""
+# Use Python3 integer division rules.
+from __future__ import division
+
+import numpy as np
+
+from . import dynamics
+from . import inertia
+from .human import Human
+from .integrate import dormand_prince
+from .tree import SegmentTree
+
+# The prescribed joint angles, in the order of Human.CFGnames.
+joint_names = tuple(Human.CFGnames[3:])
+
+
+class SampledMotion(object):
+    """Joint angles that are interpolated between samples, with piecewise
+    cubic Hermite polynomials, to prescribe the motion of a flight.
+
+    """
+
+    def __init__(self, times, angles, rates=None):
+        """
+        Parameters
+        ----------
+        times : array_like, shape(K,)
+            Increasing times of the samples (s).
+        angles : array_like, shape(K, 18) or shape(F, K, 18)
+            The angles of `joint_names` at each sample (rad), for one motion
+            or for F motions.
+        rates : array_like, optional
+            The angle rates at the samples (rad/s), in the layout of
+            `angles`. By default, they are obtained with second order finite
+            differences, which needs K >= 3.
+
+        """
+        self.times = np.asarray(times, dtype=float)
+        self.angles = np.asarray(angles, dtype=float)
+        if self.angles.shape[-2:] != (len(self.times), len(joint_names)):
+            raise ValueError("angles must have shape (..., {0}, {1}), not "
+                             "{2}.".format(len(self.times), len(joint_names),
+                                           self.angles.shape))
+        if rates is None:
+            if len(self.times) < 3:
+                raise ValueError("At least 3 samples are needed to "
+                                 "differentiate the joint angles, not "
+                                 "{0}.".format(len(self.times)))
+            rates = np.gradient(self.angles, self.times, axis=-2,
+                                edge_order=2)
+        self.rates = np.asarray(rates, dtype=float)
+
+    def __call__(self, times):
+        """Returns the angles and angle rates at times, shape(S,), as arrays
+        of shape(S, 18) or shape(F, S, 18). Outside of the samples, the
+        first or last polynomial is extrapolated."""
+        times = np.asarray(times, dtype=float)
+        i = np.clip(np.searchsorted(self.times, times) - 1, 0,
+                    len(self.times) - 2)
+        h = (self.times[i + 1] - self.times[i])[:, np.newaxis]
+        s = ((times - self.times[i]) / h[:, 0])[:, np.newaxis]
+        y0, y1 = self.angles[..., i, :], self.angles[..., i + 1, :]
+        m0, m1 = h * self.rates[..., i, :], h * self.rates[..., i + 1, :]
+        angles = (y0 + s * (m0 + s * (3 * (y1 - y0) - 2 * m0 - m1 +
+                                      s * (2 * (y0 - y1) + m0 + m1))))
+        rates = (m0 + s * (6 * (y1 - y0) - 4 * m0 - 2 * m1 +
+                           3 * s * (2 * (y0 - y1) + m0 + m1))) / h
+        return angles, rates
+
+
+class Flight(object):
+    """The result of a simulated flight, or of many flights simulated
+    together. Create it with :py:func:`simulate`.
+
+    Attributes
+    ----------
+    times : np.ndarray, shape(M,)
+        Times of the output samples (s).
+    CFGs : np.ndarray, shape(M, 21) or shape(F, M, 21)
+        Configuration of the human at each sample, with columns in the order
+        of Human.CFGnames.
+    CFG_rates : np.ndarray, shape(M, 21) or shape(F, M, 21)
+        Time derivatives of `CFGs` (rad/s).
+    angular_momentum : np.ndarray, shape(3,) or shape(F, 3)
+        The conserved angular momentum about the center of mass, in the
+        global frame (kg-m^2/s).
+    n_steps : int
+        Number of steps of the integrator.
+    n_evaluations : int
+        Number of evaluations of the equations of motion.
+
+    """
+
+    def __init__(self, times, CFGs, CFG_rates, angular_momentum, solution):
+        self.times = times
+        self.CFGs = CFGs
+        self.CFG_rates = CFG_rates
+        self.angular_momentum = angular_momentum
+        self.n_steps = solution.n_steps
+        self.n_evaluations = solution.n_evaluations
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def orientations(self):
+        """Somersault, tilt, and twist angles at each sample (rad)."""
+        return self.CFGs[..., :3]
+
+    @property
+    def somersault(self):
+        return self.CFGs[..., 0]
+
+    @property
+    def tilt(self):
+        return self.CFGs[..., 1]
+
+    @property
+    def twist(self):
+        return self.CFGs[..., 2]
+
+
+def _configurations(orientations, angles):
+    """Returns configurations, shape(..., 21), from orientations and joint
+    angles that broadcast against each other."""
+    shape = np.broadcast(orientations[..., :1], angles[..., :1]).shape[:-1]
+    CFGs = np.empty(shape + (len(Human.CFGnames),))
+    CFGs[..., :3] = orientations
+    CFGs[..., 3:] = angles
+    return CFGs
+
+
+class _OrientationRates(object):
+    """The derivative of the orientation angles of F flights, shape(F, 3),
+    for :py:func:`yeadon.integrate.dormand_prince`.
+
+    The inertia of the human about its center of mass, I, and the angular
+    momentum h of the joint motion with the pelvis not rotating are
+    evaluated with the orientation angles at zero, in the frame of the
+    pelvis. The angular velocity of the pelvis in its own frame is then
+    I^-1 (E^T H - h), for the conserved angular momentum H and the rotation
+    matrix E of the orientation angles.
+
+    """
+
+    def __init__(self, tree, joint_motion, angular_momentum):
+        self.tree = tree
+        self.joint_motion = joint_motion
+        # In the frame of the pelvis at zero orientation (the coordinate
+        # system of the human).
+        self.angular_momentum = np.dot(angular_momentum,
+                                       tree.root_orientation)
+
+    def prepare(self, times):
+        angles, rates = self.joint_motion(times)
+        zero = np.zeros(3)
+        inertias, momenta = dynamics._centroidal_terms(
+                self.tree, _configurations(zero, angles).reshape((-1, 21)),
+                _configurations(zero, rates).reshape((-1, 21)))
+        R = self.tree.root_orientation
+        shape = angles.shape[:-1] + (3,)
+        self.times = times
+        self.inverse_inertias = np.linalg.inv(
+                np.matmul(np.matmul(R.T, inertias), R)).reshape(shape + (3,))
+        self.relative_momenta = np.dot(momenta, R).reshape(shape)
+
+    def __call__(self, t, orientations):
+        i = np.argmin(np.abs(self.times - t))
+        E = inertia.euler_123_batch(orientations)
+        omega = np.matmul(self.inverse_inertias[..., i, :, :],
+                          (np.matmul(self.angular_momentum[..., np.newaxis, :],
+                                     E)[..., 0, :] -
+                           self.relative_momenta[..., i, :])
+                          [..., np.newaxis])[..., 0]
+        # The rates of the body-fixed 1-2-3 angles from the angular velocity
+        # in the body frame.
+        s2, s3 = np.sin(orientations[..., 1]), np.sin(orientations[..., 2])
+        c2, c3 = np.cos(orientations[..., 1]), np.cos(orientations[..., 2])
+        rates = np.empty(np.shape(omega))
+        rates[..., 0] = (c3 * omega[..., 0] - s3 * omega[..., 1]) / c2
+        rates[..., 1] = s3 * omega[..., 0] + c3 * omega[..., 1]
+        rates[..., 2] = omega[..., 2] - s2 * rates[..., 0]
+        return rates
+
+
+def simulate(human, joint_motion, angular_momentum, duration,
+             orientation=(0.0, 0.0, 0.0), times=None, rtol=1e-8, atol=1e-10,
+             tree=None):
+    """Simulates the flight of a human whose joint angles are prescribed,
+    under conserved angular momentum.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    joint_motion : callable
+        joint_motion(times) returns the angles of `joint_names` (rad) and
+        their rates (rad/s) at times of shape(S,), as two arrays of shape(S,
+        18), or of shape(F, S, 18) for F flights that are simulated
+        together, e.g. a :py:class:`SampledMotion`. Time is zero at
+        take-off.
+    angular_momentum : array_like, shape(3,) or shape(F, 3)
+        Angular momentum about the center of mass (kg-m^2/s), in the global
+        frame.
+    duration : float
+        Flight time (s).
+    orientation : array_like, shape(3,) or shape(F, 3), optional
+        Somersault, tilt, and twist at take-off (rad).
+    times : array_like, shape(M,), optional
+        Times at which the configuration is returned, between 0 and
+        `duration`. By default, at the start and at the end of every step
+        of the integrator.
+    rtol, atol : float, optional
+        Tolerances of the orientation angles, see
+        :py:func:`yeadon.integrate.dormand_prince`.
+    tree : :py:class:`yeadon.tree.SegmentTree`, optional
+        The tree of the human, if it has already been created.
+
+    Returns
+    -------
+    flight : :py:class:`Flight`
+        If any of `joint_motion`, `angular_momentum`, or `orientation` is
+        given for F flights, the configurations have shape(F, M, 21).
+
+    """
+    if tree is None:
+        tree = SegmentTree(human)
+    angular_momentum = np.asarray(angular_momentum, dtype=float)
+    orientation = np.asarray(orientation, dtype=float)
+    angles = joint_motion(np.zeros(1))[0]
+    batched = angles.ndim == 3 or angular_momentum.ndim == 2 or \
+            orientation.ndim == 2
+    n_flights = np.broadcast(angles[..., 0, :1], angular_momentum[..., :1],
+                             orientation[..., :1]).shape[0] if batched else 1
+    angular_momentum = np.broadcast_to(angular_momentum, (n_flights, 3))
+    orientation = np.broadcast_to(orientation, (n_flights, 3))
+    if angles.ndim == 2:
+        def motion(times):
+            angles, rates = joint_motion(times)
+            return (np.broadcast_to(angles, (n_flights,) + angles.shape),
+                    np.broadcast_to(rates, (n_flights,) + rates.shape))
+    else:
+        motion = joint_motion
+
+    rates = _OrientationRates(tree, motion, angular_momentum)
+    solution = dormand_prince(rates, 0.0, duration, orientation, rtol=rtol,
+                              atol=atol, times=times, prepare=rates.prepare)
+    # Swap the flights to the first axis.
+    angles, angle_rates = motion(solution.times)
+    CFGs = _configurations(np.swapaxes(solution.states, 0, 1), angles)
+    CFG_rates = _configurations(np.swapaxes(solution.rates, 0, 1),
+                                angle_rates)
+    if not batched:
+        CFGs, CFG_rates = CFGs[0], CFG_rates[0]
+        angular_momentum = angular_momentum[0]
+    return Flight(solution.times, CFGs, CFG_rates, angular_momentum, solution)
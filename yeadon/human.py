@@ -17,8 +17,10 @@ except ImportError:
     pass
 
 from . import inertia
+from . import mesh
 from . import solid as sol
 from . import segment as seg
+from .tree import Combination, SegmentTree
 from .utils import printoptions
 from .exceptions import YeadonDeprecationWarning
 
@@ -26,7 +28,29 @@ from .exceptions import YeadonDeprecationWarning
 warnings.simplefilter('always', YeadonDeprecationWarning)
 
 
+class _MeasurementRecorder(dict):
+    """Records the names of the measurements that a function of the
+    measurements reads, see Human._measurement_map."""
+
+    def __init__(self):
+        super(_MeasurementRecorder, self).__init__()
+        self.names = set()
+
+    def __getitem__(self, name):
+        self.names.add(name)
+        return 1.0
+
+
 class Human(object):
+    # Names of the solids and segments for combine_inertia, in the order of
+    # Human._s, _a_solids, _b_solids, _j_solids, _k_solids, and segments.
+    solid_keys = ('s0', 's1', 's2', 's3', 's4', 's5', 's6', 's7',
+                  'a0', 'a1', 'a2', 'a3', 'a4', 'a5', 'a6',
+                  'b0', 'b1', 'b2', 'b3', 'b4', 'b5', 'b6',
+                  'j0', 'j1', 'j2', 'j3', 'j4', 'j5', 'j6', 'j7', 'j8',
+                  'k0', 'k1', 'k2', 'k3', 'k4', 'k5', 'k6', 'k7', 'k8')
+    segment_keys = ('P', 'T', 'C', 'A1', 'A2', 'B1', 'B2', 'J1', 'J2', 'K1',
+                    'K2')
     measnames = ('Ls1L', 'Ls2L', 'Ls3L', 'Ls4L', 'Ls5L', 'Ls6L', 'Ls7L',
                  'Ls8L', 'Ls0p', 'Ls1p', 'Ls2p', 'Ls3p', 'Ls5p', 'Ls6p',
                  'Ls7p', 'Ls0w', 'Ls1w', 'Ls2w', 'Ls3w', 'Ls4w', 'Ls4d',
@@ -43,6 +67,50 @@ class Human(object):
                  'Lk1p', 'Lk2p', 'Lk3p', 'Lk4p', 'Lk5p', 'Lk6p', 'Lk7p',
                  'Lk8p', 'Lk9p', 'Lk8w', 'Lk9w', 'Lk6d')
 
+    # Indices into measnames of the measurements of the left limbs, and of
+    # the corresponding measurements of the right limbs (the torso is not
+    # averaged): [21, 38] U [57, 75] are the left limbs, and [39, 57] U
+    # [76, 95] are the right limbs.
+    _left_limb_indices = np.hstack((np.arange(21, 39), np.arange(57, 76)))
+    _right_limb_indices = np.hstack((np.arange(39, 57), np.arange(76, 95)))
+
+    # The measurements on each line of an input file for Yeadon's ISEG code,
+    # see write_meas_for_ISEG.
+    _ISEG_layout = (
+            # pelvis, torso, chest-head
+            ('Ls1L', 'Ls2L', 'Ls3L', 'Ls4L', 'Ls5L', 'Ls6L', 'Ls7L', 'Ls8L'),
+            ('Ls0p', 'Ls1p', 'Ls2p', 'Ls3p', 'Ls5p', 'Ls6p', 'Ls7p'),
+            ('Ls0w', 'Ls1w', 'Ls2w', 'Ls3w', 'Ls4w', 'Ls4d'),
+            # arms
+            ('La2L', 'La3L', 'La4L', 'La5L', 'La6L', 'La7L'),
+            ('La0p', 'La1p', 'La2p', 'La3p', 'La4p', 'La5p', 'La6p', 'La7p'),
+            ('La4w', 'La5w', 'La6w', 'La7w'),
+            ('Lb2L', 'Lb3L', 'Lb4L', 'Lb5L', 'Lb6L', 'Lb7L'),
+            ('Lb0p', 'Lb1p', 'Lb2p', 'Lb3p', 'Lb4p', 'Lb5p', 'Lb6p', 'Lb7p'),
+            ('Lb4w', 'Lb5w', 'Lb6w', 'Lb7w'),
+            # legs
+            ('Lj1L', 'Lj3L', 'Lj4L', 'Lj5L', 'Lj6L', 'Lj8L', 'Lj9L'),
+            ('Lj1p', 'Lj2p', 'Lj3p', 'Lj4p', 'Lj5p', 'Lj6p', 'Lj7p', 'Lj8p',
+             'Lj9p'),
+            ('Lj6d', 'Lj8w', 'Lj9w'),
+            ('Lk1L', 'Lk3L', 'Lk4L', 'Lk5L', 'Lk6L', 'Lk8L', 'Lk9L'),
+            ('Lk1p', 'Lk2p', 'Lk3p', 'Lk4p', 'Lk5p', 'Lk6p', 'Lk7p', 'Lk8p',
+             'Lk9p'),
+            ('Lk6d', 'Lk8w', 'Lk9w'))
+    # A single template for a whole ISEG file. The last line contains ISEG's
+    # "XHEIGHT" and "XMASS" variables.
+    _ISEG_template = ''.join(','.join(['%1.1f'] * len(line)) + '\n'
+                             for line in _ISEG_layout) + '%s,%s\n'
+    _ISEG_names = sum(_ISEG_layout, ())
+
+    # Number of points along each direction of the meshes of the inertia
+    # ellipsoid and of a sphere octant, for each level of detail (see
+    # yeadon.solid.mesh_levels).
+    n_ellipsoid_points = {'low': 16, 'medium': 50, 'high': 100}
+    n_sphere_octant_points = {'low': 8, 'medium': 30, 'high': 60}
+    # Unit spheres for the inertia ellipsoid, by level of detail.
+    _unit_spheres = dict()
+
     CFGnames = ('somersault',
                 'tilt',
                 'twist',
@@ -136,8 +204,166 @@ class Human(object):
         [1070, 1019, 1019, 1019, 1056, 1089, 1109, 1044, 1085, 1084])),
         }
 
+    # The stadium levels, for each list of levels: the label, the type of
+    # input (see yeadon.solid.Stadium), the names of the measurements of the
+    # two inputs, and the alignment. 'acromion' and 'hip' levels are derived
+    # from the Ls4 and Ls0 levels, whose measurements are listed.
+    _stadium_definitions = {
+        '_Ls': (
+            ('Ls0: hip joint centre', 'perimwidth', 'Ls0p', 'Ls0w', 'ML'),
+            ('Ls1: umbilicus', 'perimwidth', 'Ls1p', 'Ls1w', 'ML'),
+            ('Ls2: lowest front rib', 'perimwidth', 'Ls2p', 'Ls2w', 'ML'),
+            ('Ls3: nipple', 'perimwidth', 'Ls3p', 'Ls3w', 'ML'),
+            ('Ls4: shoulder joint centre', 'depthwidth', 'Ls4d', 'Ls4w',
+             'ML'),
+            ('Ls5: acromion', 'acromion', 'Ls4d', 'Ls4w', 'ML'),
+            ('Ls5: acromion/bottom of neck', 'perimeter', 'Ls5p', '', 'ML'),
+            ('Ls6: beneath nose', 'perimeter', 'Ls6p', '', 'ML'),
+            ('Ls7: above ear', 'perimeter', 'Ls7p', '', 'ML')),
+        '_La': (
+            ('La0: shoulder joint centre', 'perimeter', 'La0p', '', 'ML'),
+            ('La1: mid-arm', 'perimeter', 'La1p', '', 'ML'),
+            ('La2: elbow joint centre', 'perimeter', 'La2p', '', 'ML'),
+            ('La3: maximum forearm perimeter', 'perimeter', 'La3p', '',
+             'ML'),
+            ('La4: wrist joint centre', 'perimwidth', 'La4p', 'La4w',
+             'ML'),
+            ('La5: base of thumb', 'perimwidth', 'La5p', 'La5w', 'ML'),
+            ('La6: knuckles', 'perimwidth', 'La6p', 'La6w', 'ML'),
+            ('La7: fingernails', 'perimwidth', 'La7p', 'La7w', 'ML')),
+        '_Lb': (
+            ('Lb0: shoulder joint centre', 'perimeter', 'Lb0p', '', 'ML'),
+            ('Lb1: mid-arm', 'perimeter', 'Lb1p', '', 'ML'),
+            ('Lb2: elbow joint centre', 'perimeter', 'Lb2p', '', 'ML'),
+            ('Lb3: maximum forearm perimeter', 'perimeter', 'Lb3p', '',
+             'ML'),
+            ('Lb4: wrist joint centre', 'perimwidth', 'Lb4p', 'Lb4w',
+             'ML'),
+            ('Lb5: base of thumb', 'perimwidth', 'Lb5p', 'Lb5w', 'ML'),
+            ('Lb6: knuckles', 'perimwidth', 'Lb6p', 'Lb6w', 'ML'),
+            ('Lb7: fingernails', 'perimwidth', 'Lb7p', 'Lb7w', 'ML')),
+        '_Lj': (
+            ('Lj0: hip joint centre', 'hip', 'Ls0p', 'Ls0w', 'ML'),
+            ('Lj1: crotch', 'perimeter', 'Lj1p', '', 'ML'),
+            ('Lj2: mid-thigh', 'perimeter', 'Lj2p', '', 'ML'),
+            ('Lj3: knee joint centre', 'perimeter', 'Lj3p', '', 'ML'),
+            ('Lj4: maximum calf perimeter', 'perimeter', 'Lj4p', '', 'ML'),
+            ('Lj5: ankle joint centre', 'perimeter', 'Lj5p', '', 'ML'),
+            ('Lj6: heel', 'perimwidth', 'Lj6p', 'Lj6d', 'AP'),
+            ('Lj7: arch', 'perimeter', 'Lj7p', '', 'ML'),
+            ('Lj8: ball', 'perimwidth', 'Lj8p', 'Lj8w', 'ML'),
+            ('Lj9: toe nails', 'perimwidth', 'Lj9p', 'Lj9w', 'ML')),
+        '_Lk': (
+            ('Lk0: hip joint centre', 'hip', 'Ls0p', 'Ls0w', 'ML'),
+            ('Lk1: crotch', 'perimeter', 'Lk1p', '', 'ML'),
+            ('Lk2: mid-thigh', 'perimeter', 'Lk2p', '', 'ML'),
+            ('Lk3: knee joint centre', 'perimeter', 'Lk3p', '', 'ML'),
+            ('Lk4: maximum calf perimeter', 'perimeter', 'Lk4p', '', 'ML'),
+            ('Lk5: ankle joint centre', 'perimeter', 'Lk5p', '', 'ML'),
+            ('Lk6: heel', 'perimwidth', 'Lk6p', 'Lk6d', 'AP'),
+            ('Lk7: arch', 'perimeter', 'Lk7p', '', 'ML'),
+            ('Lk8: ball', 'perimwidth', 'Lk8p', 'Lk8w', 'ML'),
+            ('Lk9: toe nails', 'perimwidth', 'Lk9p', 'Lk9w', 'ML')),
+        }
+
+    # The solids, in the order of solid_keys: the key, the label, the
+    # density set, the stadium levels (list of levels, index of the lower
+    # stadium, and index of the upper stadium) or the measurement of the base
+    # perimeter of a semiellipsoid, and the height as a function of the
+    # measurements. The limbs are built from the proximal joint outward,
+    # with the upper stadium proximal.
+    _solid_definitions = (
+        ('s0', 's0: hip joint centre', 'abdomen-pelvis', ('_Ls', 0, 1),
+         lambda meas: meas['Ls1L']),
+        ('s1', 's1: umbilicus', 'abdomen-pelvis', ('_Ls', 1, 2),
+         lambda meas: meas['Ls2L'] - meas['Ls1L']),
+        ('s2', 's2: lowest front rib', 'thorax', ('_Ls', 2, 3),
+         lambda meas: meas['Ls3L'] - meas['Ls2L']),
+        ('s3', 's3: nipple', 'thorax', ('_Ls', 3, 4),
+         lambda meas: meas['Ls4L'] - meas['Ls3L']),
+        ('s4', 's4: shoulder joint centre', 'shoulders', ('_Ls', 4, 5),
+         lambda meas: meas['Ls5L'] - meas['Ls4L']),
+        ('s5', 's5: acromion', 'head-neck', ('_Ls', 6, 7),
+         lambda meas: meas['Ls6L']),
+        ('s6', 's6: beneath nose', 'head-neck', ('_Ls', 7, 8),
+         lambda meas: meas['Ls7L'] - meas['Ls6L']),
+        ('s7', 's7: above ear', 'head-neck', 'Ls7p',
+         lambda meas: meas['Ls8L'] - meas['Ls7L']),
+        ('a0', 'a0: shoulder joint centre', 'upper-arm', ('_La', 1, 0),
+         lambda meas: meas['La2L'] * 0.5),
+        ('a1', 'a1: mid-arm', 'upper-arm', ('_La', 2, 1),
+         lambda meas: meas['La2L'] - meas['La2L'] * 0.5),
+        ('a2', 'a2: elbow joint centre', 'forearm', ('_La', 3, 2),
+         lambda meas: meas['La3L'] - meas['La2L']),
+        ('a3', 'a3: maximum forearm perimeter', 'forearm', ('_La', 4, 3),
+         lambda meas: meas['La4L'] - meas['La3L']),
+        ('a4', 'a4: wrist joint centre', 'hand', ('_La', 5, 4),
+         lambda meas: meas['La5L']),
+        ('a5', 'a5: base of thumb', 'hand', ('_La', 6, 5),
+         lambda meas: meas['La6L'] - meas['La5L']),
+        ('a6', 'a6: knuckles', 'hand', ('_La', 7, 6),
+         lambda meas: meas['La7L'] - meas['La6L']),
+        # The solids of the right arm are built from the stadia of the left
+        # arm, with the lengths of the right arm.
+        ('b0', 'b0: shoulder joint centre', 'upper-arm', ('_La', 1, 0),
+         lambda meas: meas['Lb2L'] * 0.5),
+        ('b1', 'b1: mid-arm', 'upper-arm', ('_La', 2, 1),
+         lambda meas: meas['Lb2L'] - meas['Lb2L'] * 0.5),
+        ('b2', 'b2: elbow joint centre', 'forearm', ('_La', 3, 2),
+         lambda meas: meas['Lb3L'] - meas['Lb2L']),
+        ('b3', 'b3: maximum forearm perimeter', 'forearm', ('_La', 4, 3),
+         lambda meas: meas['Lb4L'] - meas['Lb3L']),
+        ('b4', 'b4: wrist joint centre', 'hand', ('_La', 5, 4),
+         lambda meas: meas['Lb5L']),
+        ('b5', 'b5: base of thumb', 'hand', ('_La', 6, 5),
+         lambda meas: meas['Lb6L'] - meas['Lb5L']),
+        ('b6', 'b6: knuckles', 'hand', ('_La', 7, 6),
+         lambda meas: meas['Lb7L'] - meas['Lb6L']),
+        ('j0', 'j0: hip joint centre', 'thigh', ('_Lj', 1, 0),
+         lambda meas: meas['Lj1L']),
+        ('j1', 'j1: crotch', 'thigh', ('_Lj', 2, 1),
+         lambda meas: (meas['Lj3L'] + meas['Lj1L']) * 0.5 - meas['Lj1L']),
+        ('j2', 'j2: mid-thigh', 'thigh', ('_Lj', 3, 2),
+         lambda meas: meas['Lj3L'] - (meas['Lj3L'] + meas['Lj1L']) * 0.5),
+        ('j3', 'j3: knee joint centre', 'lower-leg', ('_Lj', 4, 3),
+         lambda meas: meas['Lj4L'] - meas['Lj3L']),
+        ('j4', 'j4: maximum calf perimeter', 'lower-leg', ('_Lj', 5, 4),
+         lambda meas: meas['Lj5L'] - meas['Lj4L']),
+        ('j5', 'j5: ankle joint centre', 'foot', ('_Lj', 6, 5),
+         lambda meas: meas['Lj6L']),
+        ('j6', 'j6: heel', 'foot', ('_Lj', 7, 6),
+         lambda meas: (meas['Lj8L'] + meas['Lj6L']) * 0.5 - meas['Lj6L']),
+        ('j7', 'j7: arch', 'foot', ('_Lj', 8, 7),
+         lambda meas: meas['Lj8L'] - (meas['Lj8L'] + meas['Lj6L']) * 0.5),
+        ('j8', 'j8: ball', 'foot', ('_Lj', 9, 8),
+         lambda meas: meas['Lj9L'] - meas['Lj8L']),
+        ('k0', 'k0: hip joint centre', 'thigh', ('_Lk', 1, 0),
+         lambda meas: meas['Lk1L']),
+        ('k1', 'k1: crotch', 'thigh', ('_Lk', 2, 1),
+         lambda meas: (meas['Lk3L'] + meas['Lk1L']) * 0.5 - meas['Lk1L']),
+        ('k2', 'k2: mid-thigh', 'thigh', ('_Lk', 3, 2),
+         lambda meas: meas['Lk3L'] - (meas['Lk3L'] + meas['Lk1L']) * 0.5),
+        ('k3', 'k3: knee joint centre', 'lower-leg', ('_Lk', 4, 3),
+         lambda meas: meas['Lk4L'] - meas['Lk3L']),
+        ('k4', 'k4: maximum calf perimeter', 'lower-leg', ('_Lk', 5, 4),
+         lambda meas: meas['Lk5L'] - meas['Lk4L']),
+        ('k5', 'k5: ankle joint centre', 'foot', ('_Lk', 6, 5),
+         lambda meas: meas['Lk6L']),
+        ('k6', 'k6: heel', 'foot', ('_Lk', 7, 6),
+         lambda meas: (meas['Lk8L'] + meas['Lk6L']) * 0.5 - meas['Lk6L']),
+        ('k7', 'k7: arch', 'foot', ('_Lk', 8, 7),
+         lambda meas: meas['Lk8L'] - (meas['Lk8L'] + meas['Lk6L']) * 0.5),
+        ('k8', 'k8: ball', 'foot', ('_Lk', 9, 8),
+         lambda meas: meas['Lk9L'] - meas['Lk8L']),
+        )
+    # The stadium levels whose widths place the shoulders and the hips (see
+    # _define_segments).
+    _placement_stadia = (('_Ls', 0), ('_Ls', 4))
+    # What is built from each measurement, see _measurement_map.
+    _measurement_dependencies = None
+
     def __init__(self, meas_in, CFG=None, symmetric=True,
-            density_set='Dempster'):
+            density_set='Dempster', mesh_level='medium'):
         """Initializes a human object. Stores inputs as instance variables,
         defines the names of the configuration variables (CFG) in a class
         tuple, defines the bounds on the configuration variables in a class 2D
@@ -173,8 +399,16 @@ class Human(object):
             Selects a set of densities to use for the body segments. Either
             'Chandler', 'Clauser', or 'Dempster'. 'Dempster' is the default.
             See class attribute `segmental_densities` to inspect their values.
+        mesh_level : str, optional
+            Level of detail of the meshes that are used to draw and export
+            the human: 'low', 'medium' (default), or 'high'. Can be changed
+            with the attribute `mesh_level`, or overridden in each call to
+            draw or export.
 
         """
+        sol.check_mesh_level(mesh_level)
+        self.mesh_level = mesh_level
+
         # Initialize position and orientation of entire body.
         self._coord_sys_pos = np.array([[0],[0],[0]])
         self._coord_sys_orient = inertia.rotate_space_123((0,0,0))
@@ -199,6 +433,10 @@ class Human(object):
         if self.is_symmetric == True:
             self._average_limbs()
 
+        # Densities and geometry of individual solids that replace those from
+        # the measurements, by solid label; see set_solid_override.
+        self.solid_overrides = dict()
+
         # Start off a zero configuration.
         self.CFG = dict()
         for key in Human.CFGnames:
@@ -227,6 +465,13 @@ class Human(object):
         self._define_torso_solids()
         self._define_arm_solids()
         self._define_leg_solids()
+        # The overrides are applied to the new solids.
+        self._solid_defaults = dict()
+        solids = dict(zip(self.solid_keys,
+                          self._s + self._a_solids + self._b_solids +
+                          self._j_solids + self._k_solids))
+        for label in self.solid_overrides:
+            self._apply_solid_override(label, solids[label])
         self._update_segments()
 
     def _update_segments(self):
@@ -247,6 +492,28 @@ class Human(object):
             s.calc_properties()
         # Must update segment properties before updating the human properties.
         self.calc_properties()
+        self._index_objects()
+
+    def _index_objects(self):
+        """Builds the lookup tables of the solids and segments by name, used
+        by yeadon.Human.combine_inertia and
+        yeadon.Human.get_segment_by_name.
+
+        """
+        solids = (self._s + self._a_solids + self._b_solids +
+                  self._j_solids + self._k_solids)
+        self._objects = dict(zip(self.solid_keys + self.segment_keys,
+                                 solids + self.segments))
+        # The segment that each solid is part of.
+        self._solid_parents = dict()
+        for segkey, segment in zip(self.segment_keys, self.segments):
+            for solid in segment.solids:
+                self._solid_parents[solid.label[0:2]] = segkey
+        # Every prefix of a label identifies the first segment with it.
+        self._segment_index = dict()
+        for i, segment in enumerate(self.segments):
+            for length in range(len(segment.label) + 1):
+                self._segment_index.setdefault(segment.label[0:length], i)
 
     def _validate_CFG(self):
         """Validates the joint angle degrees of freedom against the CFG bounds
@@ -284,17 +551,12 @@ class Human(object):
         left and right measurements.
 
         """
-        # make a list of indices to the correct measurements (torso is not
-        # averaged)
-        # [21, 38] U [57, 75] are the left limbs.
-        # [39, 57] U [76, 95] are the right limbs.
-        leftidxs = np.hstack((np.arange(21, 39), np.arange(57, 76)))
-        rightidx = np.hstack((np.arange(39, 57), np.arange(76, 95)))
-        for i in np.arange(len(leftidxs)):
-            avg = 0.5 * (self.meas[Human.measnames[leftidxs[i]]] +
-                         self.meas[Human.measnames[rightidx[i]]])
-            self.meas[Human.measnames[leftidxs[i]]] = avg
-            self.meas[Human.measnames[rightidx[i]]] = avg
+        for left, right in zip(self._left_limb_indices,
+                               self._right_limb_indices):
+            avg = 0.5 * (self.meas[Human.measnames[left]] +
+                         self.meas[Human.measnames[right]])
+            self.meas[Human.measnames[left]] = avg
+            self.meas[Human.measnames[right]] = avg
 
     def set_CFG(self, varname, value):
         """Allows the user to set a single configuration variable in CFG. CFG
@@ -357,6 +619,39 @@ class Human(object):
         self.CFG = CFG
         self._update_segments()
 
+    @classmethod
+    def CFG_to_array(cls, CFG):
+        """Returns one or many configurations as an array, with columns in
+        the order of Human.CFGnames. This is the layout that the batched
+        methods take as input.
+
+        Parameters
+        ----------
+        CFG : dict, sequence of dict, or array_like, shape(21,) or shape(N, 21)
+            Configurations, as dictionaries like Human.CFG or as arrays whose
+            columns are already in the order of Human.CFGnames.
+
+        Returns
+        -------
+        CFGs : np.ndarray, shape(N, 21)
+            The configurations (radians), one per row.
+
+        """
+        if isinstance(CFG, dict):
+            CFG = [CFG]
+        if len(CFG) > 0 and isinstance(CFG[0], dict):
+            for config in CFG:
+                for key in config:
+                    if key not in cls.CFGnames:
+                        raise ValueError("'{0}' is not a correct variable "
+                                "name.".format(key))
+            CFG = [[config[key] for key in cls.CFGnames] for config in CFG]
+        CFGs = np.atleast_2d(np.asarray(CFG, dtype=float))
+        if CFGs.ndim != 2 or CFGs.shape[1] != len(cls.CFGnames):
+            raise ValueError("Configurations must have shape (N, {0}), not "
+                    "{1}.".format(len(cls.CFGnames), CFGs.shape))
+        return CFGs
+
     def calc_properties(self):
         """Calculates the mass, center of mass, and inertia tensor of the
         human. The quantities are calculated from the segment quantities.
@@ -560,6 +855,71 @@ Inertia tensor in global frame about human's COM (kg-m^2):
 
         return transformed
 
+    def inertia_transformed_batch(self, pos=None, rotmat=None, CFGs=None):
+        """Returns the inertia tensors of the human about many points and in
+        many frames, optionally for many configurations: the vectorized
+        version of :py:meth:`inertia_transformed`, which returns the tensor
+        for every combination of point and frame at once. This method does
+        NOT alter any attributes of the Human.
+
+        Parameters
+        ----------
+        pos : array_like, shape(P, 3) or shape(N, P, 3), optional
+            Positions of the points, from the origin of the global frame and
+            expressed in the global frame; with shape(N, P, 3), different
+            points for each configuration. If not provided, the tensors are
+            about the center of mass of the human.
+        rotmat : array_like, shape(R, 3, 3) or shape(N, R, 3, 3), optional
+            Rotation matrices ^{N}R^{B} of the frames B in which the tensors
+            are expressed (see :py:meth:`inertia_transformed`); with
+            shape(N, R, 3, 3), different frames for each configuration. If
+            not provided, the tensors are expressed in the global frame.
+        CFGs : dict, sequence of dict, or array_like, shape(N, 21), optional
+            Configurations, see :py:meth:`CFG_to_array`. By default, the
+            current configuration of the human only.
+
+        Returns
+        -------
+        transformed : np.ndarray, shape([N,] [P,] [R,] 3, 3)
+            The tensor about each point (if `pos` is given) in each frame (if
+            `rotmat` is given), for each configuration (if `CFGs` is given).
+
+        """
+        if CFGs is None:
+            center_of_mass = np.ravel(self.center_of_mass)
+            transformed = np.asarray(self.inertia)
+        else:
+            CFGs = self.CFG_to_array(CFGs)
+            center_of_mass, transformed = \
+                    SegmentTree(self).mass_properties(CFGs)
+        n_batch = 0 if CFGs is None else 1
+
+        if pos is not None:
+            pos = np.asarray(pos, dtype=float)
+            if pos.ndim not in (2, 2 + n_batch) or pos.shape[-1] != 3:
+                raise ValueError("pos must have shape {0}, not {1}.".format(
+                    '(P, 3)' if CFGs is None else '(N, P, 3)', pos.shape))
+            if pos.ndim == 2 and CFGs is not None:
+                pos = pos[np.newaxis]
+            transformed = inertia.parallel_axis_batch(
+                    transformed[..., np.newaxis, :, :], self.mass,
+                    pos - center_of_mass[..., np.newaxis, :])
+
+        if rotmat is not None:
+            rotmat = np.asarray(rotmat, dtype=float)
+            if (rotmat.ndim not in (3, 3 + n_batch) or
+                    rotmat.shape[-2:] != (3, 3)):
+                raise ValueError("rotmat must have shape {0}, not {1}.".format(
+                    '(R, 3, 3)' if CFGs is None else '(N, R, 3, 3)',
+                    rotmat.shape))
+            if pos is not None and rotmat.ndim == 4:
+                # Per configuration, the same frames for all points.
+                rotmat = rotmat[:, np.newaxis]
+            transformed = inertia.rotate_inertia_batch(
+                    rotmat, transformed[..., np.newaxis, :, :])
+
+        return transformed
+
     def combine_inertia(self, objlist):
         """Returns the inertia properties of a combination of solids
         and/or segments of the human, using the fixed human frame (or the
@@ -592,43 +952,13 @@ Inertia tensor in global frame about human's COM (kg-m^2):
             Inertia tensor about the combined_COM, expressed in the global frame.
 
         """
-        if objlist == []:
-            raise Exception("Empty input.")
-        # Preparing.
-        solidkeys = [
-                's0','s1','s2','s3','s4','s5','s6','s7',
-                'a0','a1','a2','a3','a4','a5','a6',
-                'b0','b1','b2','b3','b4','b5','b6',
-                'j0','j1','j2','j3','j4','j5','j6','j7','j8',
-                'k0','k1','k2','k3','k4','k5','k6','k7','k8',]
-        segmentkeys = ['P','T','C','A1','A2','B1','B2','J1','J2','K1','K2']
-        solidvals = self._s + self._a_solids + self._b_solids + self._j_solids + self._k_solids
-        ObjDict = dict(zip(solidkeys + segmentkeys, solidvals + self.segments))
-
-        # Error-check.
-        for key in (solidkeys + segmentkeys):
-            if objlist.count(key) > 1:
-                raise Exception("An object is listed more than once. "
-                        "A solid/segment can only be listed once.")
-        for segkey in segmentkeys:
-            if objlist.count(segkey) == 1:
-                # this segment is listed as input
-                for solobj in objlist:
-                    for segsol in ObjDict[segkey].solids:
-                        if solobj == segsol.label[0:2]:
-                            raise Exception("A solid {0} and its parent "
-                                    "segment {1} have both been given "
-                                    "as inputs. This duplicates that solid's "
-                                    "contribution.".format(solobj, segkey))
+        self._check_combination(objlist)
 
         # Perform computations.
         combined_mass = 0.0
         combinedMoment = np.zeros( (3,1) )
         for objstr in objlist:
-            if objstr not in ObjDict:
-                raise Exception("The string {0!r} does not identify a segment "
-                      "or solid of the human.".format(objstr))
-            obj = ObjDict[objstr]
+            obj = self._objects[objstr]
             combined_mass += obj.mass
             combinedMoment += obj.mass * obj.center_of_mass
         combined_COM = combinedMoment / combined_mass
@@ -636,7 +966,7 @@ Inertia tensor in global frame about human's COM (kg-m^2):
         # Move inertia tensor of an object from the point it is currently about
         # (the object's COM) so that it is about combined_COM.
         for objstr in objlist:
-            obj = ObjDict[objstr]
+            obj = self._objects[objstr]
             dist = combined_COM - obj.center_of_mass
             combined_inertia += np.mat(inertia.parallel_axis(
                                        obj.inertia,
@@ -644,12 +974,84 @@ Inertia tensor in global frame about human's COM (kg-m^2):
                                        [dist[0,0],dist[1,0],dist[2,0]]))
         return combined_mass, combined_COM, combined_inertia
 
-    def get_segment_by_name(self, name):
-        """Returns a segment given its name."""
-        labels = [s.label[0:len(name)] for s in self.segments]
-        return self.segments[labels.index(name)]
+    def _check_combination(self, objlist):
+        """Raises an exception if the solids and segments of objlist cannot
+        be combined by yeadon.Human.combine_inertia."""
+        if objlist == []:
+            raise Exception("Empty input.")
+        known = [key for key in objlist if key in self._objects]
+        if len(set(known)) < len(known):
+            raise Exception("An object is listed more than once. "
+                    "A solid/segment can only be listed once.")
+        for key in known:
+            segkey = self._solid_parents.get(key)
+            if segkey is not None and segkey in known:
+                raise Exception("A solid {0} and its parent "
+                        "segment {1} have both been given "
+                        "as inputs. This duplicates that solid's "
+                        "contribution.".format(key, segkey))
+        for key in objlist:
+            if key not in self._objects:
+                raise Exception("The string {0!r} does not identify a segment "
+                      "or solid of the human.".format(key))
+
+    def compile_combination(self, objlist):
+        """Returns a combination of solids and/or segments of the human
+        whose inertia properties can be evaluated many times, in the current
+        configuration or in many configurations at once, without validating
+        the input again. See :py:meth:`combine_inertia` for the input.
+
+        Parameters
+        ----------
+        objlist : tuple
+            Tuple of strings that identify a solid or segment.
+
+        Returns
+        -------
+        combination : :py:class:`yeadon.tree.Combination`
+
+        """
+        return Combination(self, objlist)
 
-    def draw(self, mlabobj=None, gui=False):
+    def subtree_inertia(self, about_joint=False):
+        """Returns the mass, center of mass, and inertia tensor of the
+        subtree of every segment (the segment and all segments distal to it,
+        e.g. the whole left arm for A1, or the torso, head, and arms for T),
+        in the current configuration. See
+        :py:meth:`yeadon.tree.SegmentTree.subtree_properties` to compute them
+        for many configurations.
+
+        Parameters
+        ----------
+        about_joint : bool, optional
+            If True, the inertia tensors are about the origin of the
+            subtree's root segment (its joint center) instead of about the
+            subtree's center of mass.
+
+        Returns
+        -------
+        subtrees : dict
+            Maps the name of each segment ('P', 'T', ..., 'K2') to a tuple of
+            the mass, the center of mass (np.array (3,1)), and the inertia
+            tensor (np.matrix (3,3)), in the global frame, of its subtree.
+
+        """
+        masses, centers, inertias = SegmentTree(self).subtree_properties(
+                self.CFG_to_array(self.CFG), about_joint=about_joint)
+        return dict((key, (masses[i], centers[0, i].reshape((3, 1)),
+                           np.asmatrix(inertias[0, i])))
+                    for i, key in enumerate(self.segment_keys))
+
+    def get_segment_by_name(self, name):
+        """Returns a segment given its name, or the beginning of its label
+        (e.g. 'A1' or 'A1: Left upper arm')."""
+        try:
+            return self.segments[self._segment_index[name]]
+        except KeyError:
+            raise ValueError("{0!r} does not identify a segment of the "
+                             "human.".format(name))
+
+    def draw(self, mlabobj=None, gui=False, mesh_level=None):
         """Draws the human in 3D in a new window using MayaVi.
         The mouse can be used to control or explore the 3D view.
 
@@ -660,11 +1062,18 @@ Inertia tensor in global frame about human's COM (kg-m^2):
         gui: boolean, optional, default=False
             If false the mlab.show() command will be called and the scene
             will be displayed to the screen.
+        mesh_level : str, optional
+            Level of detail of the meshes: 'low', 'medium', or 'high'. By
+            default, the human's `mesh_level`.
 
         """
+        if mesh_level is None:
+            mesh_level = self.mesh_level
+        sol.check_mesh_level(mesh_level)
+
         def make_drawing(mlabobj):
             for s in self.segments:
-                s.draw_mayavi(mlabobj)
+                s.draw_mayavi(mlabobj, mesh_level)
             L = 0.4
             x_cone, y_cone, z_cone = self._make_mayavi_cone_pos()
             mlabobj.mesh(x_cone, y_cone, z_cone + L, color=(0, 0, 1))
@@ -733,9 +1142,14 @@ Inertia tensor in global frame about human's COM (kg-m^2):
         x, y, z = self.center_of_mass.flatten()
         self._mass_center_sphere.mlab_source.set(x=x, y=y, z=z)
 
-    def _draw_mayavi_inertia_ellipsoid(self, mlabobj):
+    def _draw_mayavi_inertia_ellipsoid(self, mlabobj, mesh_level=None):
         """Draws the inertia ellipsoid centered at the human's center of mass.
         TODO describe what it is."""
+        if mesh_level is None:
+            mesh_level = self.mesh_level
+        sol.check_mesh_level(mesh_level)
+        # Updates use the same level of detail.
+        self._ellipsoid_mesh_level = mesh_level
         # First get the eigenvectors and values.
         self._generate_mesh_inertia_ellipsoid()
         self._ellipsoid_mesh = mlabobj.mesh(*self._ellipsoid_mesh_points,
@@ -750,31 +1164,40 @@ Inertia tensor in global frame about human's COM (kg-m^2):
 
     def _generate_mesh_inertia_ellipsoid(self):
         """Generates a mesh for MayaVi."""
-        self._ellipsoid_mesh_points = self._make_inertia_ellipsoid_pos()
+        self._ellipsoid_mesh_points = self._make_inertia_ellipsoid_pos(
+                self._ellipsoid_mesh_level)
+
+    @classmethod
+    def _unit_sphere_mesh(cls, mesh_level):
+        """Returns the x, y, and z coordinates of a unit sphere, as an
+        np.ndarray of shape (3, N, N) where N is
+        n_ellipsoid_points[mesh_level]. The sphere of each level of detail is
+        generated once and shared by all humans.
 
-    def _make_inertia_ellipsoid_pos(self):
+        """
+        if mesh_level not in cls._unit_spheres:
+            sol.check_mesh_level(mesh_level)
+            N = cls.n_ellipsoid_points[mesh_level]
+            u = np.linspace(0, 2.0 * np.pi, N)
+            v = np.linspace(0, np.pi, N)
+            cls._unit_spheres[mesh_level] = np.array([
+                np.outer(np.cos(u), np.sin(v)),
+                np.outer(np.sin(u), np.sin(v)),
+                np.outer(np.ones(np.size(u)), np.cos(v))])
+        return cls._unit_spheres[mesh_level]
+
+    def _make_inertia_ellipsoid_pos(self, mesh_level='medium'):
         """Generates coordinates to be used for 3D visualization purposes."""
         eigvals, eigvecs = np.linalg.eig(self.inertia)
         axes = 1.0/np.sqrt(eigvals)
-        N = 50
-        u = np.linspace(0, 2.0 * np.pi, N)
-        v = np.linspace(0, np.pi, N)
-        x = axes[0] * np.outer(np.cos(u), np.sin(v))
-        y = axes[1] * np.outer(np.sin(u), np.sin(v))
-        z = axes[2] * np.outer(np.ones(np.size(u)), np.cos(v))
-        for i in np.arange(N):
-            for j in np.arange(N):
-                POS = np.array([[x[i,j]],[y[i,j]],[z[i,j]]])
-                POS = eigvecs * POS
-                x[i,j] = POS[0,0]
-                y[i,j] = POS[1,0]
-                z[i,j] = POS[2,0]
-        x = self.center_of_mass[0,0] + x
-        y = self.center_of_mass[1,0] + y
-        z = self.center_of_mass[2,0] + z
+        sphere = self._unit_sphere_mesh(mesh_level)
+        # Scale the sphere along the principal axes, then rotate it.
+        points = np.dot(np.asarray(eigvecs) * axes,
+                        sphere.reshape((3, -1))).reshape(sphere.shape)
+        x, y, z = points + np.asarray(self.center_of_mass).reshape((3, 1, 1))
         return x, y, z
 
-    def _make_sphere_octant(self, octant_no):
+    def _make_sphere_octant(self, octant_no, mesh_level=None):
         """Returns coordinates that define an octant of a sphere. This method
         is not currently used, but could be used in rendering. The idea is to
         use it for drawing a center of mass ball.
@@ -794,6 +1217,10 @@ Inertia tensor in global frame about human's COM (kg-m^2):
             7.  x < 0, y < 0, z < 0
             8.  x > 0, y < 0, z < 0
 
+        mesh_level : str, optional
+            Level of detail: 'low', 'medium', or 'high'. By default, the
+            human's `mesh_level`.
+
         Returns
         -------
         x : np.array
@@ -806,8 +1233,11 @@ Inertia tensor in global frame about human's COM (kg-m^2):
         """
         if not octant_no in [1, 2, 3, 4, 5, 6, 7, 8]:
             raise ValueError("Octant number %i is invalid." % octant_no)
+        if mesh_level is None:
+            mesh_level = self.mesh_level
+        sol.check_mesh_level(mesh_level)
 
-        N = 30
+        N = self.n_sphere_octant_points[mesh_level]
 
         # Phi, azimuthal.
         if octant_no in [1, 5]:
@@ -837,91 +1267,9 @@ Inertia tensor in global frame about human's COM (kg-m^2):
         the input measurement parameters.
 
         """
-
-        meas = self.meas
-        # get solid heights from length measurements
-        s0h = meas['Ls1L']
-        s1h = meas['Ls2L'] - meas['Ls1L']
-        s2h = meas['Ls3L'] - meas['Ls2L']
-        s3h = meas['Ls4L'] - meas['Ls3L']
-        s4h = meas['Ls5L'] - meas['Ls4L']
-        s5h = meas['Ls6L']
-        s6h = meas['Ls7L'] - meas['Ls6L']
-        s7h = meas['Ls8L'] - meas['Ls7L']
-        # torso
-        self._Ls = []
-        self._s = []
-        self._Ls.append( sol.Stadium('Ls0: hip joint centre',
-                                    'perimwidth', meas['Ls0p'], meas['Ls0w']))
-        self._Ls.append( sol.Stadium('Ls1: umbilicus',
-                                    'perimwidth', meas['Ls1p'], meas['Ls1w']))
-        self._Ls.append( sol.Stadium('Ls2: lowest front rib',
-                                    'perimwidth', meas['Ls2p'], meas['Ls2w']))
-        self._Ls.append( sol.Stadium('Ls3: nipple',
-                                    'perimwidth', meas['Ls3p'], meas['Ls3w']))
-        self._Ls.append( sol.Stadium('Ls4: shoulder joint centre',
-                                    'depthwidth', meas['Ls4d'], meas['Ls4w']))
-        # Yeadon's ISEG code uses the value 0.57. Up through version 0.95 of
-        # this package, we used the value 0.6 instead. There was no good
-        # justification for this, other than that 0.57 seemed equally
-        # unjustifiable. The reason why the next two lines exist at all is
-        # that it's not possible to measure a perimeter, etc at the acromion,
-        # so we find this stadium's parameters as a function of the Ls4
-        # parameters.
-        # Previous code:
-        #radius = 0.6 * self._Ls[4].radius # see Yeadon's ISEG code
-        #thick = 0.6 * self._Ls[4].width / 2.0 - radius
-        # New code:
-        radiusLs5 = 0.57 * self._Ls[4].radius
-        thicknessLs5 = self._Ls[4].width / 2.0 - radiusLs5
-        self._Ls.append( sol.Stadium('Ls5: acromion',
-                                    'thicknessradius', thicknessLs5, radiusLs5))
-        self._Ls.append( sol.Stadium('Ls5: acromion/bottom of neck',
-                                    'perimeter',meas['Ls5p'], ''))
-        self._Ls.append( sol.Stadium('Ls6: beneath nose',
-                                    'perimeter', meas['Ls6p'], ''))
-        self._Ls.append( sol.Stadium('Ls7: above ear',
-                                    'perimeter', meas['Ls7p'], ''))
-        # define solids: this can definitely be done in a loop
-        self._s.append( sol.StadiumSolid( 's0: hip joint centre',
-                self.segmental_densities[self._density_set]['abdomen-pelvis'],
-                self._Ls[0],
-                self._Ls[1],
-                s0h))
-        self._s.append( sol.StadiumSolid( 's1: umbilicus',
-                self.segmental_densities[self._density_set]['abdomen-pelvis'],
-                self._Ls[1],
-                self._Ls[2],
-                s1h))
-        self._s.append( sol.StadiumSolid( 's2: lowest front rib',
-                self.segmental_densities[self._density_set]['thorax'],
-                self._Ls[2],
-                self._Ls[3],
-                s2h))
-        self._s.append( sol.StadiumSolid( 's3: nipple',
-                self.segmental_densities[self._density_set]['thorax'],
-                self._Ls[3],
-                self._Ls[4],
-                s3h))
-        self._s.append( sol.StadiumSolid( 's4: shoulder joint centre',
-                self.segmental_densities[self._density_set]['shoulders'],
-                self._Ls[4],
-                self._Ls[5],
-                s4h))
-        self._s.append( sol.StadiumSolid( 's5: acromion',
-                self.segmental_densities[self._density_set]['head-neck'],
-                self._Ls[6],
-                self._Ls[7],
-                s5h))
-        self._s.append( sol.StadiumSolid( 's6: beneath nose',
-                self.segmental_densities[self._density_set]['head-neck'],
-                self._Ls[7],
-                self._Ls[8],
-                s6h))
-        self._s.append( sol.Semiellipsoid( 's7: above ear',
-                self.segmental_densities[self._density_set]['head-neck'],
-                meas['Ls7p'],
-                s7h))
+        self._define_stadia('_Ls')
+        self._s = [self._make_solid(definition)
+                   for definition in self._solid_definitions[0:8]]
 
     def _define_arm_solids(self):
         """Defines the solids (from solid.py) that create the arms of the
@@ -929,115 +1277,14 @@ Inertia tensor in global frame about human's COM (kg-m^2):
         input measurement parameters .
 
         """
-        meas = self.meas
-
-        arm_solid_density_sets = ['upper-arm',
-                                  'upper-arm',
-                                  'forearm',
-                                  'forearm',
-                                  'hand',
-                                  'hand',
-                                  'hand']
-
-        # get solid heights from length measurements
-        left_arm_solid_heights = [
-            meas['La2L'] * 0.5,
-            meas['La2L'] - meas['La2L'] * 0.5,
-            meas['La3L'] - meas['La2L'],
-            meas['La4L'] - meas['La3L'],
-            meas['La5L'],
-            meas['La6L'] - meas['La5L'],
-            meas['La7L'] - meas['La6L']]
-
-        # left arm
-        self._La = []
-        self._La.append( sol.Stadium('La0: shoulder joint centre',
-                                    'perimeter', meas['La0p'], ''))
-        self._La.append( sol.Stadium('La1: mid-arm',
-                                    'perimeter', meas['La1p'], ''))
-        self._La.append( sol.Stadium('La2: elbow joint centre',
-                                    'perimeter', meas['La2p'], ''))
-        self._La.append( sol.Stadium('La3: maximum forearm perimeter',
-                                    'perimeter', meas['La3p'], ''))
-        self._La.append( sol.Stadium('La4: wrist joint centre',
-                                    'perimwidth', meas['La4p'], meas['La4w']))
-        self._La.append( sol.Stadium('La5: base of thumb',
-                                    'perimwidth', meas['La5p'], meas['La5w']))
-        self._La.append( sol.Stadium('La6: knuckles',
-                                    'perimwidth', meas['La6p'], meas['La6w']))
-        self._La.append( sol.Stadium('La7: fingernails',
-                                    'perimwidth', meas['La7p'], meas['La7w']))
-        # define left arm solids
-        left_arm_solid_tags = ['a0: shoulder joint centre',
-                               'a1: mid-arm',
-                               'a2: elbow joint centre',
-                               'a3: maximum forearm perimeter',
-                               'a4: wrist joint centre',
-                               'a5: base of thumb',
-                               'a6: knuckles']
-
+        self._define_stadia('_La')
+        self._define_stadia('_Lb')
         # build the list of stadium solids starting at the shoulder going down
         # to the arm
-        self._a_solids = []
-        for i, (tag, density_set, height) in enumerate(
-                zip(left_arm_solid_tags, arm_solid_density_sets,
-                    left_arm_solid_heights)):
-
-            self._a_solids.append(sol.StadiumSolid(tag,
-                    self.segmental_densities[self._density_set][density_set],
-                    self._La[i + 1], #1, 2, 3, 4, 5, 6, 7
-                    self._La[i], #0, 1, 2, 3, 4, 5, 6
-                    height))
-
-        # get solid heights from length measurements
-        right_arm_solid_heights = [
-            meas['Lb2L'] * 0.5,
-            meas['Lb2L'] - meas['Lb2L'] * 0.5,
-            meas['Lb3L'] - meas['Lb2L'],
-            meas['Lb4L'] - meas['Lb3L'],
-            meas['Lb5L'],
-            meas['Lb6L'] - meas['Lb5L'],
-            meas['Lb7L'] - meas['Lb6L']]
-
-        # right arm
-        self._Lb = []
-        self._Lb.append( sol.Stadium('Lb0: shoulder joint centre',
-                                    'perimeter', meas['Lb0p'], ''))
-        self._Lb.append( sol.Stadium('Lb1: mid-arm',
-                                    'perimeter', meas['Lb1p'], ''))
-        self._Lb.append( sol.Stadium('Lb2: elbow joint centre',
-                                    'perimeter', meas['Lb2p'], ''))
-        self._Lb.append( sol.Stadium('Lb3: maximum forearm perimeter',
-                                    'perimeter', meas['Lb3p'], ''))
-        self._Lb.append( sol.Stadium('Lb4: wrist joint centre',
-                                    'perimwidth', meas['Lb4p'], meas['Lb4w']))
-        self._Lb.append( sol.Stadium('Lb5: base of thumb',
-                                    'perimwidth', meas['Lb5p'], meas['Lb5w']))
-        self._Lb.append( sol.Stadium('Lb6: knuckles',
-                                    'perimwidth', meas['Lb6p'], meas['Lb6w']))
-        self._Lb.append( sol.Stadium('Lb7: fingernails',
-                                    'perimwidth', meas['Lb7p'], meas['Lb7w']))
-        # define right arm solids
-        right_arm_solid_tags = ['b0: shoulder joint centre',
-                                'b1: mid-arm',
-                                'b2: elbow joint centre',
-                                'b3: maximum forearm perimeter',
-                                'b4: wrist joint centre',
-                                'b5: base of thumb',
-                                'b6: knuckles']
-
-        # build the list of stadium solids starting at the shoulder going down
-        # to the arm
-        self._b_solids = []
-        for i, (tag, density_set, height) in enumerate(
-                zip(right_arm_solid_tags, arm_solid_density_sets,
-                    right_arm_solid_heights)):
-
-            self._b_solids.append(sol.StadiumSolid(tag,
-                    self.segmental_densities[self._density_set][density_set],
-                    self._La[i + 1], #1, 2, 3, 4, 5, 6, 7
-                    self._La[i], #0, 1, 2, 3, 4, 5, 6
-                    height))
+        self._a_solids = [self._make_solid(definition)
+                          for definition in self._solid_definitions[8:15]]
+        self._b_solids = [self._make_solid(definition)
+                          for definition in self._solid_definitions[15:22]]
 
     def _define_leg_solids(self):
         """Defines the solids (from solid.py) that create the legs of the
@@ -1045,139 +1292,56 @@ Inertia tensor in global frame about human's COM (kg-m^2):
         the input measurement parameters .
 
         """
+        self._define_stadia('_Lj')
+        self._define_stadia('_Lk')
+        self._j_solids = [self._make_solid(definition)
+                          for definition in self._solid_definitions[22:31]]
+        self._k_solids = [self._make_solid(definition)
+                          for definition in self._solid_definitions[31:40]]
+
+    def _define_stadia(self, stadia):
+        """Defines the list of stadium levels `stadia` (e.g. '_Ls') from the
+        measurements."""
+        setattr(self, stadia, [])
+        for i in range(len(self._stadium_definitions[stadia])):
+            getattr(self, stadia).append(self._make_stadium(stadia, i))
+
+    def _make_stadium(self, stadia, index):
+        """Returns the stadium level `index` of the list `stadia` (e.g.
+        '_Ls'), see Human._stadium_definitions."""
         meas = self.meas
-        # get solid heights from length measurements
-        left_leg_solid_heights = [
-            meas['Lj1L'],
-            (meas['Lj3L'] + meas['Lj1L']) * 0.5 - meas['Lj1L'],
-            meas['Lj3L'] - (meas['Lj3L'] + meas['Lj1L']) * 0.5,
-            meas['Lj4L'] - meas['Lj3L'],
-            meas['Lj5L'] - meas['Lj4L'],
-            meas['Lj6L'],
-            (meas['Lj8L'] + meas['Lj6L']) * 0.5 - meas['Lj6L'],
-            meas['Lj8L'] - (meas['Lj8L'] + meas['Lj6L']) * 0.5,
-            meas['Lj9L'] - meas['Lj8L']]
-        # left leg
-        self._Lj = []
-        Lj0p = 2 * np.pi * 0.5 * np.sqrt(np.abs(self._Ls[0].radius *
-                                                self._Ls[0].width))
-        self._Lj.append( sol.Stadium('Lj0: hip joint centre',
-                                    'perimeter', Lj0p, ''))
-        self._Lj.append( sol.Stadium('Lj1: crotch',
-                                    'perimeter', meas['Lj1p'], ''))
-        self._Lj.append( sol.Stadium('Lj2: mid-thigh',
-                                    'perimeter', meas['Lj2p'], ''))
-        self._Lj.append( sol.Stadium('Lj3: knee joint centre',
-                                    'perimeter', meas['Lj3p'], ''))
-        self._Lj.append( sol.Stadium('Lj4: maximum calf perimeter',
-                                    'perimeter', meas['Lj4p'], ''))
-        self._Lj.append( sol.Stadium('Lj5: ankle joint centre',
-                                    'perimeter', meas['Lj5p'], ''))
-        self._Lj.append( sol.Stadium('Lj6: heel',
-                                    'perimwidth', meas['Lj6p'], meas['Lj6d'],
-                                    'AP'))
-        self._Lj.append( sol.Stadium('Lj7: arch',
-                                    'perimeter', meas['Lj7p'], ''))
-        self._Lj.append( sol.Stadium('Lj8: ball',
-                                    'perimwidth', meas['Lj8p'], meas['Lj8w']))
-        self._Lj.append( sol.Stadium('Lj9: toe nails',
-                                    'perimwidth', meas['Lj9p'], meas['Lj9w']))
-        # define left leg solids
-
-        leg_solid_density_sets = ['thigh',
-                'thigh',
-                'thigh',
-                'lower-leg',
-                'lower-leg',
-                'foot',
-                'foot',
-                'foot',
-                'foot']
-
-        left_leg_solid_tags = [
-            'j0: hip joint centre',
-            'j1: crotch',
-            'j2: mid-thigh',
-            'j3: knee joint centre',
-            'j4: maximum calf perimeter',
-            'j5: ankle joint centre',
-            'j6: heel',
-            'j7: arch',
-            'j8: ball']
-
-        # build the list of stadium solids starting at the shoulder going down
-        # to the arm
-        self._j_solids = []
-        for i, (tag, density_set, height) in enumerate(
-                zip(left_leg_solid_tags, leg_solid_density_sets,
-                    left_leg_solid_heights)):
-
-            self._j_solids.append(sol.StadiumSolid(tag,
-                    self.segmental_densities[self._density_set][density_set],
-                    self._Lj[i + 1], #1, 2, 3, 4, 5, 6, 7, ...
-                    self._Lj[i], #0, 1, 2, 3, 4, 5, 6, ...
-                    height))
-
-        # right leg
-
-        # get solid heights from length measurements
-        right_leg_solid_heights = [
-            meas['Lk1L'],
-            (meas['Lk3L'] + meas['Lk1L']) * 0.5 - meas['Lk1L'],
-            meas['Lk3L'] - (meas['Lk3L'] + meas['Lk1L']) * 0.5,
-            meas['Lk4L'] - meas['Lk3L'],
-            meas['Lk5L'] - meas['Lk4L'],
-            meas['Lk6L'],
-            (meas['Lk8L'] + meas['Lk6L']) * 0.5 - meas['Lk6L'],
-            meas['Lk8L'] - (meas['Lk8L'] + meas['Lk6L']) * 0.5,
-            meas['Lk9L'] - meas['Lk8L']]
-
-        self._Lk = []
-        Lk0p = 2 * np.pi * 0.5 * np.sqrt(np.abs(self._Ls[0].radius *
-                                                self._Ls[0].width))
-        self._Lk.append( sol.Stadium('Lk0: hip joint centre',
-                                    'perimeter', Lk0p, ''))
-        self._Lk.append( sol.Stadium('Lk1: crotch',
-                                    'perimeter', meas['Lk1p'], ''))
-        self._Lk.append( sol.Stadium('Lk2: mid-thigh',
-                                    'perimeter', meas['Lk2p'], ''))
-        self._Lk.append( sol.Stadium('Lk3: knee joint centre',
-                                    'perimeter', meas['Lk3p'], ''))
-        self._Lk.append( sol.Stadium('Lk4: maximum calf perimeter',
-                                    'perimeter', meas['Lk4p'], ''))
-        self._Lk.append( sol.Stadium('Lk5: ankle joint centre',
-                                    'perimeter', meas['Lk5p'], ''))
-        self._Lk.append( sol.Stadium('Lk6: heel',
-                                    'perimwidth', meas['Lk6p'], meas['Lk6d'],
-                                    'AP'))
-        self._Lk.append( sol.Stadium('Lk7: arch',
-                                    'perimeter', meas['Lk7p'], ''))
-        self._Lk.append( sol.Stadium('Lk8: ball',
-                                    'perimwidth', meas['Lk8p'], meas['Lk8w']))
-        self._Lk.append( sol.Stadium('Lk9: toe nails',
-                                    'perimwidth', meas['Lk9p'], meas['Lk9w']))
-
-        right_leg_solid_tags = [
-            'k0: hip joint centre',
-            'k1: crotch',
-            'k2: mid-thigh',
-            'k3: knee joint centre',
-            'k4: maximum calf perimeter',
-            'k5: ankle joint centre',
-            'k6: heel',
-            'k7: arch',
-            'k8: ball']
-
-        self._k_solids = []
-        for i, (tag, density_set, height) in enumerate(
-                zip(right_leg_solid_tags, leg_solid_density_sets,
-                    right_leg_solid_heights)):
-
-            self._k_solids.append(sol.StadiumSolid(tag,
-                    self.segmental_densities[self._density_set][density_set],
-                    self._Lk[i + 1], #1, 2, 3, 4, 5, 6, 7, ...
-                    self._Lk[i], #0, 1, 2, 3, 4, 5, 6, ...
-                    height))
+        label, inID, in1, in2, alignment = \
+                self._stadium_definitions[stadia][index]
+        if inID == 'acromion':
+            # Yeadon's ISEG code uses the value 0.57. Up through version 0.95
+            # of this package, we used the value 0.6 instead. There was no
+            # good justification for this, other than that 0.57 seemed
+            # equally unjustifiable. The reason why this stadium exists at
+            # all is that it's not possible to measure a perimeter, etc at
+            # the acromion, so we find this stadium's parameters as a
+            # function of the Ls4 parameters.
+            radiusLs5 = 0.57 * self._Ls[4].radius
+            thicknessLs5 = self._Ls[4].width / 2.0 - radiusLs5
+            return sol.Stadium(label, 'thicknessradius', thicknessLs5,
+                               radiusLs5)
+        if inID == 'hip':
+            # The hip joint centre of each leg, from the Ls0 stadium.
+            perimeter = 2 * np.pi * 0.5 * np.sqrt(np.abs(
+                self._Ls[0].radius * self._Ls[0].width))
+            return sol.Stadium(label, 'perimeter', perimeter, '')
+        return sol.Stadium(label, inID, meas[in1], meas[in2] if in2 else '',
+                           alignment)
+
+    def _make_solid(self, definition):
+        """Returns the solid of an entry of Human._solid_definitions."""
+        key, label, density_set, stadia, height = definition
+        density = self.segmental_densities[self._density_set][density_set]
+        if isinstance(stadia, str):
+            return sol.Semiellipsoid(label, density, self.meas[stadia],
+                                     height(self.meas))
+        levels = getattr(self, stadia[0])
+        return sol.StadiumSolid(label, density, levels[stadia[1]],
+                                levels[stadia[2]], height(self.meas))
 
     def _define_segments(self):
         """Define segment objects using previously defined solids.
@@ -1355,7 +1519,17 @@ Inertia tensor in global frame about human's COM (kg-m^2):
             Measured mass of the human in kilograms.
 
         """
-        massratio = measmass / self.mass
+        # Solids whose density is overridden keep their mass, so only the
+        # remaining mass is scaled.
+        overridden_mass = sum(self._objects[label].mass for label, override
+                              in self.solid_overrides.items()
+                              if 'density' in override)
+        if not measmass - overridden_mass > 0.0:
+            raise ValueError("The measured mass, {0} kg, must be larger than "
+                    "the mass of the solids with overridden densities, {1} "
+                    "kg.".format(measmass, overridden_mass))
+        massratio = ((measmass - overridden_mass) /
+                     (self.mass - overridden_mass))
         # The following attempts to take care of the unlikely case where the
         # density set is changed after construction of a Human.
         for key, val in self.segmental_densities.items():
@@ -1368,6 +1542,297 @@ Inertia tensor in global frame about human's COM (kg-m^2):
                   "Measured mass:", round(measmass,
                           2),"self.mass:",round(self.mass, 2))
 
+    @classmethod
+    def _measurement_map(cls):
+        """Returns, for each measurement, the stadium levels (list of levels
+        and index) and the solids (keys) that are built from it, and whether
+        it changes the placement of the segments. Derived from
+        Human._stadium_definitions and Human._solid_definitions once."""
+        if cls._measurement_dependencies is None:
+            stadium_names = dict()
+            for stadia in cls._stadium_order:
+                for i, definition in enumerate(
+                        cls._stadium_definitions[stadia]):
+                    stadium_names[(stadia, i)] = set(
+                        name for name in definition[2:4] if name)
+            dependencies = dict((name, ([], [], False))
+                                for name in cls.measnames)
+            for stadium in sorted(stadium_names, key=cls._stadium_sort_key):
+                for name in stadium_names[stadium]:
+                    dependencies[name][0].append(stadium)
+            # The heights of the solids place the segments, as do the widths
+            # of the shoulders and the hips.
+            placement = set()
+            for stadium in cls._placement_stadia:
+                placement |= stadium_names[stadium]
+            for key, label, density_set, levels, height in \
+                    cls._solid_definitions:
+                recorder = _MeasurementRecorder()
+                height(recorder)
+                placement |= recorder.names
+                if isinstance(levels, str):
+                    names = recorder.names | set([levels])
+                else:
+                    names = (recorder.names |
+                             stadium_names[(levels[0], levels[1])] |
+                             stadium_names[(levels[0], levels[2])])
+                for name in names:
+                    dependencies[name][1].append(key)
+            cls._measurement_dependencies = dict(
+                (name, (stadia, solids, name in placement))
+                for name, (stadia, solids, moves) in dependencies.items())
+        return cls._measurement_dependencies
+
+    # The lists of stadium levels, in the order in which they are defined.
+    _stadium_order = ('_Ls', '_La', '_Lb', '_Lj', '_Lk')
+
+    @classmethod
+    def _stadium_sort_key(cls, stadium):
+        return cls._stadium_order.index(stadium[0]), stadium[1]
+
+    def _symmetric_measurements(self, name):
+        """Returns the measurement and, for a symmetric human, the
+        corresponding measurement of the other limb."""
+        if name not in self.measnames:
+            raise ValueError("'{0}' is not the name of a measurement.".format(
+                name))
+        if self.is_symmetric:
+            index = self.measnames.index(name)
+            for left, right in zip(self._left_limb_indices,
+                                   self._right_limb_indices):
+                if index == left:
+                    return [name, self.measnames[right]]
+                if index == right:
+                    return [self.measnames[left], name]
+        return [name]
+
+    def _dependencies(self, name):
+        """Returns the measurements, stadium levels, and solids that change
+        with a measurement, and whether the segments must be placed again."""
+        measurement_map = self._measurement_map()
+        names = self._symmetric_measurements(name)
+        stadia, solids, moves = set(), set(), False
+        for measurement in names:
+            stadia.update(measurement_map[measurement][0])
+            solids.update(measurement_map[measurement][1])
+            moves = moves or measurement_map[measurement][2]
+        return (names, sorted(stadia, key=self._stadium_sort_key),
+                [key for key in self.solid_keys if key in solids], moves)
+
+    def measurement_dependencies(self, name=None):
+        """Returns what is recomputed when a measurement is changed with
+        yeadon.Human.set_measurement.
+
+        Parameters
+        ----------
+        name : str, optional
+            Name of a measurement, one of Human.measnames. By default, the
+            dependencies of all measurements are returned.
+
+        Returns
+        -------
+        dependencies : dict
+            With the keys 'measurements' (the measurement and, for a
+            symmetric human, the corresponding measurement of the other
+            limb, see yeadon.Human._average_limbs), 'stadia' (labels of the
+            stadium levels), 'solids' (keys of the solids), 'segments' (keys
+            of the segments of those solids), and 'moves_segments' (True if
+            the measurement changes the height of a solid or the width of
+            the shoulders or hips, so that the segments are placed again).
+            Without `name`, a dict of these, by measurement name.
+
+        """
+        if name is None:
+            return dict((name, self.measurement_dependencies(name))
+                        for name in self.measnames)
+        names, stadia, solids, moves = self._dependencies(name)
+        segments = set(self._solid_parents[key] for key in solids)
+        return {'measurements': names,
+                'stadia': [self._stadium_definitions[stadium[0]]
+                           [stadium[1]][0] for stadium in stadia],
+                'solids': solids,
+                'segments': [key for key in self.segment_keys
+                             if key in segments],
+                'moves_segments': moves}
+
+    def set_measurement(self, name, value):
+        """Changes one measurement and recomputes only the stadium levels,
+        solids, and segments that depend on it (see
+        yeadon.Human.measurement_dependencies), instead of assigning to
+        `meas` and calling yeadon.Human.update. The overrides of solids (see
+        yeadon.Human.set_solid_override) are kept.
+
+        Parameters
+        ----------
+        name : str
+            Name of the measurement, one of Human.measnames.
+        value : float
+            The new value (m). For a symmetric human, the corresponding
+            measurement of the other limb is set to the same value, so that
+            the limbs remain averaged.
+
+        """
+        if not value > 0.0:
+            raise ValueError("Measurement '{0}' must be positive, not "
+                             "{1}.".format(name, value))
+        names, stadia, solids, moves = self._dependencies(name)
+        for measurement in names:
+            self.meas[measurement] = value
+        # The levels are defined in order, so that the derived levels follow
+        # the levels they are derived from.
+        for stadium in stadia:
+            getattr(self, stadium[0])[stadium[1]] = \
+                    self._make_stadium(*stadium)
+        for key in solids:
+            solid = self._objects[key]
+            levels, height = self._solid_definitions[
+                    self.solid_keys.index(key)][3:5]
+            height = height(self.meas)
+            if solid.height != height:
+                solid.height = height
+                solid._reset_meshes()
+            if isinstance(levels, str):
+                solid.set_base_perimeter(self.meas[levels])
+                stads = None
+            else:
+                stads = (getattr(self, levels[0])[levels[1]],
+                         getattr(self, levels[0])[levels[2]])
+                solid.set_stadia(*stads)
+            if key in self._solid_defaults:
+                self._solid_defaults[key] = (self._solid_defaults[key][0],
+                                             height, stads)
+                self._apply_solid_override(key, solid)
+            else:
+                solid.calc_rel_properties()
+        if moves:
+            self._update_segments()
+            return
+        segments = []
+        for key in solids:
+            self._objects[key].calc_properties()
+            segment = self._objects[self._solid_parents[key]]
+            if segment not in segments:
+                segments.append(segment)
+        for segment in segments:
+            segment.calc_rel_properties()
+            segment.calc_properties()
+        self.calc_properties()
+
+    def set_solid_override(self, label, density=None, height=None,
+                           stadia=None):
+        """Overrides the density and/or the geometry of one solid of this
+        human, e.g. to replace the solids of a lower leg with a prosthesis.
+        The overrides are kept when the solids are redefined (see
+        yeadon.Human.update) and are combined with earlier overrides of the
+        same solid.
+
+        Changing only the density recalculates the solid, the relative
+        properties of its segment, and the properties of the human. Changing
+        the geometry also moves the segments, since the joint centers depend
+        on the heights and widths of the solids.
+
+        Parameters
+        ----------
+        label : str
+            Label of the solid, one of Human.solid_keys, e.g. 'k4'.
+        density : float, optional
+            Density of the solid (kg/m^3), instead of the density of its
+            segment in `segmental_densities`. It is not scaled by
+            yeadon.Human.scale_human_by_mass.
+        height : float, optional
+            Height of the solid (m).
+        stadia : tuple, optional
+            The lower and upper stadia of a stadium solid (not 's7'), each a
+            yeadon.solid.Stadium or a tuple of the arguments of Stadium after
+            the label, e.g. ('perimeter', 0.3) or ('perimwidth', 0.3, 0.1).
+
+        """
+        if label not in self.solid_keys:
+            raise ValueError("'{0}' is not the label of a solid.".format(
+                label))
+        solid = self._objects[label]
+        for name, value in (('density', density), ('height', height)):
+            if value is not None and not value > 0.0:
+                raise ValueError("The {0} of solid '{1}' must be positive, "
+                        "not {2}.".format(name, label, value))
+        if stadia is not None:
+            if not isinstance(solid, sol.StadiumSolid):
+                raise ValueError("Solid '{0}' is not a stadium "
+                        "solid.".format(label))
+            if len(stadia) != 2:
+                raise ValueError("A stadium solid has 2 stadia, not "
+                        "{0}.".format(len(stadia)))
+            stadia = tuple(
+                stadium if isinstance(stadium, sol.Stadium) else
+                sol.Stadium(default.label, *stadium)
+                for stadium, default in zip(stadia, solid.stads))
+        override = self.solid_overrides.setdefault(label, dict())
+        for name, value in (('density', density), ('height', height),
+                            ('stadia', stadia)):
+            if value is not None:
+                override[name] = value
+        self._update_solid(label, height is not None or stadia is not None)
+
+    def clear_solid_override(self, label=None):
+        """Removes the overrides of a solid, or of all solids, see
+        yeadon.Human.set_solid_override. Only the solids that were
+        overridden are recalculated.
+
+        Parameters
+        ----------
+        label : str, optional
+            Label of the solid. By default, all overrides are removed.
+
+        """
+        if label is not None and label not in self.solid_keys:
+            raise ValueError("'{0}' is not the label of a solid.".format(
+                label))
+        labels = list(self.solid_overrides) if label is None else [label]
+        geometry = False
+        for label in labels:
+            override = self.solid_overrides.pop(label, dict())
+            self._apply_solid_override(label, self._objects[label])
+            geometry = geometry or 'height' in override or \
+                    'stadia' in override
+        if geometry:
+            self._update_segments()
+        else:
+            for label in labels:
+                self._update_solid(label, False)
+
+    def _apply_solid_override(self, label, solid):
+        """Sets the density and geometry of a solid from its overrides, or
+        from the values it had before it was first overridden, and
+        recalculates its relative properties."""
+        if label not in self._solid_defaults:
+            self._solid_defaults[label] = (
+                solid.density, solid.height,
+                tuple(solid.stads) if hasattr(solid, 'stads') else None)
+        density, height, stadia = self._solid_defaults[label]
+        override = self.solid_overrides.get(label, dict())
+        solid.density = override.get('density', density)
+        if solid.height != override.get('height', height):
+            solid.height = override.get('height', height)
+            solid._reset_meshes()
+        if stadia is not None:
+            solid.set_stadia(*override.get('stadia', stadia))
+        solid.calc_rel_properties()
+
+    def _update_solid(self, label, geometry):
+        """Recalculates a solid whose override changed. If its geometry
+        changed, the segments are redefined; otherwise only the solid, its
+        segment, and the human are recalculated."""
+        solid = self._objects[label]
+        self._apply_solid_override(label, solid)
+        if geometry:
+            self._update_segments()
+            return
+        solid.calc_properties()
+        segment = self._objects[self._solid_parents[label]]
+        segment.calc_rel_properties()
+        segment.calc_properties()
+        self.calc_properties()
+
     def _read_measurements(self, fname):
         """Reads a measurement input .txt file, in YAML format,  and assigns
         the measurements to fields in the self.meas dict. This method is called
@@ -1378,9 +1843,40 @@ Inertia tensor in global frame about human's COM (kg-m^2):
         fname : str
             Filename or path to measurement file.
 
+        """
+        meas, self.measurementconversionfactor, meas_mass = \
+                self._parse_measurement_file(fname)
+        if meas_mass is not None:
+            # scale densities
+            self.meas_mass = meas_mass
+        # multiply all values by conversion factor
+        for key, val in meas.items():
+            self.meas[key] = val * self.measurementconversionfactor
+
+    @classmethod
+    def _parse_measurement_file(cls, fname):
+        """Reads and checks a measurement input .txt file, in YAML format,
+        without converting units.
+
+        Parameters
+        ----------
+        fname : str
+            Filename or path to measurement file.
+
+        Returns
+        -------
+        meas : dict
+            The 95 measurements, in the units used in the file.
+        measurementconversionfactor : float
+            Factor that converts the measurements into meters.
+        totalmass : float or None
+            The measured mass of the human, or None if not provided.
+
         """
         # initialize measurement conversion factor
-        self.measurementconversionfactor = 0
+        measurementconversionfactor = 0
+        totalmass = None
+        meas = dict()
         # open measurement file
         fid = open(fname, 'r')
         mydict = yaml.load(fid.read())
@@ -1388,30 +1884,27 @@ Inertia tensor in global frame about human's COM (kg-m^2):
         # loop until all 95 parameters are read in
         for key, val in mydict.items():
             if key == 'measurementconversionfactor':
-                self.measurementconversionfactor = val
+                measurementconversionfactor = val
             elif key == 'totalmass':
-                # scale densities
-                self.meas_mass = val
+                totalmass = val
             else:
                 # If inappropriate value.
                 if val == None or val <= 0:
                     raise ValueError("Variable {0} has inappropriate "
                             "value.".format( key))
                 # If key is unexpected.
-                if key not in self.measnames:
+                if key not in cls.measnames:
                     raise ValueError("Variable {0} is not valid name for a "
                         "measurement.".format(key))
-                self.meas[key] = float(val)
-        if len(self.meas) != len(self.measnames):
+                meas[key] = float(val)
+        if len(meas) != len(cls.measnames):
             raise Exception("There should be {0} measurements, but {1} were "
-                    "found.".format(len(self.measnames), len(self.meas)))
-        if self.measurementconversionfactor == 0:
+                    "found.".format(len(cls.measnames), len(meas)))
+        if measurementconversionfactor == 0:
             raise Exception("Variable measurementconversionfactor not "
                     "provided or is 0. Set as 1 if measurements are given "
                     "in meters.")
-        # multiply all values by conversion factor
-        for key, val in self.meas.items():
-            self.meas[key] = val * self.measurementconversionfactor
+        return meas, measurementconversionfactor, totalmass
 
     def write_measurements(self, fname):
         """Writes the keys and values of the self.meas dict to a text file.
@@ -1445,57 +1938,35 @@ Inertia tensor in global frame about human's COM (kg-m^2):
             Filename or path for ISEG .txt input file.
 
         """
-        fid = open(fname,'w')
-        m = copy.copy(self.meas)
-
         # Convert units.
         SI = 1./1000.
-        for key, val in m.items(): m[key] = val/SI
+        values = [self.meas[name] / SI for name in self._ISEG_names]
 
-        # pelvis, torso, chest-head
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f},{3:1.1f},{4:1.1f},{5:1.1f},{6:1.1f},{7:1.1f}\n".format(m['Ls1L'],
-            m['Ls2L'], m['Ls3L'], m['Ls4L'], m['Ls5L'], m['Ls6L'], m['Ls7L'],
-            m['Ls8L']))
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f},{3:1.1f},{4:1.1f},{5:1.1f},{6:1.1f}\n".format(m['Ls0p'], m['Ls1p'],
-            m['Ls2p'], m['Ls3p'], m['Ls5p'], m['Ls6p'], m['Ls7p']))
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f},{3:1.1f},{4:1.1f},{5:1.1f}\n".format(m['Ls0w'], m['Ls1w'],
-            m['Ls2w'], m['Ls3w'], m['Ls4w'], m['Ls4d']))
+        # The last line contains ISEG's "XHEIGHT" and "XMASS" variables. XMASS
+        # is used for mass/density correction in his code.
+        values += [500, self.meas_mass if self.meas_mass > 0 else 200]
 
-        # arms
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f},{3:1.1f},{4:1.1f},{5:1.1f}\n".format(m['La2L'], m['La3L'],
-            m['La4L'], m['La5L'], m['La6L'], m['La7L']))
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f},{3:1.1f},{4:1.1f},{5:1.1f},{6:1.1f},{7:1.1f}\n".format(m['La0p'],
-            m['La1p'], m['La2p'], m['La3p'], m['La4p'], m['La5p'], m['La6p'],
-            m['La7p']))
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f},{3:1.1f}\n".format(m['La4w'], m['La5w'], m['La6w'],
-            m['La7w']))
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f},{3:1.1f},{4:1.1f},{5:1.1f}\n".format(m['Lb2L'], m['Lb3L'],
-            m['Lb4L'], m['Lb5L'], m['Lb6L'], m['Lb7L']))
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f},{3:1.1f},{4:1.1f},{5:1.1f},{6:1.1f},{7:1.1f}\n".format(m['Lb0p'],
-            m['Lb1p'], m['Lb2p'], m['Lb3p'], m['Lb4p'], m['Lb5p'], m['Lb6p'],
-            m['Lb7p']))
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f},{3:1.1f}\n".format(m['Lb4w'], m['Lb5w'], m['Lb6w'],
-            m['Lb7w']))
+        with open(fname, 'w') as fid:
+            fid.write(self._ISEG_template % tuple(values))
 
-        # legs
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f},{3:1.1f},{4:1.1f},{5:1.1f},{6:1.1f}\n".format(m['Lj1L'], m['Lj3L'],
-            m['Lj4L'], m['Lj5L'], m['Lj6L'], m['Lj8L'], m['Lj9L']))
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f},{3:1.1f},{4:1.1f},{5:1.1f},{6:1.1f},{7:1.1f},{8:1.1f}\n".format(m['Lj1p'],
-            m['Lj2p'], m['Lj3p'], m['Lj4p'], m['Lj5p'], m['Lj6p'], m['Lj7p'],
-            m['Lj8p'], m['Lj9p']))
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f}\n".format(m['Lj6d'], m['Lj8w'], m['Lj9w']))
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f},{3:1.1f},{4:1.1f},{5:1.1f},{6:1.1f}\n".format(m['Lk1L'], m['Lk3L'],
-            m['Lk4L'], m['Lk5L'], m['Lk6L'], m['Lk8L'], m['Lk9L']))
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f},{3:1.1f},{4:1.1f},{5:1.1f},{6:1.1f},{7:1.1f},{8:1.1f}\n".format(m['Lk1p'],
-            m['Lk2p'], m['Lk3p'], m['Lk4p'], m['Lk5p'], m['Lk6p'], m['Lk7p'],
-            m['Lk8p'], m['Lk9p']))
-        fid.write("{0:1.1f},{1:1.1f},{2:1.1f}\n".format(m['Lk6d'], m['Lk8w'], m['Lk9w']))
-
-        # This line contains ISEG's "XHEIGHT" and "XMASS" variables. XMASS is
-        # used for mass/density correction in his code.
-        fid.write("{0},{1}\n".format(500,
-            self.meas_mass if self.meas_mass > 0 else 200))
-        fid.close()
+    def write_mesh(self, fname, file_format=None, mesh_level=None):
+        """Writes the surface of the human, in its current configuration, as
+        a triangle mesh. See :py:mod:`yeadon.mesh`.
+
+        Parameters
+        ----------
+        fname : str
+            Filename or path for the mesh file.
+        file_format : str, optional
+            'stl', 'obj', or 'ply'. By default, given by the extension of
+            `fname`.
+        mesh_level : str, optional
+            Level of detail of the mesh: 'low', 'medium', or 'high'. By
+            default, the human's `mesh_level`.
+
+        """
+        vertices, faces = mesh.human_mesh(self, mesh_level)
+        mesh.write_mesh(fname, vertices, faces, file_format)
 
     def _read_CFG(self, CFGfname):
         """Reads in a text file that contains the joint angles of the human.
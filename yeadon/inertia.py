@@ -49,6 +49,34 @@ def parallel_axis(Ic, m, d):
     return Ic + m * dMat
 
 
+def parallel_axis_batch(Ic, m, d):
+    """Returns the moments of inertia of bodies about many points. This is
+    the vectorized version of :py:func:`parallel_axis`; the inputs are
+    broadcast against each other.
+
+    Parameters
+    ----------
+    Ic : array_like, shape(..., 3, 3)
+        The moments of inertia about the centers of mass of the bodies.
+    m : float or array_like, shape(...)
+        The masses of the bodies.
+    d : array_like, shape(..., 3)
+        The vectors from the centers of mass of the bodies to the new
+        points.
+
+    Returns
+    -------
+    I : numpy.ndarray, shape(..., 3, 3)
+        The moments of inertia about the points located by `d`.
+
+    """
+    d = np.asarray(d, dtype=float)
+    m = np.asarray(m, dtype=float)[..., np.newaxis, np.newaxis]
+    return np.asarray(Ic) + m * (
+        np.einsum('...i,...i', d, d)[..., np.newaxis, np.newaxis] *
+        np.eye(3) - d[..., :, np.newaxis] * d[..., np.newaxis, :])
+
+
 def rotate_space_123(angles):
     """Returns the direction cosine matrix relating a reference frame B
     rotated relative to reference frame A through the x, y, then z axes of
@@ -192,6 +220,41 @@ def euler_123(angles):
     return R1 * R2 * R3
 
 
+def euler_123_batch(angles):
+    """Returns the direction cosine matrices of many rotated frames, as a
+    function of their Euler 123 angles (body fixed rotations). This is the
+    vectorized version of :py:func:`euler_123`.
+
+    Parameters
+    ----------
+    angles : array_like, shape(..., 3)
+        The three angles (in units of radians) of each rotation, in the last
+        axis. See :py:func:`euler_123`.
+
+    Returns
+    -------
+    R : numpy.ndarray, shape(..., 3, 3)
+        The rotation matrix of each set of angles, such that R[i] * v_b =
+        v_a.
+
+    """
+    angles = np.asarray(angles, dtype=float)
+    c1, c2, c3 = np.rollaxis(np.cos(angles), -1)
+    s1, s2, s3 = np.rollaxis(np.sin(angles), -1)
+
+    R = np.empty(angles.shape[:-1] + (3, 3))
+    R[..., 0, 0] = c2 * c3
+    R[..., 0, 1] = -c2 * s3
+    R[..., 0, 2] = s2
+    R[..., 1, 0] = s1 * s2 * c3 + s3 * c1
+    R[..., 1, 1] = -s1 * s2 * s3 + c3 * c1
+    R[..., 1, 2] = -s1 * c2
+    R[..., 2, 0] = -c1 * s2 * c3 + s3 * s1
+    R[..., 2, 1] = c1 * s2 * s3 + c3 * s1
+    R[..., 2, 2] = c1 * c2
+    return R
+
+
 def rotate3_inertia(rotation_matrix, inertia):
 
     __doc__ = rotate_inertia.__doc__
@@ -259,6 +322,30 @@ def rotate_inertia(rotation_matrix, inertia):
     return rotation_matrix.T * inertia * rotation_matrix
 
 
+def rotate_inertia_batch(rotation_matrix, inertia):
+    """Returns inertia tensors expressed in many rotated reference frames,
+    R^T * I * R. This is the vectorized version of
+    :py:func:`rotate_inertia`; the inputs are broadcast against each other.
+
+    Parameters
+    ----------
+    rotation_matrix : array_like, shape(..., 3, 3)
+        Rotation matrices that transform vectors in the rotated reference
+        frames into the current reference frame.
+    inertia : array_like, shape(..., 3, 3)
+        Inertia tensors in the current reference frame.
+
+    Returns
+    -------
+    rotated_inertia : numpy.ndarray, shape(..., 3, 3)
+        The inertia tensors expressed in the rotated reference frames.
+
+    """
+    rotation_matrix = np.asarray(rotation_matrix, dtype=float)
+    return np.matmul(np.matmul(np.swapaxes(rotation_matrix, -1, -2),
+                               np.asarray(inertia)), rotation_matrix)
+
+
 def total_com(coordinates, masses):
     """
     Returns the center of mass of a group of objects if the indivdual
@@ -306,3 +393,120 @@ def principal_axes(I):
     Ip = Ip[indices]
     C = C.T[indices]
     return Ip, C
+
+
+# The permutations of three axes, and the index of the composition of any two
+# of them: _PERMUTATIONS[_COMPOSE[i, j]] = _PERMUTATIONS[i][_PERMUTATIONS[j]].
+_PERMUTATIONS = np.array([[0, 1, 2], [0, 2, 1], [1, 0, 2], [1, 2, 0],
+                          [2, 0, 1], [2, 1, 0]])
+_COMPOSE = np.array([[[tuple(p) for p in _PERMUTATIONS.tolist()].index(
+                      tuple(_PERMUTATIONS[i][_PERMUTATIONS[j]]))
+                      for j in range(6)] for i in range(6)])
+
+
+def _eigh_3x3(I):
+    """Returns the eigenvalues, in increasing order, and the eigenvectors
+    (columns) of many symmetric 3x3 matrices, shape(N, 3, 3), in closed
+    form. Matrices with (nearly) repeated eigenvalues, for which the closed
+    form is inaccurate, are passed to np.linalg.eigh."""
+    I = np.asarray(I, dtype=float)
+    q = np.trace(I, axis1=-2, axis2=-1) / 3.0
+    shifted = I - q[:, np.newaxis, np.newaxis] * np.eye(3)
+    p = np.sqrt(np.einsum('nij,nij->n', shifted, shifted) / 6.0)
+    scale = np.where(p > 0.0, p, 1.0)
+    r = np.clip(np.linalg.det(shifted / scale[:, np.newaxis, np.newaxis]) /
+                2.0, -1.0, 1.0)
+    phi = np.arccos(r) / 3.0
+    values = np.empty((len(I), 3))
+    values[:, 2] = q + 2.0 * p * np.cos(phi)
+    values[:, 0] = q + 2.0 * p * np.cos(phi + 2.0 * np.pi / 3.0)
+    values[:, 1] = 3.0 * q - values[:, 0] - values[:, 2]
+
+    def null_vector(value):
+        # The largest cross product of two rows of I - value * E.
+        rows = I - value[:, np.newaxis, np.newaxis] * np.eye(3)
+        crosses = np.stack((np.cross(rows[:, 0], rows[:, 1]),
+                            np.cross(rows[:, 0], rows[:, 2]),
+                            np.cross(rows[:, 1], rows[:, 2])), axis=1)
+        norms = np.linalg.norm(crosses, axis=2)
+        best = np.argmax(norms, axis=1)
+        vector = crosses[np.arange(len(I)), best]
+        norm = norms[np.arange(len(I)), best]
+        return vector / np.where(norm > 0.0, norm, 1.0)[:, np.newaxis]
+
+    vectors = np.empty(I.shape)
+    vectors[:, :, 0] = null_vector(values[:, 0])
+    vectors[:, :, 2] = null_vector(values[:, 2])
+    vectors[:, :, 1] = np.cross(vectors[:, :, 2], vectors[:, :, 0])
+
+    gap = np.minimum(values[:, 1] - values[:, 0], values[:, 2] - values[:, 1])
+    degenerate = gap <= 1e-6 * np.maximum(np.abs(values).max(axis=1), 1e-300)
+    if np.any(degenerate):
+        values[degenerate], vectors[degenerate] = \
+                np.linalg.eigh(I[degenerate])
+    return values, vectors
+
+
+def principal_axes_batch(I, continuous=False, closed_form=False):
+    """Returns the principal moments of inertia and the principal axes of
+    many inertia tensors, e.g. of the frames of a trajectory. This is the
+    vectorized version of :py:func:`principal_axes`, for symmetric tensors.
+
+    Parameters
+    ----------
+    I : array_like, shape(N, 3, 3)
+        Inertia tensors.
+    continuous : bool, optional
+        If True, the order and the sign of the axes are chosen so that each
+        axis changes as little as possible from one tensor to the next (e.g.
+        for plots of the axes along a trajectory). The moments are then
+        sorted from smallest to largest in the first tensor only.
+    closed_form : bool, optional
+        If True, the eigenvalues and eigenvectors are computed with the
+        closed-form solution for symmetric 3x3 matrices, instead of with
+        np.linalg.eigh. Tensors with (nearly) repeated moments are still
+        passed to np.linalg.eigh.
+
+    Returns
+    -------
+    Ip : ndarray, shape(N, 3)
+        The principal moments of inertia, sorted smallest to largest unless
+        `continuous` is True.
+    C : ndarray, shape(N, 3, 3)
+        The rotation matrices: C[n, i] is the principal axis of Ip[n, i], as
+        in :py:func:`principal_axes`.
+
+    """
+    I = np.asarray(I, dtype=float)
+    if closed_form:
+        Ip, vectors = _eigh_3x3(I)
+    else:
+        Ip, vectors = np.linalg.eigh(I)
+    C = np.swapaxes(vectors, 1, 2)
+    if not continuous or len(I) < 2:
+        return Ip, C
+
+    # Overlap of the axes of consecutive tensors, and the permutation that
+    # best matches the axes of each tensor to those of the previous one.
+    overlap = np.abs(np.einsum('nik,njk->nij', C[:-1], C[1:]))
+    scores = overlap[:, np.arange(3), _PERMUTATIONS].sum(axis=2)
+    steps = np.argmax(scores, axis=1)
+    # Compose the permutations along the trajectory; the order only changes
+    # where a step is not the identity.
+    changes = np.nonzero(steps)[0]
+    orders = [0]
+    for step in steps[changes]:
+        orders.append(_COMPOSE[step, orders[-1]])
+    orders = np.array(orders)[np.searchsorted(changes + 1,
+                                              np.arange(len(I)),
+                                              side='right')]
+    indices = _PERMUTATIONS[orders]
+    rows = np.arange(len(I))[:, np.newaxis]
+    Ip = Ip[rows, indices]
+    C = C[rows, indices]
+    # Flip the axes that point away from the previous ones.
+    signs = np.ones((len(I), 3))
+    signs[1:] = np.where(np.einsum('nij,nij->ni', C[:-1], C[1:]) < 0.0,
+                         -1.0, 1.0)
+    C *= np.cumprod(signs, axis=0)[:, :, np.newaxis]
+    return Ip, C
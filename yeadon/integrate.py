@@ -0,0 +1,230 @@
+"""The integrate module contains the explicit Runge-Kutta integrators used by
+the simulations of :py:mod:`yeadon.flight` and :py:mod:`yeadon.dynamics`:
+the adaptive Dormand-Prince 5(4) method and the classical fourth order
+method with a fixed step. It only depends on NumPy.
+
+The state may be any array, e.g. shape(F, 3) for F simulations that are
+integrated together. All simulations then take the same steps: the step size
+of the adaptive method is controlled by the largest error of any of them.
+
+"""
+# Use Python3 integer division rules.
+from __future__ import division
+
+import numpy as np
+
+# The Dormand-Prince 5(4) tableau. The last stage is evaluated at the new
+# state, so it is the first stage of the next step.
+_C = np.array([0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0, 1.0])
+_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+    (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+    )
+# Difference between the weights of the fifth and the fourth order solutions.
+_E = np.array([71 / 57600, 0.0, -71 / 16695, 71 / 1920, -17253 / 339200,
+               22 / 525, -1 / 40])
+
+
+class Solution(object):
+    """The states of an integration at the accepted steps or at requested
+    times.
+
+    Attributes
+    ----------
+    times : np.ndarray, shape(M,)
+        Times of the states.
+    states : np.ndarray, shape(M, ...)
+        The state at each time.
+    rates : np.ndarray, shape(M, ...)
+        The time derivative of the state at each time.
+    n_steps : int
+        Number of accepted steps.
+    n_rejected : int
+        Number of rejected steps.
+    n_evaluations : int
+        Number of evaluations of the derivative.
+
+    """
+    def __init__(self, times, states, rates, n_steps, n_rejected,
+                 n_evaluations):
+        self.times = times
+        self.states = states
+        self.rates = rates
+        self.n_steps = n_steps
+        self.n_rejected = n_rejected
+        self.n_evaluations = n_evaluations
+
+
+def dormand_prince(fun, t0, t1, y0, rtol=1e-6, atol=1e-8, times=None,
+                   first_step=None, max_steps=100000, prepare=None):
+    """Integrates dy/dt = fun(t, y) from t0 to t1 with the adaptive
+    Dormand-Prince 5(4) method.
+
+    Parameters
+    ----------
+    fun : callable
+        fun(t, y) returns the time derivative of the state y (an array of
+        the shape of `y0`) at time t.
+    t0, t1 : float
+        Initial and final time, t1 > t0.
+    y0 : array_like
+        Initial state. If it has more than one dimension, the leading
+        dimensions are separate systems that are integrated together (e.g.
+        shape(F, 3) for F systems of three states).
+    rtol, atol : float, optional
+        Relative and absolute tolerances of the error of each step. The
+        steps are controlled by the root mean square, over the last axis of
+        the state, of the error relative to atol + rtol * abs(y), and by the
+        largest of these over the systems.
+    times : array_like, shape(M,), optional
+        Increasing times between t0 and t1 at which the states are returned.
+        The steps end at these times. By default, the states are returned at
+        t0 and at the end of every accepted step.
+    first_step : float, optional
+        Size of the first step. By default, one hundredth of t1 - t0.
+    max_steps : int, optional
+        A RuntimeError is raised if more steps are needed.
+    prepare : callable, optional
+        prepare(stage_times) is called before the stages of each step with
+        the times, shape(6,), at which fun is then evaluated, so that terms
+        that depend only on time can be computed for all stages at once.
+
+    Returns
+    -------
+    solution : :py:class:`Solution`
+
+    """
+    t0, t1 = float(t0), float(t1)
+    if not t1 > t0:
+        raise ValueError('The final time must be greater than the initial '
+                         'time.')
+    y = np.array(y0, dtype=float)
+    if times is None:
+        targets = np.array([t1])
+    else:
+        targets = np.asarray(times, dtype=float)
+        if (np.any(np.diff(targets) <= 0.0) or targets[0] < t0 or
+                targets[-1] > t1):
+            raise ValueError('The output times must increase and lie '
+                             'between t0 and t1.')
+    h = 0.01 * (t1 - t0) if first_step is None else float(first_step)
+    if prepare is not None:
+        prepare(np.array([t0]))
+    k = [fun(t0, y)] + [None] * 6
+    out_times, out_states, out_rates = [], [], []
+    if times is None or targets[0] == t0:
+        out_times.append(t0)
+        out_states.append(y)
+        out_rates.append(k[0])
+    target = int(targets[0] == t0)
+    t = t0
+    n_steps = n_rejected = 0
+    n_evaluations = 1
+    while target < len(targets):
+        if n_steps + n_rejected >= max_steps:
+            raise RuntimeError('The integration needs more than {0} '
+                               'steps.'.format(max_steps))
+        # Land exactly on the next output time.
+        step = min(h, targets[target] - t)
+        last = step >= targets[target] - t
+        if prepare is not None:
+            prepare(t + _C[1:] * step)
+        for i in range(1, 7):
+            increment = sum(a * k[j] for j, a in enumerate(_A[i]) if a)
+            k[i] = fun(t + _C[i] * step, y + step * increment)
+        n_evaluations += 6
+        y_new = y + step * increment
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+        error = step * sum(e * k[j] for j, e in enumerate(_E) if e) / scale
+        norm = np.sqrt(np.mean(error**2, axis=-1)).max()
+        if norm <= 1.0:
+            t = targets[target] if last else t + step
+            y = y_new
+            k[0] = k[6]
+            n_steps += 1
+            if last or times is None:
+                out_times.append(t)
+                out_states.append(y)
+                out_rates.append(k[0])
+            if last:
+                target += 1
+        else:
+            n_rejected += 1
+        factor = 5.0 if norm == 0.0 else 0.9 * norm**-0.2
+        step *= min(5.0, max(0.2, factor))
+        # A step that was shortened to land on an output time does not
+        # shorten the next one.
+        h = max(h, step) if last and norm <= 1.0 else step
+    return Solution(np.array(out_times), np.array(out_states),
+                    np.array(out_rates), n_steps, n_rejected, n_evaluations)
+
+
+def runge_kutta(fun, t0, t1, y0, step, times=None):
+    """Integrates dy/dt = fun(t, y) from t0 to t1 with the classical fourth
+    order Runge-Kutta method and a fixed step.
+
+    Parameters
+    ----------
+    fun : callable
+        fun(t, y) returns the time derivative of the state y (an array of
+        the shape of `y0`) at time t.
+    t0, t1 : float
+        Initial and final time, t1 > t0.
+    y0 : array_like
+        Initial state, see :py:func:`dormand_prince`.
+    step : float
+        The largest step. The interval to each output time is divided into
+        equal steps no longer than this.
+    times : array_like, shape(M,), optional
+        Increasing times between t0 and t1 at which the states are returned.
+        By default, the states are returned at t0 and at the end of every
+        step.
+
+    Returns
+    -------
+    solution : :py:class:`Solution`
+
+    """
+    t0, t1 = float(t0), float(t1)
+    if not t1 > t0:
+        raise ValueError('The final time must be greater than the initial '
+                         'time.')
+    if times is None:
+        n_steps = int(np.ceil((t1 - t0) / step))
+        targets = np.linspace(t0, t1, n_steps + 1)
+    else:
+        targets = np.asarray(times, dtype=float)
+        if (np.any(np.diff(targets) <= 0.0) or targets[0] < t0 or
+                targets[-1] > t1):
+            raise ValueError('The output times must increase and lie '
+                             'between t0 and t1.')
+    y = np.array(y0, dtype=float)
+    k1 = fun(t0, y)
+    out_times, out_states, out_rates = [], [], []
+    if targets[0] == t0:
+        out_times.append(t0)
+        out_states.append(y)
+        out_rates.append(k1)
+    t = t0
+    n_steps = 0
+    for target in targets[targets > t0]:
+        n = int(np.ceil((target - t) / step * (1.0 - 1e-12)))
+        h = (target - t) / n
+        for i in range(n):
+            k2 = fun(t + h / 2, y + h / 2 * k1)
+            k3 = fun(t + h / 2, y + h / 2 * k2)
+            k4 = fun(t + h, y + h * k3)
+            y = y + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+            t = target if i == n - 1 else t + h
+            k1 = fun(t, y)
+        n_steps += n
+        out_times.append(t)
+        out_states.append(y)
+        out_rates.append(k1)
+    return Solution(np.array(out_times), np.array(out_states),
+                    np.array(out_rates), n_steps, 0, 1 + 4 * n_steps)
@@ -0,0 +1,310 @@
+"""The mesh module exports the surface of a human as a triangle mesh, for use
+in other software (e.g. CAD, CFD, or renderers) without MayaVi. The surface
+of each solid is closed: the ends of each stadium solid are capped, and the
+head's base is closed. The solids are not merged into a single watertight
+surface; the mesh is the union of the closed surfaces of all solids, in one
+vertex buffer and one face buffer.
+
+The meshes of the solids, in their own frames, are generated once (see
+:py:meth:`yeadon.solid.Solid._triangle_mesh`); posing a human only rotates
+and translates these vertices. The vertices of many configurations (e.g. the
+frames of a trajectory) are posed at once, with the batched forward
+kinematics of :py:class:`yeadon.tree.SegmentTree`.
+
+The level of detail of the meshes ('low', 'medium', or 'high'; see
+:py:data:`yeadon.solid.mesh_levels`) is the human's `mesh_level` unless it is
+given in the call. The meshes of each level are kept, so switching between
+levels does not regenerate them.
+
+The mesh can be written as binary STL, Wavefront OBJ, or binary PLY. The
+format is chosen by the extension of the file name.
+
+"""
+# Use Python3 integer division rules.
+from __future__ import division
+import os
+
+import numpy as np
+
+from .solid import check_mesh_level
+from .tree import SegmentTree
+
+file_formats = ('stl', 'obj', 'ply')
+
+
+def _solids(human):
+    """Returns the solids of a human, in the order of its segments."""
+    return [solid for segment in human.segments for solid in segment.solids]
+
+
+def _mesh_level(human, mesh_level):
+    """Returns the level of detail to use: `mesh_level`, or the human's."""
+    if mesh_level is None:
+        mesh_level = human.mesh_level
+    check_mesh_level(mesh_level)
+    return mesh_level
+
+
+def mesh_template(human, mesh_level=None):
+    """Returns the triangles of all the solids of a human, each in the
+    solid's own frame. The faces are already offset so that they index into
+    the concatenation of the vertices of all solids.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    mesh_level : str, optional
+        Level of detail. By default, the human's `mesh_level`.
+
+    Returns
+    -------
+    vertices : list of np.ndarray, shape(V_i, 3)
+        Vertices of each solid, in the solid's frame.
+    faces : np.ndarray of int, shape(F, 3)
+        Indices of the vertices of each triangle.
+
+    """
+    mesh_level = _mesh_level(human, mesh_level)
+    vertices = []
+    faces = []
+    n_vertices = 0
+    for solid in _solids(human):
+        solid_vertices, solid_faces = solid._triangle_mesh(mesh_level)
+        vertices.append(solid_vertices)
+        faces.append(solid_faces + n_vertices)
+        n_vertices += len(solid_vertices)
+    return vertices, np.vstack(faces)
+
+
+def human_mesh(human, mesh_level=None):
+    """Returns the surface of a human, in its current configuration, as one
+    triangle mesh.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    mesh_level : str, optional
+        Level of detail. By default, the human's `mesh_level`.
+
+    Returns
+    -------
+    vertices : np.ndarray, shape(V, 3)
+        Vertex coordinates (m) in the global frame.
+    faces : np.ndarray of int, shape(F, 3)
+        Indices of the vertices of each triangle, ordered counterclockwise
+        when seen from outside the solid.
+
+    """
+    local, faces = mesh_template(human, mesh_level)
+    vertices = np.vstack([
+        np.dot(solid_vertices, np.asarray(solid._rot_mat).T) +
+        np.asarray(solid.pos).T
+        for solid, solid_vertices in zip(_solids(human), local)])
+    return vertices, faces
+
+
+def segment_template(human, mesh_level=None, tree=None):
+    """Returns the triangles of all the solids of a human, with the vertices
+    of each segment's solids in the segment's frame. The vertices are in the
+    same order as those of :py:func:`human_mesh`.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    mesh_level : str, optional
+        Level of detail. By default, the human's `mesh_level`.
+    tree : :py:class:`yeadon.tree.SegmentTree`, optional
+        The tree of the human, if it has already been created.
+
+    Returns
+    -------
+    vertices : list of np.ndarray, shape(V_s, 3)
+        Vertices of the solids of each segment, in the segment's frame.
+    faces : np.ndarray of int, shape(F, 3)
+        Indices of the vertices of each triangle.
+
+    """
+    if tree is None:
+        tree = SegmentTree(human)
+    local, faces = mesh_template(human, mesh_level)
+    vertices = [[] for segment in human.segments]
+    for i, solid_vertices in enumerate(local):
+        # A solid has the orientation of its segment.
+        vertices[tree.solid_segments[i]].append(solid_vertices +
+                                                tree.solid_offsets[i])
+    return [np.vstack(segment_vertices) for segment_vertices in vertices], \
+            faces
+
+
+def pose_vertices(vertices, rot_mats, positions):
+    """Returns the vertices of the segments of a human in many
+    configurations.
+
+    Parameters
+    ----------
+    vertices : list of np.ndarray, shape(V_s, 3)
+        Vertices of each segment, in the segment's frame, as returned by
+        :py:func:`segment_template`.
+    rot_mats, positions : np.ndarray, shape(T, 11, 3, 3) and shape(T, 11, 3)
+        Orientation and position of each segment, as returned by
+        :py:meth:`yeadon.tree.SegmentTree.forward_kinematics`.
+
+    Returns
+    -------
+    posed : np.ndarray, shape(T, V, 3)
+        The vertices of all segments, in the global frame.
+
+    """
+    posed = np.empty((len(rot_mats), sum(len(v) for v in vertices), 3))
+    start = 0
+    for i, segment_vertices in enumerate(vertices):
+        stop = start + len(segment_vertices)
+        posed[:, start:stop] = np.einsum('tij,vj->tvi', rot_mats[:, i],
+                segment_vertices) + positions[:, i, np.newaxis]
+        start = stop
+    return posed
+
+
+def trajectory_vertices(human, CFGs, mesh_level=None):
+    """Returns the surface of a human in many configurations, e.g. the
+    frames of a trajectory. All frames share the same faces, so only the
+    vertices are returned per frame. The human itself is not modified.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    CFGs : dict, sequence of dict, or array_like, shape(T, 21)
+        Configurations, see :py:meth:`yeadon.Human.CFG_to_array`.
+    mesh_level : str, optional
+        Level of detail. By default, the human's `mesh_level`.
+
+    Returns
+    -------
+    vertices : np.ndarray, shape(T, V, 3)
+        Vertex coordinates (m) in the global frame, for each frame.
+    faces : np.ndarray of int, shape(F, 3)
+        Indices of the vertices of each triangle.
+
+    """
+    CFGs = human.CFG_to_array(CFGs)
+    tree = SegmentTree(human)
+    vertices, faces = segment_template(human, mesh_level, tree)
+    return pose_vertices(vertices, *tree.forward_kinematics(CFGs)), faces
+
+
+def write_trajectory(human, CFGs, fname_pattern, file_format=None,
+                     mesh_level=None):
+    """Writes the surface of a human in many configurations, one file per
+    frame.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    CFGs : dict, sequence of dict, or array_like, shape(T, 21)
+        Configurations, see :py:meth:`yeadon.Human.CFG_to_array`.
+    fname_pattern : str
+        Pattern for the file names, formatted with the index of the frame,
+        e.g. 'frame{0:04d}.stl'.
+    file_format : str, optional
+        'stl', 'obj', or 'ply'. By default, given by the extension of the
+        file names.
+    mesh_level : str, optional
+        Level of detail. By default, the human's `mesh_level`.
+
+    Returns
+    -------
+    fnames : list of str
+        The names of the files that were written.
+
+    """
+    vertices, faces = trajectory_vertices(human, CFGs, mesh_level)
+    fnames = []
+    for i, frame in enumerate(vertices):
+        fnames.append(fname_pattern.format(i))
+        write_mesh(fnames[-1], frame, faces, file_format)
+    return fnames
+
+
+def write_mesh(fname, vertices, faces, file_format=None):
+    """Writes a triangle mesh to a file.
+
+    Parameters
+    ----------
+    fname : str
+        Name of the file.
+    vertices : array_like, shape(V, 3)
+        Vertex coordinates.
+    faces : array_like of int, shape(F, 3)
+        Indices of the vertices of each triangle.
+    file_format : str, optional
+        'stl' (binary), 'obj', or 'ply' (binary). By default, given by the
+        extension of `fname`.
+
+    """
+    if file_format is None:
+        file_format = os.path.splitext(fname)[1][1:]
+    file_format = file_format.lower()
+    if file_format not in file_formats:
+        raise ValueError("Mesh file format '{0}' is not one of {1}.".format(
+            file_format, file_formats))
+    vertices = np.asarray(vertices, dtype=float)
+    faces = np.asarray(faces, dtype=int)
+    {'stl': write_stl, 'obj': write_obj, 'ply': write_ply}[file_format](
+        fname, vertices, faces)
+
+
+def write_stl(fname, vertices, faces):
+    """Writes a triangle mesh as a binary STL file. See
+    :py:func:`write_mesh`.
+
+    """
+    triangles = vertices[faces]
+    normals = np.cross(triangles[:, 1] - triangles[:, 0],
+                       triangles[:, 2] - triangles[:, 0])
+    norm = np.linalg.norm(normals, axis=1)
+    normals /= np.where(norm > 0.0, norm, 1.0)[:, np.newaxis]
+    records = np.zeros(len(faces), dtype=[('normal', '<f4', (3,)),
+                                          ('vertices', '<f4', (3, 3)),
+                                          ('attribute', '<u2')])
+    records['normal'] = normals
+    records['vertices'] = triangles
+    with open(fname, 'wb') as fid:
+        fid.write(b'yeadon'.ljust(80, b' '))
+        fid.write(np.array(len(faces), dtype='<u4').tobytes())
+        fid.write(records.tobytes())
+
+
+def write_obj(fname, vertices, faces):
+    """Writes a triangle mesh as a Wavefront OBJ file. See
+    :py:func:`write_mesh`.
+
+    """
+    with open(fname, 'wb') as fid:
+        np.savetxt(fid, vertices, fmt='v %.9g %.9g %.9g')
+        # OBJ indices start at 1.
+        np.savetxt(fid, faces + 1, fmt='f %d %d %d')
+
+
+def write_ply(fname, vertices, faces):
+    """Writes a triangle mesh as a binary (little endian) PLY file. See
+    :py:func:`write_mesh`.
+
+    """
+    header = ('ply\n'
+              'format binary_little_endian 1.0\n'
+              'comment yeadon\n'
+              'element vertex {0}\n'
+              'property float x\n'
+              'property float y\n'
+              'property float z\n'
+              'element face {1}\n'
+              'property list uchar int vertex_indices\n'
+              'end_header\n').format(len(vertices), len(faces))
+    records = np.empty(len(faces), dtype=[('count', 'u1'),
+                                          ('indices', '<i4', (3,))])
+    records['count'] = 3
+    records['indices'] = faces
+    with open(fname, 'wb') as fid:
+        fid.write(header.encode('ascii'))
+        fid.write(np.asarray(vertices, dtype='<f4').tobytes())
+        fid.write(records.tobytes())
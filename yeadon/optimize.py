@@ -0,0 +1,375 @@
+"""The optimize module searches for the technique of a twisting somersault:
+the joint angle profiles that, in a given flight time and with a given
+angular momentum at take-off, maximize the twist or land the human in a
+target orientation.
+
+The profiles of a few joints (by default, the arms and the hips) are
+parameterized by their angles at equally spaced knots, which are
+interpolated by the cubic Hermite splines of
+:py:class:`yeadon.flight.SampledMotion`, and the flight is simulated with
+:py:func:`yeadon.flight.simulate`. The knot angles are bounded by
+Human.CFGbounds.
+
+SciPy is not needed: :py:func:`optimize` is a projected gradient method
+whose gradients are central finite differences, and all perturbed flights of
+a gradient (and all step sizes of a line search) are simulated as one batch.
+The flights of a batch take the same integration steps, so the finite
+differences are not disturbed by the step size control.
+:py:func:`multi_start` runs the optimization from many starting points in a
+pool of processes.
+
+"""
+# Use Python3 integer division rules.
+from __future__ import division
+import multiprocessing
+import time
+
+import numpy as np
+
+from . import flight
+from .human import Human
+from .tree import SegmentTree
+
+# The joints whose profiles are optimized by default: the arms and the hips.
+technique_joints = ('CA1extension', 'CA1adduction', 'CB1extension',
+                    'CB1abduction', 'PJ1extension', 'PK1extension')
+
+
+class TechniqueProblem(object):
+    """The flight of a human whose joint angle profiles are the parameters
+    of an optimization.
+
+    The parameters x, shape(P,), with P = len(joint_names) * n_knots, are
+    the angles of the joints at the knots: x[j * n_knots + k] is the angle
+    of joint_names[j] at knot k. The other joint angles are held at their
+    values in `CFG`.
+
+    Attributes
+    ----------
+    joint_names : tuple of str
+        The optimized joints.
+    knot_times : np.ndarray, shape(n_knots,)
+        Times of the knots (s), from take-off to landing.
+    lower, upper : np.ndarray, shape(P,)
+        Bounds of the parameters, from Human.CFGbounds.
+    x0 : np.ndarray, shape(P,)
+        The parameters that hold the joints at their values in `CFG`.
+
+    """
+
+    def __init__(self, human, duration, angular_momentum,
+                 joint_names=technique_joints, n_knots=5, CFG=None,
+                 target=None, twist_direction=1.0, rtol=1e-6, atol=1e-8,
+                 tree=None):
+        """
+        Parameters
+        ----------
+        human : :py:class:`yeadon.Human`
+        duration : float
+            Flight time (s).
+        angular_momentum : array_like, shape(3,)
+            Angular momentum about the center of mass at take-off
+            (kg-m^2/s), in the global frame.
+        joint_names : sequence of str, optional
+            The joints whose profiles are optimized, from
+            :py:data:`yeadon.flight.joint_names`.
+        n_knots : int, optional
+            Number of knots of each profile, at least 3.
+        CFG : dict or array_like, shape(21,), optional
+            The configuration at take-off: the orientation and the angles of
+            the joints that are not optimized. By default, the human's
+            current configuration.
+        target : array_like, shape(3,), optional
+            Somersault, tilt, and twist at landing (rad). If given, the
+            objective is the squared error of the orientation at landing.
+            By default, the objective is the twist at landing, which is
+            maximized.
+        twist_direction : float, optional
+            1.0 to maximize the twist, -1.0 to maximize the twist in the
+            negative direction. Used only without `target`.
+        rtol, atol : float, optional
+            Tolerances of the simulation, see
+            :py:func:`yeadon.flight.simulate`.
+        tree : :py:class:`yeadon.tree.SegmentTree`, optional
+            The tree of the human, if it has already been created.
+
+        """
+        for name in joint_names:
+            if name not in flight.joint_names:
+                raise ValueError("'{0}' is not the name of a joint "
+                                 "angle.".format(name))
+        if n_knots < 3:
+            raise ValueError("At least 3 knots are needed, not "
+                             "{0}.".format(n_knots))
+        self.human = human
+        self.tree = SegmentTree(human) if tree is None else tree
+        self.duration = float(duration)
+        self.angular_momentum = np.asarray(angular_momentum, dtype=float)
+        self.joint_names = tuple(joint_names)
+        self.n_knots = n_knots
+        self.knot_times = np.linspace(0.0, self.duration, n_knots)
+        CFG = Human.CFG_to_array(human.CFG if CFG is None else CFG)[0]
+        self.orientation = CFG[:3]
+        self.angles = CFG[3:]
+        self.target = None if target is None else np.asarray(target,
+                                                              dtype=float)
+        self.twist_direction = twist_direction
+        self.rtol = rtol
+        self.atol = atol
+        self._columns = [flight.joint_names.index(name)
+                         for name in self.joint_names]
+        bounds = np.array([Human.CFGbounds[Human.CFGnames.index(name)]
+                           for name in self.joint_names], dtype=float)
+        self.lower = np.repeat(bounds[:, 0], n_knots)
+        self.upper = np.repeat(bounds[:, 1], n_knots)
+        self.x0 = np.clip(np.repeat(self.angles[self._columns], n_knots),
+                          self.lower, self.upper)
+
+    @property
+    def n_parameters(self):
+        return len(self.lower)
+
+    def clip(self, x):
+        """Returns the parameters moved into their bounds."""
+        return np.clip(x, self.lower, self.upper)
+
+    def motion(self, x):
+        """Returns the joint motion, a :py:class:`yeadon.flight.SampledMotion`,
+        of parameters shape(P,), or of many parameters shape(F, P)."""
+        x = np.asarray(x, dtype=float)
+        shape = x.shape[:-1] + (self.n_knots, len(flight.joint_names))
+        angles = np.empty(shape)
+        angles[...] = self.angles
+        angles[..., self._columns] = np.swapaxes(
+                x.reshape(x.shape[:-1] + (len(self.joint_names),
+                                          self.n_knots)), -1, -2)
+        return flight.SampledMotion(self.knot_times, angles)
+
+    def simulate(self, x, times=None):
+        """Returns the :py:class:`yeadon.flight.Flight` of parameters
+        shape(P,), or of many parameters shape(F, P), at `times` (by
+        default, at the steps of the integrator)."""
+        return flight.simulate(self.human, self.motion(x),
+                               self.angular_momentum, self.duration,
+                               orientation=self.orientation, times=times,
+                               rtol=self.rtol, atol=self.atol, tree=self.tree)
+
+    def objective(self, x):
+        """Returns the objective, which is minimized, of parameters
+        shape(P,) as a float, or of many parameters shape(F, P) as an array
+        of shape(F,)."""
+        orientation = self.simulate(x, [self.duration]).orientations[..., -1, :]
+        if self.target is None:
+            return -self.twist_direction * orientation[..., 2]
+        return np.sum((orientation - self.target)**2, axis=-1)
+
+    def gradient(self, x, step=1e-4):
+        """Returns the objective and its gradient, shape(P,), at parameters
+        x, shape(P,), by central differences with the given step (rad). The
+        2 P + 1 flights are simulated together."""
+        x = np.asarray(x, dtype=float)
+        perturbations = step * np.eye(len(x))
+        values = self.objective(np.vstack((x, x + perturbations,
+                                           x - perturbations)))
+        forward, backward = values[1:].reshape((2, len(x)))
+        return values[0], (forward - backward) / (2 * step)
+
+
+class Result(object):
+    """The result of :py:func:`optimize`.
+
+    Attributes
+    ----------
+    x : np.ndarray, shape(P,)
+        The best parameters that were found.
+    objective : float
+        The objective at `x`.
+    gradient : np.ndarray, shape(P,)
+        The gradient of the objective at `x`.
+    converged : bool
+        True if the tolerance was met before the maximum number of
+        iterations.
+    n_iterations : int
+        Number of iterations.
+    n_flights : int
+        Number of simulated flights.
+    history : np.ndarray, shape(n_iterations + 1,)
+        The objective at the start and after each iteration.
+    seconds : float
+        Wall-clock time of the optimization (s).
+
+    """
+
+    def __init__(self, x, objective, gradient, converged, n_iterations,
+                 n_flights, history, seconds):
+        self.x = x
+        self.objective = objective
+        self.gradient = gradient
+        self.converged = converged
+        self.n_iterations = n_iterations
+        self.n_flights = n_flights
+        self.history = history
+        self.seconds = seconds
+
+    def __repr__(self):
+        return ('Result(objective={0:.6g}, converged={1}, n_iterations={2}, '
+                'n_flights={3}, seconds={4:.3g})'.format(
+                    self.objective, self.converged, self.n_iterations,
+                    self.n_flights, self.seconds))
+
+
+def optimize(problem, x0=None, max_iterations=50, tolerance=1e-6,
+             step=1e-4, n_trials=8, verbose=False):
+    """Minimizes the objective of a problem within its bounds with projected
+    gradient descent.
+
+    Each iteration computes the gradient by central differences and then
+    tries `n_trials` step lengths, halving from the last accepted one, in
+    one batch of flights. The longest step length that decreases the
+    objective sufficiently (Armijo's condition along the projected path) is
+    accepted.
+
+    Parameters
+    ----------
+    problem : :py:class:`TechniqueProblem`
+    x0 : array_like, shape(P,), optional
+        Starting parameters. By default, problem.x0.
+    max_iterations : int, optional
+        Maximum number of iterations.
+    tolerance : float, optional
+        The optimization has converged when the projected gradient step, or
+        the decrease of the objective relative to 1 + abs(objective), is
+        less than this.
+    step : float, optional
+        Step of the finite differences (rad).
+    n_trials : int, optional
+        Number of step lengths tried per iteration.
+    verbose : bool, optional
+        Prints the objective after each iteration.
+
+    Returns
+    -------
+    result : :py:class:`Result`
+
+    """
+    start = time.time()
+    x = problem.clip(problem.x0 if x0 is None else x0)
+    objective, gradient = problem.gradient(x, step)
+    n_flights = 2 * len(x) + 1
+    history = [objective]
+    # The first step length moves the parameters by at most half a radian.
+    length = 0.5 / max(np.abs(gradient).max(), 1e-12)
+    factors = 0.5**np.arange(n_trials)
+    converged = False
+    iteration = 0
+    while iteration < max_iterations:
+        if np.abs(problem.clip(x - gradient) - x).max() < tolerance:
+            converged = True
+            break
+        iteration += 1
+        trials = problem.clip(x - (length * factors)[:, np.newaxis] *
+                              gradient)
+        values = problem.objective(trials)
+        n_flights += n_trials
+        sufficient = values <= objective + 1e-4 * np.dot(trials - x,
+                                                         gradient)
+        if not np.any(sufficient):
+            # Try shorter steps in the next iteration.
+            length *= 0.5**n_trials
+            history.append(objective)
+            if length * np.abs(gradient).max() < tolerance:
+                converged = True
+                break
+            continue
+        best = np.argmax(sufficient)
+        decrease = objective - values[best]
+        x = trials[best]
+        objective, gradient = problem.gradient(x, step)
+        n_flights += 2 * len(x) + 1
+        history.append(objective)
+        # Lengthen the step if the longest one was accepted.
+        length *= 2.0 if best == 0 else factors[best]
+        if verbose:
+            print('Iteration {0}: objective {1:.6g}, step length '
+                  '{2:.3g}'.format(iteration, objective, length))
+        if decrease < tolerance * (1.0 + abs(objective)):
+            converged = True
+            break
+    return Result(x, objective, gradient, converged, iteration, n_flights,
+                  np.array(history), time.time() - start)
+
+
+_shared = dict()
+
+
+def _init_worker(problem, options):
+    _shared['problem'] = problem
+    _shared['options'] = options
+
+
+def _optimize_start(args):
+    index, x0 = args
+    return index, optimize(_shared['problem'], x0, **_shared['options'])
+
+
+def multi_start(problem, n_starts=8, processes=None, seed=None,
+                verbose=False, **options):
+    """Optimizes a problem from many starting points, in a pool of
+    processes.
+
+    The first starting point is problem.x0, and the others are drawn
+    uniformly within the bounds.
+
+    Parameters
+    ----------
+    problem : :py:class:`TechniqueProblem`
+    n_starts : int, optional
+        Number of starting points.
+    processes : int, optional
+        Number of processes. By default, the number of CPUs. With 1, the
+        optimizations run in this process.
+    seed : int, optional
+        Seed of the random starting points.
+    verbose : bool, optional
+        Prints the result and the time of each optimization as it finishes,
+        and the total time.
+    options :
+        Passed on to :py:func:`optimize`.
+
+    Returns
+    -------
+    results : list of :py:class:`Result`
+        The results of all starting points, best first.
+
+    """
+    start = time.time()
+    random = np.random.RandomState(seed)
+    starts = random.uniform(problem.lower, problem.upper,
+                            (n_starts, problem.n_parameters))
+    starts[0] = problem.x0
+    tasks = list(enumerate(starts))
+    if processes == 1:
+        _init_worker(problem, options)
+        finished = (_optimize_start(task) for task in tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, _init_worker,
+                                    (problem, options))
+        finished = pool.imap_unordered(_optimize_start, tasks)
+    results = [None] * n_starts
+    try:
+        for count, (index, result) in enumerate(finished):
+            results[index] = result
+            if verbose:
+                print('Start {0} ({1}/{2}): objective {3:.6g} after {4} '
+                      'iterations and {5} flights, {6:.2f} s'.format(
+                          index, count + 1, n_starts, result.objective,
+                          result.n_iterations, result.n_flights,
+                          result.seconds))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if verbose:
+        print('{0} starts in {1:.2f} s'.format(n_starts, time.time() - start))
+    return sorted(results, key=lambda result: result.objective)
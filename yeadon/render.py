@@ -0,0 +1,213 @@
+"""The render module draws a human with matplotlib's Agg backend, for
+machines without MayaVi or without a display (e.g. to make thumbnails of
+many postures for a report). All solids are drawn as a single
+Poly3DCollection, built from the cached meshes of the solids (see
+:py:mod:`yeadon.mesh`), and each segment has the color it has in
+:py:meth:`yeadon.Human.draw`.
+
+Many configurations are posed at once with
+:py:func:`yeadon.animation.bake_frames` and are then rendered to image files
+(e.g. PNG) by a pool of processes.
+
+The figures are drawn on their own Agg canvases, so this module does not use
+matplotlib.pyplot and does not change matplotlib's backend.
+
+"""
+# Use Python3 integer division rules.
+from __future__ import division
+import multiprocessing
+
+import numpy as np
+try:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+except ImportError:
+    pass
+
+from . import animation
+
+
+def _check_matplotlib():
+    try:
+        Figure
+    except NameError:
+        raise ImportError('matplotlib is not installed, this function is not '
+                          'available.')
+
+
+def _face_colors(frames):
+    """Returns the color of each triangle of baked frames."""
+    return np.asarray(frames.colors, dtype=float)[frames.face_segments]
+
+
+def draw_mesh(vertices, faces, face_colors, center_of_mass=None,
+              limits=None, elev=20.0, azim=-60.0, size=(4.0, 4.0), dpi=100,
+              alpha=1.0):
+    """Returns a matplotlib figure of a triangle mesh.
+
+    Parameters
+    ----------
+    vertices : np.ndarray, shape(V, 3)
+        Vertex coordinates.
+    faces : np.ndarray of int, shape(F, 3)
+        Indices of the vertices of each triangle.
+    face_colors : array_like, shape(F, 3)
+        RGB color of each triangle, with values between 0 and 1.
+    center_of_mass : array_like, shape(3,), optional
+        If given, the center of mass is drawn as a black dot.
+    limits : array_like, shape(3, 2), optional
+        Lower and upper limits of the x, y, and z axes. By default, a cube
+        that contains all vertices.
+    elev, azim : float, optional
+        Elevation and azimuth of the view, in degrees.
+    size : tuple of float, optional
+        Width and height of the figure, in inches.
+    dpi : int, optional
+        Resolution of the figure, in dots per inch.
+    alpha : float, optional
+        Opacity of the triangles.
+
+    Returns
+    -------
+    fig : matplotlib.figure.Figure
+        The figure, on an Agg canvas. Save it with fig.savefig.
+
+    """
+    _check_matplotlib()
+    fig = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, projection='3d')
+    collection = Poly3DCollection(vertices[faces], linewidths=0.0)
+    colors = np.ones((len(faces), 4))
+    colors[:, :3] = face_colors
+    colors[:, 3] = alpha
+    collection.set_facecolor(colors)
+    ax.add_collection3d(collection)
+    if center_of_mass is not None:
+        ax.scatter(*np.reshape(center_of_mass, (3, 1)), color='k', s=20)
+
+    if limits is None:
+        center = 0.5 * (vertices.min(axis=0) + vertices.max(axis=0))
+        half_width = 0.5 * (vertices.max(axis=0) - vertices.min(axis=0)).max()
+        limits = np.column_stack((center - half_width, center + half_width))
+    ax.set_xlim(limits[0])
+    ax.set_ylim(limits[1])
+    ax.set_zlim(limits[2])
+    if hasattr(ax, 'set_box_aspect'):
+        ax.set_box_aspect(np.ptp(limits, axis=1))
+    ax.set_xlabel('x')
+    ax.set_ylabel('y')
+    ax.set_zlabel('z')
+    ax.view_init(elev=elev, azim=azim)
+    return fig
+
+
+def render_human(human, fname=None, mesh_level=None, show_mass_center=True,
+                 **kwargs):
+    """Draws a human in its current configuration.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    fname : str, optional
+        If given, the figure is saved to this file (e.g. a PNG file).
+    mesh_level : str, optional
+        Level of detail of the meshes. By default, the human's
+        `mesh_level`.
+    show_mass_center : bool, optional
+        Draws the center of mass of the human.
+    kwargs :
+        Passed on to :py:func:`draw_mesh`.
+
+    Returns
+    -------
+    fig : matplotlib.figure.Figure
+
+    """
+    frames = animation.bake_frames(human, human.CFG, mesh_level)
+    fig = draw_mesh(frames.vertices[0], frames.faces,
+                    _face_colors(frames),
+                    frames.center_of_mass[0] if show_mass_center else None,
+                    **kwargs)
+    if fname is not None:
+        fig.savefig(fname)
+    return fig
+
+
+# Data shared by the frames that a process of the pool renders.
+_shared = dict()
+
+
+def _init_worker(faces, face_colors, kwargs):
+    _shared['faces'] = faces
+    _shared['face_colors'] = face_colors
+    _shared['kwargs'] = kwargs
+
+
+def _render_frame(args):
+    fname, vertices, center_of_mass = args
+    fig = draw_mesh(vertices, _shared['faces'], _shared['face_colors'],
+                    center_of_mass, **_shared['kwargs'])
+    fig.savefig(fname)
+    return fname
+
+
+def render_configurations(human, CFGs, fname_pattern, processes=None,
+                          mesh_level=None, show_mass_center=True,
+                          fixed_limits=False, **kwargs):
+    """Renders a human in many configurations to image files (e.g. PNG), in
+    a pool of processes.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    CFGs : dict, sequence of dict, or array_like, shape(N, 21)
+        Configurations, see :py:meth:`yeadon.Human.CFG_to_array`.
+    fname_pattern : str
+        Pattern for the file names, formatted with the index of the
+        configuration, e.g. 'posture{0:05d}.png'.
+    processes : int, optional
+        Number of processes. By default, the number of CPUs. With 1, the
+        figures are rendered in this process.
+    mesh_level : str, optional
+        Level of detail of the meshes. By default, the human's
+        `mesh_level`.
+    show_mass_center : bool, optional
+        Draws the center of mass of the human.
+    fixed_limits : bool, optional
+        If True, all figures have the same axes limits, which contain the
+        human in all configurations. By default, the limits fit each
+        configuration.
+    kwargs :
+        Passed on to :py:func:`draw_mesh`.
+
+    Returns
+    -------
+    fnames : list of str
+        The names of the files that were written.
+
+    """
+    _check_matplotlib()
+    frames = animation.bake_frames(human, CFGs, mesh_level)
+    face_colors = _face_colors(frames)
+    if fixed_limits and 'limits' not in kwargs:
+        lower = frames.vertices.min(axis=(0, 1))
+        upper = frames.vertices.max(axis=(0, 1))
+        center = 0.5 * (lower + upper)
+        half_width = 0.5 * (upper - lower).max()
+        kwargs['limits'] = np.column_stack((center - half_width,
+                                            center + half_width))
+    tasks = [(fname_pattern.format(i), frames.vertices[i],
+              frames.center_of_mass[i] if show_mass_center else None)
+             for i in range(len(frames))]
+    if processes == 1:
+        _init_worker(frames.faces, face_colors, kwargs)
+        return [_render_frame(task) for task in tasks]
+    pool = multiprocessing.Pool(processes, _init_worker,
+                                (frames.faces, face_colors, kwargs))
+    try:
+        return pool.map(_render_frame, tasks)
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,463 @@
+"""The results module stores results that are computed for many
+configurations of a human, such as the inertia tensors of a configuration
+sweep or of a trajectory, on disk. A result store holds named arrays (fields)
+whose first axis is the sample index. Samples are appended in chunks, so the
+results never have to be held in memory at once, and a store can be reopened
+to append more samples or to resume an interrupted computation.
+
+The default layout is a directory with a ``metadata.json`` file and one
+``.npy`` file per field. Reading a field memory-maps its ``.npy`` file, so
+post-processing does not copy the data. If h5py or zarr is installed, the
+fields can instead be stored as datasets of an HDF5 file or as zarr arrays.
+
+"""
+# Use Python3 integer division rules.
+from __future__ import division
+import hashlib
+import io
+import json
+import os
+import shutil
+
+import numpy as np
+try:
+    import h5py
+except ImportError:
+    pass
+try:
+    import zarr
+except ImportError:
+    pass
+
+from .human import Human
+from .tree import SegmentTree
+
+
+def human_metadata(human):
+    """Returns the metadata that identifies the results of a human: a
+    fingerprint of its measurements, densities, and overrides of solids (see
+    :py:meth:`yeadon.Human.set_solid_override`), the order of the CFG
+    columns, and the density set.
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+
+    Returns
+    -------
+    metadata : dict
+
+    """
+    hasher = hashlib.sha1()
+    hasher.update(np.array([human.meas[name] for name in Human.measnames],
+                           dtype='<f8').tobytes())
+    densities = human.segmental_densities[human._density_set]
+    hasher.update(np.array([densities[name] for name in Human.segment_names],
+                           dtype='<f8').tobytes())
+    hasher.update(repr((str(human._density_set),
+                        bool(human.is_symmetric))).encode('ascii'))
+    # The overrides of solids, if any, in a canonical form.
+    overrides = human.solid_overrides
+    for label in sorted(overrides):
+        override = overrides[label]
+        values = [override.get('density', 0.0), override.get('height', 0.0)]
+        for stadium in override.get('stadia', ()):
+            values += [stadium.perimeter, stadium.width,
+                       float(stadium.alignment == 'AP')]
+        hasher.update(label.encode('ascii'))
+        hasher.update(np.array(values, dtype='<f8').tobytes())
+    return {'fingerprint': hasher.hexdigest(),
+            'CFGnames': list(Human.CFGnames),
+            'density_set': human._density_set}
+
+
+def _normalize_metadata(metadata):
+    """Returns the metadata as it is read back from JSON."""
+    return json.loads(json.dumps(metadata))
+
+
+class ResultStore(object):
+    """Base class of the result stores. Subclasses implement the storage of
+    the fields."""
+
+    def __init__(self, path, mode='a', metadata=None):
+        """Opens or creates a result store.
+
+        Parameters
+        ----------
+        path : str
+            Location of the store.
+        mode : str, optional
+            'a' (default) opens an existing store for appending, or creates
+            it. 'r' opens an existing store read-only. 'w' creates a new
+            store, discarding an existing one.
+        metadata : dict, optional
+            JSON-serializable description of the results, e.g. from
+            :py:func:`human_metadata`. When creating a store, it is saved
+            with it. When opening an existing store, it must match the saved
+            metadata, so that results of different humans or densities are
+            not mixed up.
+
+        """
+        if mode not in ('r', 'a', 'w'):
+            raise ValueError("Mode {0!r} is not one of 'r', 'a', or "
+                    "'w'.".format(mode))
+        self.path = path
+        self.mode = mode
+        if mode == 'w' or (mode == 'a' and not self._exists()):
+            self.metadata = _normalize_metadata(metadata or {})
+            self._create(self.metadata)
+        elif not self._exists():
+            raise IOError("There is no result store at {0!r}.".format(path))
+        else:
+            self._open()
+            self.metadata = self._read_metadata()
+            if metadata is not None:
+                for key, val in _normalize_metadata(metadata).items():
+                    if key in self.metadata and self.metadata[key] != val:
+                        raise ValueError("The {0!r} of the result store at "
+                                "{1!r} does not match.".format(key, path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        """The number of samples that every field has."""
+        counts = [self._count(name) for name in self.fields]
+        return min(counts) if counts else 0
+
+    def __getitem__(self, name):
+        """Returns the samples of a field."""
+        if name not in self.fields:
+            raise KeyError(name)
+        return self._read(name, len(self))
+
+    @property
+    def fields(self):
+        """Names of the stored fields, a sorted list of str."""
+        return sorted(self._field_names())
+
+    def append(self, **arrays):
+        """Appends a chunk of samples to the fields. The first append
+        defines the fields, and every later append must provide all of them.
+        If an earlier append was interrupted, samples beyond the number that
+        all fields have are overwritten.
+
+        Parameters
+        ----------
+        arrays : array_like
+            One keyword per field, with the same number of samples along the
+            first axis.
+
+        """
+        if self.mode == 'r':
+            raise IOError("The result store is read-only.")
+        arrays = dict((name, np.asarray(array)) for name, array in
+                      arrays.items())
+        if len(set(len(array) for array in arrays.values())) != 1:
+            raise ValueError("All fields must have the same number of "
+                    "samples.")
+        fields = self.fields
+        if fields and sorted(arrays) != fields:
+            raise ValueError("Expected the fields {0}, got {1}.".format(
+                fields, sorted(arrays)))
+        start = len(self)
+        for name, array in arrays.items():
+            if name in fields:
+                shape, dtype = self._field_info(name)
+                if array.shape[1:] != shape:
+                    raise ValueError("Samples of {0!r} must have shape {1}, "
+                            "not {2}.".format(name, shape, array.shape[1:]))
+                self._append_field(name, np.ascontiguousarray(array,
+                                                              dtype=dtype),
+                                   start)
+            else:
+                self._create_field(name, np.ascontiguousarray(array))
+
+    def close(self):
+        """Releases the resources of the store."""
+        pass
+
+
+class NpyResultStore(ResultStore):
+    """Result store in a directory of .npy files, which are read
+    memory-mapped."""
+
+    def _metadata_fname(self):
+        return os.path.join(self.path, 'metadata.json')
+
+    def _fname(self, name):
+        return os.path.join(self.path, name + '.npy')
+
+    def _exists(self):
+        return os.path.isfile(self._metadata_fname())
+
+    def _create(self, metadata):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        for name in self._field_names():
+            os.remove(self._fname(name))
+        self._open()
+        with open(self._metadata_fname(), 'w') as fid:
+            json.dump(metadata, fid, indent=2, sort_keys=True)
+
+    def _open(self):
+        self._headers = dict()
+
+    def _read_metadata(self):
+        with open(self._metadata_fname(), 'r') as fid:
+            return json.load(fid)
+
+    def _field_names(self):
+        return [fname[:-4] for fname in os.listdir(self.path)
+                if fname.endswith('.npy')]
+
+    def _header(self, name):
+        """Returns the version, shape, dtype, and data offset of a field's
+        .npy file."""
+        if name not in self._headers:
+            with open(self._fname(name), 'rb') as fid:
+                self._headers[name] = self._read_header(fid)
+        return self._headers[name]
+
+    @staticmethod
+    def _read_header(fid):
+        version = np.lib.format.read_magic(fid)
+        if version == (1, 0):
+            shape, fortran_order, dtype = \
+                    np.lib.format.read_array_header_1_0(fid)
+        else:
+            shape, fortran_order, dtype = \
+                    np.lib.format.read_array_header_2_0(fid)
+        if fortran_order:
+            raise ValueError("Fields must be stored in C order.")
+        return version, shape, dtype, fid.tell()
+
+    def _count(self, name):
+        return self._header(name)[1][0]
+
+    def _field_info(self, name):
+        version, shape, dtype, offset = self._header(name)
+        return shape[1:], dtype
+
+    def _read(self, name, n):
+        return np.load(self._fname(name), mmap_mode='r')[:n]
+
+    def _create_field(self, name, array):
+        np.save(self._fname(name), array)
+
+    def _append_field(self, name, array, start):
+        version, shape, dtype, offset = self._header(name)
+        new_shape = (start + len(array),) + shape[1:]
+        row_bytes = dtype.itemsize * int(np.prod(shape[1:]))
+        header = io.BytesIO()
+        descr = {'descr': np.lib.format.dtype_to_descr(dtype),
+                 'fortran_order': False,
+                 'shape': new_shape}
+        if version == (1, 0):
+            np.lib.format.write_array_header_1_0(header, descr)
+        else:
+            np.lib.format.write_array_header_2_0(header, descr)
+        header = header.getvalue()
+        with open(self._fname(name), 'r+b') as fid:
+            fid.seek(offset + start * row_bytes)
+            fid.write(array.tobytes())
+            fid.truncate()
+            if len(header) == offset:
+                # NumPy pads the header so that it usually can be rewritten
+                # in place as the array grows.
+                fid.seek(0)
+                fid.write(header)
+            else:
+                fid.seek(offset)
+                data = fid.read()
+                fid.seek(0)
+                fid.write(header)
+                fid.write(data)
+                fid.truncate()
+        self._headers[name] = (version, new_shape, dtype, len(header))
+
+
+class HDF5ResultStore(ResultStore):
+    """Result store in an HDF5 file, with one resizable dataset per field.
+    Requires h5py. Reading a field copies it into memory."""
+
+    def _exists(self):
+        return os.path.isfile(self.path)
+
+    def _create(self, metadata):
+        self._file = h5py.File(self.path, 'w')
+        self._file.attrs['metadata'] = json.dumps(metadata)
+
+    def _open(self):
+        self._file = h5py.File(self.path, 'r' if self.mode == 'r' else 'a')
+
+    def _read_metadata(self):
+        return json.loads(self._file.attrs['metadata'])
+
+    def _field_names(self):
+        return list(self._file.keys())
+
+    def _count(self, name):
+        return self._file[name].shape[0]
+
+    def _field_info(self, name):
+        return self._file[name].shape[1:], self._file[name].dtype
+
+    def _read(self, name, n):
+        return self._file[name][:n]
+
+    def _create_field(self, name, array):
+        row_bytes = array.dtype.itemsize * int(np.prod(array.shape[1:]))
+        chunk_rows = max(1, 2**20 // max(1, row_bytes))
+        self._file.create_dataset(name, data=array,
+                                  maxshape=(None,) + array.shape[1:],
+                                  chunks=(chunk_rows,) + array.shape[1:])
+
+    def _append_field(self, name, array, start):
+        dataset = self._file[name]
+        dataset.resize(start + len(array), axis=0)
+        dataset[start:] = array
+
+    def close(self):
+        self._file.close()
+
+
+class ZarrResultStore(NpyResultStore):
+    """Result store in a directory of zarr arrays, one per field. Requires
+    zarr. Reading a field copies it into memory."""
+
+    def _fname(self, name):
+        return os.path.join(self.path, name)
+
+    def _field_names(self):
+        return [name for name in os.listdir(self.path)
+                if os.path.isdir(self._fname(name))]
+
+    def _create(self, metadata):
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        super(ZarrResultStore, self)._create(metadata)
+
+    def _array(self, name):
+        return zarr.open_array(self._fname(name),
+                               mode='r' if self.mode == 'r' else 'r+')
+
+    def _count(self, name):
+        return self._array(name).shape[0]
+
+    def _field_info(self, name):
+        array = self._array(name)
+        return array.shape[1:], array.dtype
+
+    def _read(self, name, n):
+        return self._array(name)[:n]
+
+    def _create_field(self, name, array):
+        row_bytes = array.dtype.itemsize * int(np.prod(array.shape[1:]))
+        chunk_rows = max(1, 2**20 // max(1, row_bytes))
+        stored = zarr.open_array(self._fname(name), mode='w',
+                                 shape=array.shape, dtype=array.dtype,
+                                 chunks=(chunk_rows,) + array.shape[1:])
+        stored[...] = array
+
+    def _append_field(self, name, array, start):
+        stored = self._array(name)
+        if stored.shape[0] != start:
+            stored.resize((start,) + stored.shape[1:])
+        stored.append(array, axis=0)
+
+
+def open_result_store(path, mode='a', metadata=None):
+    """Opens or creates a result store, choosing its layout from the
+    extension of `path`: '.h5' or '.hdf5' for HDF5, '.zarr' for zarr, and
+    a directory of .npy files otherwise.
+
+    Parameters
+    ----------
+    path : str
+        Location of the store.
+    mode : str, optional
+        See :py:class:`ResultStore`.
+    metadata : dict, optional
+        See :py:class:`ResultStore`.
+
+    Returns
+    -------
+    store : :py:class:`ResultStore`
+
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.h5', '.hdf5'):
+        try:
+            h5py
+        except NameError:
+            raise ImportError("h5py is not installed, HDF5 result stores "
+                    "are not available.")
+        return HDF5ResultStore(path, mode, metadata)
+    elif extension == '.zarr':
+        try:
+            zarr
+        except NameError:
+            raise ImportError("zarr is not installed, zarr result stores are "
+                    "not available.")
+        return ZarrResultStore(path, mode, metadata)
+    else:
+        return NpyResultStore(path, mode, metadata)
+
+
+def sweep_configurations(human, CFGs, store, chunk_size=1024, objlist=None):
+    """Computes the center of mass and inertia tensor of a human (or of a
+    combination of its solids and segments) for many configurations, and
+    appends them to a result store in chunks. If the store already holds
+    results, they must be those of the first configurations, and the sweep
+    resumes after them. Each chunk is computed at once
+    with the batched kinematics of :py:class:`yeadon.tree.SegmentTree`; the
+    human itself is not modified.
+
+    The store receives the fields 'CFG', shape(N, 21), 'center_of_mass',
+    shape(N, 3), and 'inertia', shape(N, 3, 3).
+
+    Parameters
+    ----------
+    human : :py:class:`yeadon.Human`
+    CFGs : array_like, shape(N, 21), or sequence of dict
+        The configurations, see :py:meth:`yeadon.Human.CFG_to_array`.
+    store : :py:class:`ResultStore`
+        Where the results are written. If its metadata has a fingerprint,
+        it must be that of the human.
+    chunk_size : int, optional
+        Number of configurations that are computed between writes.
+    objlist : tuple of str, optional
+        If given, the properties of this combination of solids and/or
+        segments (see :py:meth:`yeadon.Human.combine_inertia`) are computed
+        instead of those of the whole human.
+
+    Returns
+    -------
+    store : :py:class:`ResultStore`
+
+    """
+    fingerprint = store.metadata.get('fingerprint')
+    if (fingerprint is not None and
+            fingerprint != human_metadata(human)['fingerprint']):
+        raise ValueError("The result store holds results of another human.")
+    CFGs = Human.CFG_to_array(CFGs)
+    done = min(len(store), len(CFGs))
+    if done > 0 and not np.array_equal(store['CFG'][:done], CFGs[:done]):
+        raise ValueError("The result store holds results of other "
+                         "configurations.")
+    if objlist is None:
+        mass_properties = SegmentTree(human).mass_properties
+    else:
+        combination = human.compile_combination(objlist)
+        mass_properties = lambda chunk: combination.evaluate_batch(chunk)[1:]
+    for start in range(len(store), len(CFGs), chunk_size):
+        chunk = CFGs[start:start + chunk_size]
+        center_of_mass, inertia = mass_properties(chunk)
+        store.append(CFG=chunk, center_of_mass=center_of_mass,
+                     inertia=inertia)
+    return store
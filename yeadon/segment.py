@@ -312,10 +312,13 @@ Inertia tensor in global frame about segment's COM (kg-m^2):
         for s in self.solids:
             s.print_properties(precision=precision, suppress=suppress)
 
-    def draw_mayavi(self, mlabobj):
-        """Draws in a MayaVi window all the solids within this segment.  """
+    def draw_mayavi(self, mlabobj, mesh_level='medium'):
+        """Draws in a MayaVi window all the solids within this segment, with
+        meshes at the given level of detail (see yeadon.solid.mesh_levels).
+
+        """
         for s in self.solids:
-            s.draw_mayavi(mlabobj, self.color)
+            s.draw_mayavi(mlabobj, self.color, mesh_level)
 
     def _update_mayavi(self):
         """Updates all of the solids in this segment for MayaVi."""
@@ -14,6 +14,18 @@ import numpy as np
 from . import inertia
 from .utils import printoptions
 
+# Levels of detail of the meshes that are used to draw and export solids.
+# Coarse meshes keep interactive drawing responsive; fine meshes are meant for
+# export. The mesh of each level is generated the first time it is needed.
+mesh_levels = ('low', 'medium', 'high')
+
+
+def check_mesh_level(mesh_level):
+    """Raises a ValueError if `mesh_level` is not one of `mesh_levels`."""
+    if mesh_level not in mesh_levels:
+        raise ValueError("Mesh level {0!r} is not one of {1}.".format(
+            mesh_level, mesh_levels))
+
 class Stadium(object):
     """Stadium, the 2D shape.
 
@@ -234,6 +246,16 @@ class Solid(object):
         self._rel_inertia = np.zeros((3, 3)) # this gets set in subclasses
         self._mass = 0.0
         self._rel_center_of_mass = np.array([[0.0], [0.0], [0.0]])
+        self._reset_meshes()
+        self._mesh_level = 'medium'
+
+    def _reset_meshes(self):
+        """Discards the visualization meshes, e.g. after the geometry of the
+        solid has changed."""
+        # Visualization meshes are generated on first use, for each level of
+        # detail.
+        self._orig_mesh = dict()
+        self._orig_triangles = dict()
 
     def set_orientation(self, proximal_pos, rot_mat, build_toward_positive_z):
         """Sets the position, rotation matrix of the solid, and calculates
@@ -348,11 +370,77 @@ Inertia tensor in global frame about solid's COM (kg-m^2):
     def draw_mayavi(self, mlabobj, col):
         raise NotImplementedError()
 
+    def _triangle_mesh(self, mesh_level='medium'):
+        """Returns a closed triangle mesh of the surface of the solid, in the
+        solid's frame. The mesh is generated from the un-rotated mesh points
+        the first time it is needed and then kept.
+
+        Parameters
+        ----------
+        mesh_level : str, optional
+            Level of detail, one of `mesh_levels`.
+
+        Returns
+        -------
+        vertices : np.ndarray, shape(V, 3)
+            Vertex coordinates in the solid's frame, from the solid's origin.
+        faces : np.ndarray, shape(F, 3)
+            Vertex indices of each triangle, ordered counterclockwise when
+            seen from outside the solid.
+
+        """
+        if mesh_level not in self._orig_triangles:
+            vertices, faces = self._make_triangles(mesh_level)
+            # Merge the vertices that coincide (e.g. where the quarter circles
+            # of a stadium meet, or at the seam and pole of a semiellipsoid)
+            # so that the surface is closed, and drop the triangles that have
+            # collapsed to a line or a point.
+            tolerance = 1e-9 * np.abs(vertices).max()
+            vertices, index = np.unique(np.round(vertices / tolerance),
+                                        axis=0, return_inverse=True)
+            vertices = vertices * tolerance
+            faces = np.reshape(index, -1)[faces]
+            a, b, c = (vertices[faces[:, i]] for i in range(3))
+            area = np.linalg.norm(np.cross(b - a, c - a), axis=1)
+            faces = faces[area > 1e-12 * area.max()]
+            # The sign of the enclosed volume tells whether the faces are
+            # ordered inside out (e.g. if x and y were swapped for an
+            # anteroposterior stadium).
+            a, b, c = (vertices[faces[:, i]] for i in range(3))
+            if np.sum(a * np.cross(b, c)) < 0:
+                faces = faces[:, ::-1]
+            self._orig_triangles[mesh_level] = (
+                    vertices, np.ascontiguousarray(faces))
+        return self._orig_triangles[mesh_level]
+
+    def _make_triangles(self, mesh_level):
+        raise NotImplementedError()
+
+    def _get_orig_mesh_points(self, mesh_level='medium'):
+        """Returns the un-rotated coordinates of the solid at a level of
+        detail. They are generated the first time they are needed (e.g. for
+        drawing) and then kept.
+
+        Parameters
+        ----------
+        mesh_level : str, optional
+            Level of detail, one of `mesh_levels`.
+
+        """
+        if mesh_level not in self._orig_mesh:
+            check_mesh_level(mesh_level)
+            self._orig_mesh[mesh_level] = self._make_mesh(mesh_level)
+        return self._orig_mesh[mesh_level]
+
 
 class StadiumSolid(Solid):
     """Stadium solid. Derived from the solid class.
 
     """
+    # Number of points on each quarter of the outline of a stadium, for each
+    # level of detail.
+    n_quarter_points = {'low': 3, 'medium': 5, 'high': 17}
+
     def __init__(self, label, density, stadium0, stadium1, height):
         """Defines a stadium solid object. Creates its base object, and
         calculates relative/local inertia properties.
@@ -372,6 +460,21 @@ class StadiumSolid(Solid):
 
         """
         super(StadiumSolid, self).__init__(label, density, height)
+        self.set_stadia(stadium0, stadium1)
+        self.calc_rel_properties()
+
+    def set_stadia(self, stadium0, stadium1):
+        """Replaces the lower and upper stadia of the solid. The properties
+        must then be recalculated with calc_rel_properties.
+
+        Parameters
+        ----------
+        stadium0 : :py:class:`Stadium`
+            Lower stadium of the stadium solid.
+        stadium1 : :py:class:`Stadium`
+            Upper stadium of the stadium solid.
+
+        """
         self.stads = [stadium0, stadium1]
         self.alignment = 'ML'
         # if either stadium is oriented anteroposteriorly.
@@ -383,10 +486,7 @@ class StadiumSolid(Solid):
             self.degenerate_by_t0 = True
         else:
             self.degenerate_by_t0 = False
-        self.calc_rel_properties()
-        self._orig_mesh_points = list()
-        self._orig_mesh_points.append(self._make_mesh(0))
-        self._orig_mesh_points.append(self._make_mesh(1))
+        self._reset_meshes()
 
     def calc_rel_properties(self):
         """Calculates mass, relative center of mass, and relative/local
@@ -464,7 +564,7 @@ class StadiumSolid(Solid):
             self._rel_inertia = inertia.rotate_inertia(
                     inertia.rotate_space_123([0, 0, np.pi/2]), self.rel_inertia)
 
-    def draw_mayavi(self, mlabobj, col):
+    def draw_mayavi(self, mlabobj, col, mesh_level='medium'):
         """Draws the initial stadium in 3D using MayaVi.
 
         Parameters
@@ -473,8 +573,13 @@ class StadiumSolid(Solid):
             The MayaVi object we can draw on.
         col : tuple (3,)
             Color as an rgb tuple, with values between 0 and 1.
+        mesh_level : str, optional
+            Level of detail, one of `mesh_levels`. Updates of the drawing use
+            the same level.
 
         """
+        check_mesh_level(mesh_level)
+        self._mesh_level = mesh_level
         self._generate_mesh()
         self._mesh = mlabobj.mesh(self._mesh_points['x'], self._mesh_points['y'],
                 self._mesh_points['z'], color=col, opacity=Solid.alpha)
@@ -487,45 +592,76 @@ class StadiumSolid(Solid):
 
     def _generate_mesh(self):
         """Generates grid points for a MayaVi mesh."""
-        X0, Y0, Z0 = self._make_pos(0)
-        X1, Y1, Z1 = self._make_pos(1)
+        X0, Y0, Z0 = self._make_pos(0, self._mesh_level)
+        X1, Y1, Z1 = self._make_pos(1, self._mesh_level)
         Xpts = np.array(np.concatenate( (X0, X1), axis=0))
         Ypts = np.array(np.concatenate( (Y0, Y1), axis=0))
         Zpts = np.array(np.concatenate( (Z0, Z1), axis=0))
         self._mesh_points = {'x': Xpts, 'y': Ypts, 'z': Zpts}
 
-    def _make_mesh(self, i):
-        """Generates the un-rotated coordinates of the solid. These values are
-        saved at instantiation.
+    def _make_mesh(self, mesh_level):
+        """Generates the un-rotated coordinates of the bottom and top stadia
+        of the solid, a list of two np.ndarray's of shape (3, n), where n is
+        4 * n_quarter_points[mesh_level]. These values are saved the first
+        time they are used; see _get_orig_mesh_points.
+
+        """
+        return [self._make_stadium_mesh(0, mesh_level),
+                self._make_stadium_mesh(1, mesh_level)]
+
+    def _make_stadium_mesh(self, i, mesh_level):
+        """Generates the un-rotated coordinates of one stadium of the solid.
 
         Parameters
         ----------
         i : int
             Identifies which stadium to generate the mesh points for (the top
             or bottom).
+        mesh_level : str
+            Level of detail, one of `mesh_levels`.
 
         """
-        theta = [np.linspace(0.0,np.pi/2,5)]
+        n = self.n_quarter_points[mesh_level]
+        theta = [np.linspace(0.0,np.pi/2,n)]
         x = self.stads[i].thickness + self.stads[i].radius * np.cos(theta);
         y = self.stads[i].radius * np.sin(theta);
-        if self.alignment == 'AP':
-            temp = x
-            x = y
-            y = temp
-            del temp
         xrev = x[:, ::-1]
         yrev = y[:, ::-1]
         X = np.concatenate( (x, -xrev, -x, xrev), axis=1)
         Y = np.concatenate( (y, yrev, -y, -yrev), axis=1)
-        Z = i*self.height*np.ones((1,20))
+        if self.alignment == 'AP':
+            # Swap the axes of the whole outline, not of the quarter circle
+            # it is mirrored from.
+            X, Y = Y, X
+        Z = i*self.height*np.ones((1,4*n))
         POSES = np.concatenate( (X, Y, Z), axis=0)
         return POSES
 
-    def _make_pos(self, i):
+    def _make_triangles(self, mesh_level):
+        """Triangulates the side of the solid between its two stadia, and
+        closes both ends with a fan of triangles around the stadium's
+        center.
+
+        """
+        bottom, top = self._get_orig_mesh_points(mesh_level)
+        n = bottom.shape[1]
+        vertices = np.vstack((bottom.T, top.T, [[0.0, 0.0, 0.0]],
+                              [[0.0, 0.0, self.height]]))
+        k = np.arange(n)
+        k1 = (k + 1) % n
+        faces = np.vstack((
+            np.column_stack((k, k1, n + k1)),
+            np.column_stack((k, n + k1, n + k)),
+            np.column_stack((np.full(n, 2 * n), k1, k)),
+            np.column_stack((np.full(n, 2 * n + 1), n + k, n + k1))))
+        return vertices, faces
+
+    def _make_pos(self, i, mesh_level='medium'):
         """Generates coordinates to be used for 3D visualization purposes.
 
         """
-        rotated_points = self._rot_mat * self._orig_mesh_points[i]
+        rotated_points = (self._rot_mat *
+                          self._get_orig_mesh_points(mesh_level)[i])
         X, Y, Z = np.vsplit(rotated_points, 3)
         X = X + self.pos[0]
         Y = Y + self.pos[1]
@@ -562,7 +698,10 @@ class StadiumSolid(Solid):
 class Semiellipsoid(Solid):
     """Semiellipsoid."""
 
-    n_mesh_points = 30
+    # Number of points along the azimuth and along the colatitude of the
+    # mesh, for each level of detail.
+    n_mesh_points = {'low': 12, 'medium': 30, 'high': 60}
+
     def __init__(self,label,density,baseperim,height):
         """Defines a semiellipsoid (solid) object. Creates its base object, and
         calculates relative/local inertia properties. The base is circular (its
@@ -582,10 +721,15 @@ class Semiellipsoid(Solid):
 
         """
         super(Semiellipsoid, self).__init__(label, density, height)
+        self.set_base_perimeter(baseperim)
+        self.calc_rel_properties()
+
+    def set_base_perimeter(self, baseperim):
+        """Replaces the perimeter of the circular base. The properties must
+        then be recalculated with calc_rel_properties."""
         self.baseperimeter = baseperim
         self.radius = self.baseperimeter/(2.0*np.pi)
-        self.calc_rel_properties()
-        self._mesh_x, self._mesh_y, self._mesh_z = self._make_mesh()
+        self._reset_meshes()
 
     def calc_rel_properties(self):
         """Calculates mass, relative center of mass, and relative/local
@@ -605,7 +749,7 @@ class Semiellipsoid(Solid):
                                   [0.0,Iycom,0.0],
                                   [0.0,0.0,Izcom]])
 
-    def draw_mayavi(self, mlabobj, col):
+    def draw_mayavi(self, mlabobj, col, mesh_level='medium'):
         """Draws the semiellipsoid in 3D using MayaVi.
 
         Parameters
@@ -614,8 +758,13 @@ class Semiellipsoid(Solid):
             The MayaVi object we can draw on.
         col : tuple (3,)
             Color as an rgb tuple, with values between 0 and 1.
+        mesh_level : str, optional
+            Level of detail, one of `mesh_levels`. Updates of the drawing use
+            the same level.
 
         """
+        check_mesh_level(mesh_level)
+        self._mesh_level = mesh_level
         self._generate_mesh()
         self._mesh = mlabobj.mesh(*self._mesh_points, color=col,
                 opacity=Solid.alpha)
@@ -628,38 +777,58 @@ class Semiellipsoid(Solid):
 
     def _generate_mesh(self):
         """Generates a mesh for MayaVi."""
-        self._mesh_points = self._make_pos()
+        self._mesh_points = self._make_pos(self._mesh_level)
 
-    def _make_mesh(self):
-        """Generates the un-rotated coordinates of the solid. These values are
-        saved at instantiation.
+    def _make_mesh(self, mesh_level):
+        """Generates the un-rotated x, y, and z coordinates of the solid, a
+        tuple of np.ndarray's of shape (n, n), where n is
+        n_mesh_points[mesh_level]. These values are saved the first time they
+        are used; see _get_orig_mesh_points.
 
         """
-        u = np.linspace(0, 2.0 * np.pi, self.n_mesh_points)
-        v = np.linspace(0, np.pi / 2.0, self.n_mesh_points)
+        n = self.n_mesh_points[mesh_level]
+        u = np.linspace(0, 2.0 * np.pi, n)
+        v = np.linspace(0, np.pi / 2.0, n)
         x = self.radius * np.outer(np.cos(u), np.sin(v))
         y = self.radius * np.outer(np.sin(u), np.sin(v))
         z = self.height * np.outer(np.ones(np.size(u)), np.cos(v))
         return x, y, z
 
-    def _make_pos(self):
+    def _make_triangles(self, mesh_level):
+        """Triangulates the curved surface of the semiellipsoid, and closes
+        its circular base with a fan of triangles around its center.
+
+        """
+        mesh_x, mesh_y, mesh_z = self._get_orig_mesh_points(mesh_level)
+        n_u, n_v = mesh_x.shape
+        vertices = np.vstack((np.column_stack((mesh_x.ravel(),
+                                               mesh_y.ravel(),
+                                               mesh_z.ravel())),
+                              [[0.0, 0.0, 0.0]]))
+        # The grid is indexed by azimuth (first index, which wraps around)
+        # and colatitude (second index, from the top to the base).
+        index = np.arange(n_u * n_v).reshape((n_u, n_v))
+        a = index[:-1, :-1].ravel()
+        b = index[1:, :-1].ravel()
+        c = index[1:, 1:].ravel()
+        d = index[:-1, 1:].ravel()
+        base = index[:, -1]
+        faces = np.vstack((
+            np.column_stack((a, b, c)),
+            np.column_stack((a, c, d)),
+            np.column_stack((np.full(n_u - 1, n_u * n_v), base[:-1],
+                             base[1:]))))
+        return vertices, faces
+
+    def _make_pos(self, mesh_level='medium'):
         """Generates coordinates to be used for 3D visualization purposes,
         given the position and orientation of the solid.
 
         """
-        x = np.zeros(self._mesh_x.shape)
-        y = np.zeros(self._mesh_y.shape)
-        z = np.zeros(self._mesh_z.shape)
-        for i in np.arange(self.n_mesh_points):
-            for j in np.arange(self.n_mesh_points):
-                POS = np.array([
-                    [self._mesh_x[i,j]],
-                    [self._mesh_y[i,j]],
-                    [self._mesh_z[i,j]]])
-                POS = self._rot_mat * POS
-                x[i,j] = POS[0,0]
-                y[i,j] = POS[1,0]
-                z[i,j] = POS[2,0]
+        mesh_x, mesh_y, mesh_z = self._get_orig_mesh_points(mesh_level)
+        points = np.vstack((mesh_x.ravel(), mesh_y.ravel(), mesh_z.ravel()))
+        x, y, z = np.asarray(self._rot_mat * points).reshape(
+                (3,) + mesh_x.shape)
         x = self.pos[0,0] + x
         y = self.pos[1,0] + y
         z = self.pos[2,0] + z
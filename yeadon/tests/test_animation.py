@@ -0,0 +1,80 @@
+import os
+import unittest
+import warnings
+
+import numpy as np
+from numpy import testing
+
+from yeadon.human import Human
+from yeadon import animation, inertia, mesh
+from yeadon.tree import SegmentTree
+
+warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+
+class TestAnimation(unittest.TestCase):
+    """Tests the batched kinematics and the baked animation frames."""
+
+    male1meas = os.path.join(os.path.split(__file__)[0], '..', '..',
+            'misc', 'samplemeasurements', 'male1.txt')
+
+    def setUp(self):
+        self.h = Human(self.male1meas)
+        bounds = np.array(Human.CFGbounds)
+        fraction = np.random.RandomState(0).uniform(0.05, 0.95, (4, 21))
+        self.CFGs = bounds[:, 0] + fraction * (bounds[:, 1] - bounds[:, 0])
+
+    def test_euler_123_batch(self):
+        angles = np.random.RandomState(1).uniform(-3, 3, (2, 5, 3))
+        R = inertia.euler_123_batch(angles)
+        assert R.shape == (2, 5, 3, 3)
+        for i in range(2):
+            for j in range(5):
+                testing.assert_allclose(R[i, j],
+                                        inertia.euler_123(angles[i, j]),
+                                        atol=1e-15)
+
+    def test_tree(self):
+        # A moved coordinate system is part of the tree.
+        self.h._rotate_coord_sys([0.1, 0.2, 0.3])
+        self.h._translate_coord_sys([0.3, -0.2, 0.1])
+        tree = SegmentTree(self.h)
+        rot_mats, positions = tree.forward_kinematics(self.CFGs)
+        center_of_mass, inertias = tree.mass_properties(self.CFGs)
+        testing.assert_allclose(tree.mass, self.h.mass)
+        for n, CFG in enumerate(self.CFGs):
+            self.h.set_CFG_dict(dict(zip(Human.CFGnames, CFG)))
+            for i, segment in enumerate(self.h.segments):
+                testing.assert_allclose(rot_mats[n, i], segment.rot_mat,
+                                        atol=1e-12)
+                testing.assert_allclose(positions[n, i],
+                                        np.ravel(segment.pos), atol=1e-12)
+            testing.assert_allclose(center_of_mass[n],
+                                    np.ravel(self.h.center_of_mass))
+            testing.assert_allclose(inertias[n], self.h.inertia)
+
+    def test_bake_frames(self):
+        CFG = dict(self.h.CFG)
+        frames = animation.bake_frames(self.h, self.CFGs, mesh_level='low')
+        assert len(frames) == 4
+        assert self.h.CFG == CFG
+        assert frames.face_segments.shape == (len(frames.faces),)
+        assert frames.face_segments.max() == len(self.h.segments) - 1
+
+        self.h.set_CFG_dict(dict(zip(Human.CFGnames, self.CFGs[2])))
+        vertices, faces = mesh.human_mesh(self.h, 'low')
+        testing.assert_array_equal(frames.faces, faces)
+        testing.assert_allclose(frames.vertices[2], vertices, atol=1e-12)
+        testing.assert_allclose(frames.center_of_mass[2],
+                                np.ravel(self.h.center_of_mass))
+        testing.assert_allclose(frames.inertia[2], self.h.inertia)
+
+        points = frames.ellipsoid_points('low')
+        N = Human.n_ellipsoid_points['low']
+        assert points.shape == (4, 3, N, N)
+        # Each point satisfies the equation of the inertia ellipsoid.
+        relative = (points[2].reshape((3, -1)) -
+                    frames.center_of_mass[2][:, np.newaxis])
+        testing.assert_allclose(np.sum(relative * np.dot(frames.inertia[2],
+                                                         relative), axis=0),
+                                1.0)
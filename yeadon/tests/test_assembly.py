@@ -0,0 +1,109 @@
+import os
+import unittest
+import warnings
+
+import numpy as np
+from numpy import testing
+
+from yeadon.human import Human
+from yeadon import inertia
+from yeadon.assembly import Assembly, RigidBody
+
+warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+
+class TestAssembly(unittest.TestCase):
+    """Tests the combination of humans and rigid bodies."""
+
+    male1meas = os.path.join(os.path.split(__file__)[0], '..', '..',
+            'misc', 'samplemeasurements', 'male1.txt')
+
+    def setUp(self):
+        self.h = Human(self.male1meas)
+        self.bike = RigidBody(12.0, [0.5, 0.0, 0.3],
+                              [[1.0, 0.1, 0.0], [0.1, 2.0, 0.2],
+                               [0.0, 0.2, 3.0]])
+
+    def test_properties(self):
+        # One human in the identity pose is the human.
+        assembly = Assembly()
+        assembly.add_human('rider', self.h)
+        testing.assert_allclose(assembly.mass, self.h.mass)
+        testing.assert_allclose(assembly.center_of_mass,
+                                np.ravel(self.h.center_of_mass))
+        testing.assert_allclose(assembly.inertia, self.h.inertia)
+        # Rotating the human expresses its inertia in the rotated frame.
+        R = np.asarray(inertia.euler_123([0.3, -0.2, 0.4]))
+        assembly.set_pose('rider', [0.1, 0.2, 1.0], [0.3, -0.2, 0.4])
+        testing.assert_allclose(assembly.center_of_mass, [0.1, 0.2, 1.0] +
+                                np.dot(R, np.ravel(self.h.center_of_mass)))
+        testing.assert_allclose(assembly.inertia,
+                                self.h.inertia_transformed(rotmat=R.T))
+
+        # The combination of the human and a body, as in combine_inertia.
+        assembly.add_body('bike', self.bike, [1.0, 0.0, 0.0],
+                          np.eye(3))
+        mass = self.h.mass + 12.0
+        bike_center = np.array([1.5, 0.0, 0.3])
+        rider_center = [0.1, 0.2, 1.0] + np.dot(
+            R, np.ravel(self.h.center_of_mass))
+        center = (self.h.mass * rider_center + 12.0 * bike_center) / mass
+        expected = (inertia.parallel_axis(
+                        np.dot(np.dot(R, self.h.inertia), R.T), self.h.mass,
+                        center - rider_center) +
+                    inertia.parallel_axis(self.bike.inertia, 12.0,
+                                          center - bike_center))
+        testing.assert_allclose(assembly.mass, mass)
+        testing.assert_allclose(assembly.center_of_mass, center)
+        testing.assert_allclose(assembly.inertia, expected)
+        testing.assert_allclose(assembly.component_properties('bike')[1],
+                                bike_center)
+
+        # Moving the bike does not recompute the rider.
+        rider = assembly.contribution('rider')
+        assembly.set_pose('bike', position=[2.0, 0.0, 0.0])
+        self.assertIs(assembly.contribution('rider')[1], rider[1])
+        testing.assert_allclose(assembly.component_properties('bike')[1],
+                                [2.5, 0.0, 0.3])
+        # A change of configuration of the rider is noticed.
+        inertia_before = assembly.inertia
+        self.h.set_CFG('CA1extension', -1.0)
+        self.assertIsNot(assembly.contribution('rider')[1], rider[1])
+        self.assertFalse(np.allclose(assembly.inertia, inertia_before))
+
+        self.assertRaises(ValueError, assembly.add_body, 'bike', self.bike)
+        self.assertRaises(ValueError, assembly.set_pose, 'pole')
+        self.assertRaises(ValueError, RigidBody, 0.0)
+        assembly.remove('bike')
+        testing.assert_allclose(assembly.mass, self.h.mass)
+
+    def test_evaluate_batch(self):
+        assembly = Assembly()
+        assembly.add_human('rider', self.h, [0.0, 0.0, 1.0], [0.0, 0.2, 0.0])
+        assembly.add_body('bike', self.bike)
+        assembly.add_body('pole', (2.0, [0.0, 0.0, 1.0]), [0.3, 0.0, 0.0])
+        N = 4
+        CFGs = np.zeros((N, 21))
+        CFGs[:, Human.CFGnames.index('PJ1extension')] = np.linspace(0, 1, N)
+        CFGs[:, Human.CFGnames.index('somersault')] = np.linspace(0, 2, N)
+        positions = np.random.RandomState(0).uniform(-1, 1, (N, 3))
+        angles = np.random.RandomState(1).uniform(-1, 1, (N, 3))
+        mass, centers, inertias = assembly.evaluate_batch(
+                poses={'bike': (positions, angles), 'pole': (None,
+                                                             np.eye(3))},
+                CFGs={'rider': CFGs})
+        self.assertEqual(centers.shape, (N, 3))
+        self.assertEqual(inertias.shape, (N, 3, 3))
+        pole_pose = assembly.pose('pole')
+        for i in range(N):
+            self.h.set_CFG_dict(dict(zip(Human.CFGnames, CFGs[i])))
+            assembly.set_pose('bike', positions[i], angles[i])
+            testing.assert_allclose(mass, assembly.mass)
+            testing.assert_allclose(centers[i], assembly.center_of_mass)
+            testing.assert_allclose(inertias[i], assembly.inertia,
+                                    atol=1e-12)
+        # The batch evaluation does not move any component.
+        testing.assert_allclose(assembly.pose('pole')[0], pole_pose[0])
+
+        self.assertRaises(ValueError, assembly.evaluate_batch,
+                          CFGs={'bike': CFGs})
@@ -0,0 +1,172 @@
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+import yaml
+from numpy import testing
+
+from yeadon.human import Human
+from yeadon.cohort import Cohort, write_meas_for_ISEG
+
+warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+
+class TestCohort(unittest.TestCase):
+    """Tests the :py:class:`Cohort` class."""
+
+    sample_dir = os.path.join(os.path.split(__file__)[0], '..', '..',
+            'misc', 'samplemeasurements')
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        # Scaling by a measured mass modifies the class's densities.
+        self.densities = copy.deepcopy(Human.segmental_densities)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        Human.segmental_densities = self.densities
+
+    def test_from_measurement_files(self):
+        cohort = Cohort.from_measurement_files(self.sample_dir)
+
+        assert len(cohort) == 5
+        assert list(cohort.subject_ids) == ['female1', 'male1', 'male2',
+                                            'male3', 'male4']
+        testing.assert_allclose(cohort.measurementconversionfactor, 0.01)
+        testing.assert_allclose(cohort.totalmass, [-1, -1, -1, -1, 78.745])
+
+        # Same measurements as when the file is read by a Human.
+        h = Human(os.path.join(self.sample_dir, 'male1.txt'),
+                  symmetric=False)
+        meas = cohort.meas_dict(1)
+        for name in Human.measnames:
+            testing.assert_allclose(meas[name], h.meas[name])
+
+    def test_save_load_mmap(self):
+        fnames = [os.path.join(self.sample_dir, name) for name in
+                  ['male1.txt', 'male2.txt']]
+        cohort_dir = os.path.join(self.tmpdir, 'cohort')
+        cohort = Cohort.from_measurement_files(fnames, cohort_dir)
+        assert isinstance(cohort.meas, np.memmap)
+
+        loaded = Cohort.load(cohort_dir)
+        assert isinstance(loaded.meas, np.memmap)
+        testing.assert_array_equal(loaded.meas,
+                                   Cohort.from_measurement_files(fnames).meas)
+        assert list(loaded.subject_ids) == ['male1', 'male2']
+
+        in_memory = Cohort.load(cohort_dir, mmap_mode=None)
+        assert not isinstance(in_memory.meas, np.memmap)
+
+        # Columns in an unexpected order are rejected.
+        np.save(os.path.join(cohort_dir, 'measnames.npy'),
+                np.asarray(Human.measnames[::-1]))
+        self.assertRaises(ValueError, Cohort.load, cohort_dir)
+
+    def test_round_trip_measurement_files(self):
+        cohort = Cohort.from_measurement_files(self.sample_dir)
+        out_dir = os.path.join(self.tmpdir, 'text')
+        cohort.to_measurement_files(out_dir)
+
+        again = Cohort.from_measurement_files(out_dir)
+        testing.assert_array_equal(again.meas, cohort.meas)
+        testing.assert_array_equal(again.totalmass, cohort.totalmass)
+        testing.assert_array_equal(again.measurementconversionfactor,
+                                   cohort.measurementconversionfactor)
+
+    def test_stream(self):
+        cohort = Cohort.from_measurement_files(self.sample_dir)
+
+        chunks = list(cohort.iter_chunks(chunk_size=2))
+        assert [start for start, meas in chunks] == [0, 2, 4]
+        testing.assert_allclose(np.vstack([meas for start, meas in chunks]),
+                                0.01 * cohort.meas)
+
+        h = Human(os.path.join(self.sample_dir, 'male1.txt'))
+        masses = [human.mass for human in cohort.humans()]
+        testing.assert_allclose(masses[1], h.mass)
+        testing.assert_allclose(masses[4], 78.745, atol=0.005)
+
+    def test_invalid_shape(self):
+        self.assertRaises(ValueError, Cohort, np.ones((3, 94)))
+        self.assertRaises(ValueError, Cohort, np.ones((3, 95)), ['a', 'b'])
+
+    def test_write_meas_for_ISEG(self):
+        cohort = Cohort.from_measurement_files(self.sample_dir)
+        iseg_dir = os.path.join(self.tmpdir, 'iseg')
+        cohort.write_meas_for_ISEG(iseg_dir)
+        stream = os.path.join(self.tmpdir, 'iseg.txt')
+        cohort.write_meas_for_ISEG(stream, concatenate=True, chunk_size=2)
+
+        # Byte-identical to the per-subject writer.
+        expected = []
+        for subject_id in cohort.subject_ids:
+            h = Human(os.path.join(self.sample_dir, subject_id + '.txt'))
+            h.write_meas_for_ISEG(os.path.join(self.tmpdir, 'des.txt'))
+            with open(os.path.join(self.tmpdir, 'des.txt'), 'rb') as fid:
+                expected.append(fid.read())
+            with open(os.path.join(iseg_dir, subject_id + '.txt'),
+                      'rb') as fid:
+                self.assertEqual(fid.read(), expected[-1])
+        with open(stream, 'rb') as fid:
+            self.assertEqual(fid.read(), b''.join(expected))
+
+        # An integral measured mass, as in male1_scale.txt.
+        h = Human(os.path.join(os.path.split(__file__)[0],
+                               'male1_scale.txt'))
+        h.write_meas_for_ISEG(os.path.join(self.tmpdir, 'des.txt'))
+        meas = np.array([[h.meas[name] for name in Human.measnames]])
+        write_meas_for_ISEG(meas, os.path.join(self.tmpdir, 'scale.txt'),
+                            totalmass=[100.0], concatenate=True)
+        with open(os.path.join(self.tmpdir, 'des.txt'), 'rb') as fid:
+            with open(os.path.join(self.tmpdir, 'scale.txt'), 'rb') as fid2:
+                self.assertEqual(fid2.read(), fid.read())
+
+    def test_write_meas_for_ISEG_masses(self):
+        """Masses are written as they were read from the measurement files,
+        e.g. 80 and 80.0 differently."""
+        meas_dir = os.path.join(self.tmpdir, 'meas')
+        os.makedirs(meas_dir)
+        with open(os.path.join(self.sample_dir, 'male4.txt')) as fid:
+            male4 = fid.read()
+        for subject_id, totalmass in (('integer', '80'),
+                                      ('integral_float', '80.0'),
+                                      ('non_integral', '78.745')):
+            with open(os.path.join(meas_dir, subject_id + '.txt'),
+                      'w') as fid:
+                fid.write(male4.replace('totalmass: 78.745',
+                                        'totalmass: ' + totalmass))
+        shutil.copy(os.path.join(self.sample_dir, 'male1.txt'),
+                    os.path.join(meas_dir, 'missing.txt'))
+
+        cohort = Cohort.from_measurement_files(meas_dir)
+        # Which whole-number masses were floats is kept in the metadata when
+        # the cohort is saved and loaded.
+        cohort_dir = os.path.join(self.tmpdir, 'cohort')
+        cohort.save(cohort_dir)
+        with open(os.path.join(cohort_dir, 'metadata.yaml')) as fid:
+            self.assertEqual(yaml.safe_load(fid), {'float_totalmass': [1]})
+        for cohort in (cohort, Cohort.load(cohort_dir)):
+            iseg_dir = os.path.join(self.tmpdir, 'iseg')
+            cohort.write_meas_for_ISEG(iseg_dir)
+            stream = os.path.join(self.tmpdir, 'iseg.txt')
+            cohort.write_meas_for_ISEG(stream, concatenate=True)
+            expected = []
+            for subject_id in cohort.subject_ids:
+                h = Human(os.path.join(meas_dir, subject_id + '.txt'))
+                h.write_meas_for_ISEG(os.path.join(self.tmpdir, 'des.txt'))
+                with open(os.path.join(self.tmpdir, 'des.txt'), 'rb') as fid:
+                    expected.append(fid.read())
+                with open(os.path.join(iseg_dir, subject_id + '.txt'),
+                          'rb') as fid:
+                    self.assertEqual(fid.read(), expected[-1])
+            with open(stream, 'rb') as fid:
+                self.assertEqual(fid.read(), b''.join(expected))
+        self.assertTrue(expected[0].endswith(b'500,80\n'))
+        self.assertTrue(expected[1].endswith(b'500,80.0\n'))
+        self.assertTrue(expected[2].endswith(b'500,200\n'))
+        self.assertTrue(expected[3].endswith(b'500,78.745\n'))
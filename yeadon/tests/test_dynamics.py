@@ -0,0 +1,296 @@
+import os
+import unittest
+import warnings
+
+import numpy as np
+from numpy import testing
+
+from yeadon.human import Human
+from yeadon import dynamics
+from yeadon.tree import SegmentTree
+
+warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+
+class TestDynamics(unittest.TestCase):
+    """Tests the momentum and kinetic energy along trajectories."""
+
+    male1meas = os.path.join(os.path.split(__file__)[0], '..', '..',
+            'misc', 'samplemeasurements', 'male1.txt')
+
+    def setUp(self):
+        self.h = Human(self.male1meas)
+        bounds = np.array(Human.CFGbounds)
+        fraction = np.random.RandomState(4).uniform(0.05, 0.95, (5, 21))
+        self.CFGs = bounds[:, 0] + fraction * (bounds[:, 1] - bounds[:, 0])
+        self.tree = SegmentTree(self.h)
+
+    def test_joint_rates(self):
+        times = np.linspace(0.0, 1.0, 101)
+        CFGs = np.outer(times**2, np.arange(21.0))
+        rates = dynamics.joint_rates(CFGs, times)
+        testing.assert_allclose(rates, np.outer(2 * times, np.arange(21.0)),
+                                atol=1e-12)
+        testing.assert_allclose(dynamics.joint_rates(CFGs, 0.01), rates,
+                                atol=1e-12)
+        self.assertRaises(ValueError, dynamics.joint_rates, CFGs[:2], 0.01)
+
+    def test_rigid_rotation(self):
+        # With only the somersault changing, the human rotates as a rigid
+        # body: H = I * omega and T = omega . H / 2.
+        rates = np.zeros(self.CFGs.shape)
+        rates[:, Human.CFGnames.index('somersault')] = 3.0
+        result = dynamics.momentum(self.h, self.CFGs, rates)
+        assert len(result) == 5
+        rot_mats, positions = self.tree.forward_kinematics(self.CFGs)
+        for n in range(5):
+            # The somersault is about the global x axis.
+            omega = np.array([3.0, 0.0, 0.0])
+            testing.assert_allclose(result.angular_velocities[n],
+                                    np.tile(omega, (11, 1)), atol=1e-12)
+            inertia = np.zeros((3, 3))
+            for i in range(11):
+                R = rot_mats[n, i]
+                com = positions[n, i] + np.dot(
+                        R, self.tree.rel_centers_of_mass[i])
+                d = com - result.center_of_mass[n]
+                inertia += (np.dot(np.dot(R, self.tree.rel_inertias[i]), R.T)
+                            + self.tree.masses[i] * (np.dot(d, d) * np.eye(3)
+                                                     - np.outer(d, d)))
+            testing.assert_allclose(result.angular_momentum[n],
+                                    np.dot(inertia, omega), atol=1e-10)
+            testing.assert_allclose(result.kinetic_energy[n],
+                    0.5 * np.dot(omega, result.angular_momentum[n]))
+        testing.assert_allclose(result.center_of_mass,
+                                self.tree.mass_properties(self.CFGs)[0])
+        testing.assert_allclose(result.segment_angular_momenta.sum(axis=1),
+                                result.angular_momentum)
+        assert np.all(result.rotational_kinetic_energy <
+                      result.kinetic_energy)
+
+    def test_sampled_trajectory(self):
+        # Rates from the samples agree with the given rates.
+        times = np.linspace(0.0, 0.5, 201)
+        rates = np.random.RandomState(5).uniform(-1.0, 1.0, 21)
+        CFGs = self.CFGs[0] + np.outer(np.sin(times), rates)
+        exact = dynamics.momentum(self.h, CFGs,
+                                  np.outer(np.cos(times), rates))
+        sampled = dynamics.momentum(self.h, CFGs, times=times,
+                                    tree=self.tree)
+        testing.assert_allclose(sampled.angular_momentum,
+                                exact.angular_momentum, atol=1e-4)
+        testing.assert_allclose(sampled.kinetic_energy, exact.kinetic_energy,
+                                rtol=1e-4)
+        self.assertRaises(ValueError, dynamics.momentum, self.h, CFGs)
+        self.assertRaises(ValueError, dynamics.momentum, self.h, CFGs,
+                          rates)
+
+    def test_center_of_mass_motion(self):
+        # q(t) = q0 + a sin(t), so q' = a cos(t) and q'' = -a sin(t).
+        times = np.linspace(0.0, 0.4, 401)
+        amplitudes = np.random.RandomState(7).uniform(-1.0, 1.0, 21)
+        CFGs = self.CFGs[0] + np.outer(np.sin(times), amplitudes)
+        rates = np.outer(np.cos(times), amplitudes)
+        accelerations = -np.outer(np.sin(times), amplitudes)
+        com, velocity, acceleration = dynamics.center_of_mass_motion(
+                self.h, CFGs, rates, accelerations)
+        testing.assert_allclose(com, self.tree.mass_properties(CFGs)[0])
+        # Differences of the center of mass of the model.
+        step = times[1] - times[0]
+        testing.assert_allclose(velocity[1:-1],
+                                (com[2:] - com[:-2]) / (2 * step), atol=1e-5)
+        testing.assert_allclose(acceleration[1:-1],
+                                (com[2:] - 2 * com[1:-1] + com[:-2]) /
+                                step**2, atol=1e-3)
+
+        # From the samples of the joint angles only.
+        sampled = dynamics.center_of_mass_motion(self.h, CFGs, times=times,
+                                                 tree=self.tree)
+        testing.assert_allclose(sampled[1], velocity, atol=1e-4)
+        testing.assert_allclose(sampled[2][2:-2], acceleration[2:-2],
+                                atol=1e-3)
+        self.assertRaises(ValueError, dynamics.center_of_mass_motion,
+                          self.h, CFGs, rates)
+
+    def test_mass_matrix(self):
+        M = dynamics.mass_matrix(self.h, self.CFGs, self.tree)
+        assert M.shape == (5, 24, 24)
+        testing.assert_allclose(M, np.swapaxes(M, 1, 2), atol=1e-14)
+        assert np.all(np.linalg.eigvalsh(M) > 0.0)
+        testing.assert_allclose(M[:, :3, :3],
+                                np.tile(self.h.mass * np.eye(3), (5, 1, 1)))
+
+        # Kinetic energy from central differences of the poses of the
+        # segments, with the base translated by q[:3].
+        def poses(q):
+            rot_mats, positions = self.tree.forward_kinematics(q[:, 3:])
+            centers = positions + q[:, np.newaxis, :3] + np.einsum(
+                    'nsij,sj->nsi', rot_mats, self.tree.rel_centers_of_mass)
+            return rot_mats, centers
+
+        q = np.hstack((np.zeros((5, 3)), self.CFGs))
+        rates = np.random.RandomState(8).uniform(-2.0, 2.0, (5, 24))
+        h = 1e-6
+        R_plus, c_plus = poses(q + h * rates)
+        R_minus, c_minus = poses(q - h * rates)
+        R = self.tree.forward_kinematics(self.CFGs)[0]
+        velocities = (c_plus - c_minus) / (2 * h)
+        skew = np.einsum('nsij,nskj->nsik', (R_plus - R_minus) / (2 * h), R)
+        omega = np.stack((skew[..., 2, 1], skew[..., 0, 2], skew[..., 1, 0]),
+                         axis=-1)
+        inertias = np.einsum('nsij,sjk,nslk->nsil', R, self.tree.rel_inertias,
+                             R)
+        energy = 0.5 * (np.einsum('s,nsi,nsi->n', self.tree.masses,
+                                  velocities, velocities) +
+                        np.einsum('nsi,nsij,nsj->n', omega, inertias, omega))
+        testing.assert_allclose(0.5 * np.einsum('ni,nij,nj->n', rates, M,
+                                                rates), energy, rtol=1e-7)
+
+        # Without base translation, the same energy as momentum() after
+        # adding that of the motion of the center of mass.
+        rates[:, :3] = 0.0
+        result = dynamics.momentum(self.h, self.CFGs, rates[:, 3:])
+        v = np.matmul(self.tree.center_of_mass_jacobian(self.CFGs),
+                      rates[:, 3:, np.newaxis])[..., 0]
+        testing.assert_allclose(
+            0.5 * np.einsum('ni,nij,nj->n', rates, M, rates),
+            result.kinetic_energy + 0.5 * self.h.mass * np.sum(v**2, axis=1))
+
+    def test_inverse_dynamics(self):
+        M = dynamics.mass_matrix(self.h, self.CFGs, self.tree)
+        rates = np.random.RandomState(9).uniform(-2.0, 2.0, (5, 21))
+        accelerations = np.random.RandomState(10).uniform(-5.0, 5.0, (5, 24))
+
+        # The forces are linear in the accelerations, with the mass matrix.
+        forces, momentum_rates = dynamics.inverse_dynamics(
+                self.h, self.CFGs, rates, accelerations[:, 3:],
+                base_accelerations=accelerations[:, :3], tree=self.tree,
+                chunk_size=2)
+        bias = dynamics.inverse_dynamics(self.h, self.CFGs, rates,
+                                         np.zeros((5, 21)), tree=self.tree)[0]
+        testing.assert_allclose(
+                forces - bias,
+                np.matmul(M, accelerations[..., np.newaxis])[..., 0],
+                atol=1e-10)
+        testing.assert_allclose(forces[:, :3], momentum_rates[:, 3:] +
+                                self.h.mass * np.array([0.0, 0.0, 9.81]))
+
+        # At rest, the external force carries the weight.
+        forces, momentum_rates = dynamics.inverse_dynamics(
+                self.h, self.CFGs, np.zeros((5, 21)), np.zeros((5, 21)),
+                tree=self.tree)
+        testing.assert_allclose(forces[:, :3], np.tile(
+                [0.0, 0.0, 9.81 * self.h.mass], (5, 1)))
+        testing.assert_allclose(momentum_rates, 0.0, atol=1e-12)
+
+        # The rates of change of the momenta, against central differences of
+        # the angular momentum and the center of mass acceleration.
+        h = 1e-5
+        plus = dynamics.momentum(self.h, self.CFGs + h * rates,
+                                 rates + h * accelerations[:, 3:],
+                                 tree=self.tree)
+        minus = dynamics.momentum(self.h, self.CFGs - h * rates,
+                                  rates - h * accelerations[:, 3:],
+                                  tree=self.tree)
+        momentum_rates = dynamics.inverse_dynamics(
+                self.h, self.CFGs, rates, accelerations[:, 3:],
+                tree=self.tree)[1]
+        testing.assert_allclose(
+                momentum_rates[:, :3],
+                (plus.angular_momentum - minus.angular_momentum) / (2 * h),
+                rtol=1e-6, atol=1e-6)
+        motion = dynamics.center_of_mass_motion(self.h, self.CFGs, rates,
+                                                accelerations[:, 3:],
+                                                tree=self.tree)
+        testing.assert_allclose(momentum_rates[:, 3:],
+                                self.h.mass * motion[2], atol=1e-10)
+
+        # Lagrange's equations, d/dt (M q') - dT/dq = forces, with central
+        # differences of the mass matrix.
+        def mass_matrix(CFGs):
+            return dynamics.mass_matrix(self.h, CFGs, self.tree)
+
+        q_rates = np.hstack((np.zeros((5, 3)), rates))
+        q_accelerations = np.hstack((np.zeros((5, 3)), accelerations[:, 3:]))
+        momenta = (
+            np.matmul(mass_matrix(self.CFGs + h * rates),
+                      (q_rates + h * q_accelerations)[..., np.newaxis]) -
+            np.matmul(mass_matrix(self.CFGs - h * rates),
+                      (q_rates - h * q_accelerations)[..., np.newaxis])
+            )[..., 0] / (2 * h)
+        for k in range(21):
+            step = h * np.eye(21)[k]
+            energies = [0.5 * np.einsum('ni,nij,nj->n', q_rates,
+                                        mass_matrix(self.CFGs + sign * step),
+                                        q_rates) for sign in (1, -1)]
+            momenta[:, 3 + k] -= (energies[0] - energies[1]) / (2 * h)
+        forces = dynamics.inverse_dynamics(self.h, self.CFGs, rates,
+                                           accelerations[:, 3:],
+                                           gravity=np.zeros(3),
+                                           tree=self.tree)[0]
+        testing.assert_allclose(forces, momenta, rtol=1e-6, atol=1e-6)
+
+    def test_forward_dynamics(self):
+        random = np.random.RandomState(11)
+        rates = random.uniform(-2.0, 2.0, (5, 21))
+        accelerations = random.uniform(-5.0, 5.0, (5, 24))
+        forces = dynamics.inverse_dynamics(
+                self.h, self.CFGs, rates, accelerations[:, 3:],
+                base_accelerations=accelerations[:, :3], tree=self.tree)[0]
+        testing.assert_allclose(
+                dynamics.forward_dynamics(self.h, self.CFGs, rates, forces,
+                                          tree=self.tree),
+                accelerations, atol=1e-9)
+
+    def test_simulate(self):
+        # Free flight from two initial states: the center of mass falls, and
+        # the angular momentum about it is conserved.
+        coordinates = np.hstack((np.zeros((2, 3)), self.CFGs[:2]))
+        rates = np.random.RandomState(12).uniform(-1.0, 1.0, (2, 24))
+        times = np.linspace(0.0, 0.2, 3)
+        result = dynamics.simulate(self.h, coordinates, rates, np.zeros(24),
+                                   0.2, times=times, rtol=1e-7, atol=1e-9,
+                                   tree=self.tree)
+        testing.assert_allclose(result.times, times)
+        assert result.coordinates.shape == (2, 3, 24)
+        testing.assert_allclose(result.coordinates[:, 0], coordinates)
+        for i in range(2):
+            motion = dynamics.center_of_mass_motion(
+                    self.h, result.CFGs[i], result.rates[i, :, 3:],
+                    result.accelerations[i, :, 3:], tree=self.tree)
+            testing.assert_allclose(
+                    result.accelerations[i, :, :3] + motion[2],
+                    np.tile([0.0, 0.0, -9.81], (3, 1)), atol=1e-9)
+            momentum = dynamics.momentum(self.h, result.CFGs[i],
+                                         result.rates[i, :, 3:],
+                                         tree=self.tree)
+            testing.assert_allclose(momentum.angular_momentum,
+                                    np.tile(momentum.angular_momentum[0],
+                                            (3, 1)), atol=1e-6)
+
+        # Fixed steps, and one initial state.
+        fixed = dynamics.simulate(self.h, coordinates[1], rates[1],
+                                  np.zeros(24), 0.2, times=times, step=0.004,
+                                  tree=self.tree)
+        assert fixed.coordinates.shape == (3, 24)
+        assert fixed.n_steps == 50
+        testing.assert_allclose(fixed.coordinates, result.coordinates[1],
+                                atol=1e-3)
+
+    def test_centroidal_momentum_matrix(self):
+        A = dynamics.centroidal_momentum_matrix(self.h, self.CFGs, self.tree)
+        assert A.shape == (5, 6, 21)
+        rates = np.random.RandomState(13).uniform(-2.0, 2.0, (5, 21))
+        momenta = np.matmul(A, rates[..., np.newaxis])[..., 0]
+        result = dynamics.momentum(self.h, self.CFGs, rates, tree=self.tree)
+        testing.assert_allclose(momenta[:, :3], result.angular_momentum,
+                                atol=1e-12)
+        testing.assert_allclose(
+            momenta[:, 3:], self.h.mass * np.matmul(
+                self.tree.center_of_mass_jacobian(self.CFGs),
+                rates[..., np.newaxis])[..., 0], atol=1e-12)
+
+        # The current configuration of the human.
+        self.h.set_CFG_dict(dict(zip(Human.CFGnames, self.CFGs[3])))
+        testing.assert_allclose(dynamics.centroidal_momentum_matrix(self.h),
+                                A[3], atol=1e-14)
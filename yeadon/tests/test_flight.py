@@ -0,0 +1,124 @@
+import os
+import unittest
+import warnings
+
+import numpy as np
+from numpy import testing
+
+from yeadon.human import Human
+from yeadon import dynamics, flight
+from yeadon.integrate import dormand_prince, runge_kutta
+from yeadon.tree import SegmentTree
+
+warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+
+class TestFlight(unittest.TestCase):
+    """Tests the simulation of aerial movement."""
+
+    male1meas = os.path.join(os.path.split(__file__)[0], '..', '..',
+            'misc', 'samplemeasurements', 'male1.txt')
+
+    def setUp(self):
+        self.h = Human(self.male1meas)
+        self.tree = SegmentTree(self.h)
+        # The left arm is adducted before the right arm.
+        times = np.linspace(0.0, 1.0, 11)
+        angles = np.zeros((11, 18))
+        angles[:, flight.joint_names.index('CA1adduction')] = \
+                np.linspace(0.0, 2.5, 11)
+        angles[:, flight.joint_names.index('CB1abduction')] = \
+                np.linspace(0.0, 2.5, 11)**2 / 2.5
+        self.motion = flight.SampledMotion(times, angles)
+
+    def test_dormand_prince(self):
+        def fun(t, y):
+            return np.stack((y[..., 1], -y[..., 0]), axis=-1)
+        times = np.linspace(1.0, 10.0, 10)
+        solution = dormand_prince(fun, 0.0, 10.0, [[1.0, 0.0], [0.0, 1.0]],
+                                  rtol=1e-10, atol=1e-12, times=times)
+        testing.assert_allclose(solution.times, times)
+        testing.assert_allclose(solution.states[:, 0],
+                                np.column_stack((np.cos(times),
+                                                 -np.sin(times))),
+                                atol=1e-8)
+        testing.assert_allclose(solution.rates, fun(None, solution.states))
+        self.assertRaises(ValueError, dormand_prince, fun, 0.0, 1.0,
+                          [1.0, 0.0], times=[0.5, 0.2])
+
+    def test_runge_kutta(self):
+        solution = runge_kutta(lambda t, y: np.cos(t) * y, 0.0, 2.0, [1.0],
+                               0.01)
+        assert solution.n_steps == 200
+        testing.assert_allclose(solution.times, np.linspace(0.0, 2.0, 201))
+        testing.assert_allclose(solution.states[:, 0],
+                                np.exp(np.sin(solution.times)), rtol=1e-9)
+        solution = runge_kutta(lambda t, y: np.cos(t) * y, 0.0, 2.0, [1.0],
+                               0.01, times=[0.25, 2.0])
+        assert solution.n_steps == 200
+        testing.assert_allclose(solution.states[:, 0],
+                                np.exp(np.sin([0.25, 2.0])), rtol=1e-9)
+
+    def test_sampled_motion(self):
+        # Quadratic angles are interpolated exactly.
+        times = np.linspace(0.0, 1.0, 6)
+        coefficients = np.arange(18.0)
+        motion = flight.SampledMotion(times, np.outer(times**2,
+                                                      coefficients))
+        t = np.array([0.0, 0.13, 0.5, 0.77, 1.0])
+        angles, rates = motion(t)
+        testing.assert_allclose(angles, np.outer(t**2, coefficients),
+                                atol=1e-12)
+        testing.assert_allclose(rates, np.outer(2 * t, coefficients),
+                                atol=1e-12)
+        self.assertRaises(ValueError, flight.SampledMotion, times,
+                          np.zeros((6, 17)))
+
+    def test_rigid_flight(self):
+        # Without joint motion, the human rotates as a rigid body, with
+        # constant kinetic energy.
+        CFG = np.array(self.h.CFG_to_array(self.h.CFG))[0]
+        CFG[3:] = np.random.RandomState(3).uniform(-0.5, 0.5, 18)
+        motion = flight.SampledMotion([0.0, 0.5, 1.0],
+                                      np.tile(CFG[3:], (3, 1)))
+        result = flight.simulate(self.h, motion, [50.0, 5.0, -3.0], 1.0,
+                                 orientation=[0.1, 0.2, 0.3], tree=self.tree)
+        testing.assert_allclose(result.CFGs[0, :3], [0.1, 0.2, 0.3])
+        testing.assert_allclose(result.CFGs[:, 3:],
+                                np.tile(CFG[3:], (len(result), 1)))
+        momentum = dynamics.momentum(self.h, result.CFGs, result.CFG_rates,
+                                     tree=self.tree)
+        testing.assert_allclose(momentum.angular_momentum,
+                                np.tile([50.0, 5.0, -3.0], (len(result), 1)),
+                                atol=1e-10)
+        testing.assert_allclose(momentum.kinetic_energy,
+                                momentum.kinetic_energy[0], rtol=1e-7)
+
+    def test_twisting_somersault(self):
+        times = np.linspace(0.0, 1.0, 401)
+        result = flight.simulate(self.h, self.motion, [60.0, 0.0, 0.0], 1.0,
+                                 times=times, tree=self.tree)
+        testing.assert_allclose(result.times, times)
+        assert result.CFGs.shape == (401, 21)
+        # The asymmetric arm motion tilts the human and makes it twist.
+        assert result.somersault[-1] > 4.0
+        assert abs(result.twist[-1]) > 1.0
+        # The angular momentum is conserved, with the orientation rates
+        # from differences of the simulated orientation.
+        rates = result.CFG_rates.copy()
+        rates[:, :3] = dynamics.joint_rates(result.orientations, times)
+        momentum = dynamics.momentum(self.h, result.CFGs, rates,
+                                     tree=self.tree)
+        testing.assert_allclose(momentum.angular_momentum[5:-5],
+                                np.tile([60.0, 0.0, 0.0], (391, 1)),
+                                atol=1e-2)
+
+        # Many flights together give the same results as one at a time.
+        batch = flight.simulate(self.h, self.motion,
+                                [[60.0, 0.0, 0.0], [40.0, 0.0, 5.0]], 1.0,
+                                times=times[::40], tree=self.tree)
+        assert batch.CFGs.shape == (2, 11, 21)
+        other = flight.simulate(self.h, self.motion, [40.0, 0.0, 5.0], 1.0,
+                                times=times[::40], tree=self.tree)
+        testing.assert_allclose(batch.CFGs[0], result.CFGs[::40], atol=1e-6)
+        testing.assert_allclose(batch.CFGs[1], other.CFGs, atol=1e-6)
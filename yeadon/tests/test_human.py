@@ -15,6 +15,7 @@ from numpy import testing, pi
 
 import yeadon.inertia as inertia
 import yeadon.human as hum
+from yeadon.results import human_metadata
 
 warnings.filterwarnings('ignore', category=DeprecationWarning)
 
@@ -975,6 +976,127 @@ class TestHuman(unittest.TestCase):
                 self.assertEquals(dens,
                         segmental_densities_des[key][seg] * factor * factor2)
 
+    def test_solid_override(self):
+        """Overrides the density and geometry of individual solids."""
+        h = hum.Human(self.male1meas)
+        h.set_CFG('K1K2flexion', 0.5)
+        mass = h.mass
+        inertia_before = h.inertia.copy()
+        fingerprint = human_metadata(h)['fingerprint']
+        # A lighter prosthesis in place of the lower leg and foot.
+        labels = ['k4', 'k5', 'k6', 'k7', 'k8']
+        solid_masses = [h._objects[label].mass for label in labels]
+        densities = [h._objects[label].density for label in labels]
+        for label in labels:
+            h.set_solid_override(label, density=300.0)
+        testing.assert_allclose(h.mass, mass + sum(
+            m * (300.0 / d - 1.0) for m, d in zip(solid_masses, densities)))
+        testing.assert_allclose(h.K2.mass, sum(solid.mass for solid in
+                                               h.K2.solids))
+        self.assertNotEqual(human_metadata(h)['fingerprint'], fingerprint)
+
+        # The incremental update equals redefining all solids, which keeps
+        # the overrides.
+        h.set_solid_override('k4', height=0.1,
+                             stadia=(('perimeter', 0.3), ('perimeter', 0.2)))
+        self.assertEqual(h.solid_overrides['k4']['density'], 300.0)
+        testing.assert_allclose(h._objects['k4'].height, 0.1)
+        center_of_mass, inertia_after = h.center_of_mass, h.inertia
+        K2pos = h.K2.end_pos
+        h.update()
+        testing.assert_allclose(h.center_of_mass, center_of_mass)
+        testing.assert_allclose(h.inertia, inertia_after)
+        testing.assert_allclose(h.K2.end_pos, K2pos)
+        testing.assert_allclose(h._objects['k4'].stads[0].perimeter, 0.3)
+
+        # Removing the overrides restores the human.
+        h.clear_solid_override('k4')
+        self.assertNotIn('k4', h.solid_overrides)
+        h.clear_solid_override()
+        self.assertEqual(h.solid_overrides, dict())
+        testing.assert_allclose(h.mass, mass)
+        testing.assert_allclose(h.inertia, inertia_before, atol=1e-12)
+        self.assertEqual(human_metadata(h)['fingerprint'], fingerprint)
+
+        self.assertRaises(ValueError, h.set_solid_override, 'x0', 1.0)
+        self.assertRaises(ValueError, h.set_solid_override, 'k4', -1.0)
+        self.assertRaises(ValueError, h.set_solid_override, 's7',
+                          stadia=(('perimeter', 0.3), ('perimeter', 0.2)))
+
+    def test_scale_human_by_mass_with_override(self):
+        """Solids with overridden densities keep their mass when scaling."""
+        densities = copy.deepcopy(hum.Human.segmental_densities)
+        try:
+            h = hum.Human(self.male1meas)
+            h.set_solid_override('k4', density=2000.0)
+            k4mass = h._objects['k4'].mass
+            h.scale_human_by_mass(80.0)
+            testing.assert_almost_equal(h.mass, 80.0)
+            testing.assert_allclose(h._objects['k4'].mass, k4mass)
+            self.assertEqual(h._objects['k4'].density, 2000.0)
+        finally:
+            hum.Human.segmental_densities = densities
+
+        # The overridden solids cannot be heavier than the measured mass,
+        # and the densities are left untouched.
+        h = hum.Human(self.male1meas)
+        h.set_solid_override('k4', density=2000.0)
+        self.assertRaises(ValueError, h.scale_human_by_mass, 1.0)
+        self.assertEqual(h.segmental_densities, densities)
+
+    def test_set_measurement(self):
+        """Changing one measurement equals rebuilding the human."""
+        for symmetric in (True, False):
+            h = hum.Human(self.male1meas, symmetric=symmetric)
+            h.set_CFG('CA1extension', 0.4)
+            h.set_CFG('PJ1extension', -0.3)
+            for name, factor in (('Lj3p', 1.1), ('Lb2p', 0.9),
+                                 ('Ls4w', 1.05), ('Ls0p', 0.95),
+                                 ('La2L', 1.1), ('Ls7p', 1.02),
+                                 ('Lk6d', 1.1), ('Ls8L', 0.9)):
+                h.set_measurement(name, factor * h.meas[name])
+                expected = hum.Human(copy.copy(h.meas), h.CFG.copy(),
+                                     symmetric=symmetric)
+                testing.assert_allclose(h.mass, expected.mass)
+                testing.assert_allclose(h.center_of_mass,
+                                        expected.center_of_mass)
+                testing.assert_allclose(h.inertia, expected.inertia,
+                                        atol=1e-12)
+                for segment, segment_expected in zip(h.segments,
+                                                     expected.segments):
+                    testing.assert_allclose(segment.end_pos,
+                                            segment_expected.end_pos)
+                    testing.assert_allclose(segment.rel_inertia,
+                                            segment_expected.rel_inertia,
+                                            atol=1e-12)
+
+        h = hum.Human(self.male1meas)
+        dependencies = h.measurement_dependencies('Lj3p')
+        self.assertEqual(dependencies['measurements'], ['Lj3p', 'Lk3p'])
+        self.assertEqual(dependencies['stadia'], ['Lj3: knee joint centre',
+                                                  'Lk3: knee joint centre'])
+        self.assertEqual(dependencies['solids'], ['j2', 'j3', 'k2', 'k3'])
+        self.assertEqual(dependencies['segments'], ['J1', 'J2', 'K1', 'K2'])
+        self.assertFalse(dependencies['moves_segments'])
+        self.assertTrue(h.measurement_dependencies('Lj3L')['moves_segments'])
+        self.assertEqual(h.measurement_dependencies('Ls0p')['stadia'],
+                         ['Ls0: hip joint centre', 'Lj0: hip joint centre',
+                          'Lk0: hip joint centre'])
+        dependencies = h.measurement_dependencies()
+        self.assertEqual(sorted(dependencies), sorted(hum.Human.measnames))
+        # Every measurement of a symmetric human builds a solid.
+        for name in hum.Human.measnames:
+            self.assertTrue(dependencies[name]['solids'])
+
+        # The overrides of solids are kept.
+        h.set_solid_override('j3', density=500.0)
+        h.set_measurement('Lj3p', 1.1 * h.meas['Lj3p'])
+        mass = h.mass
+        h.update()
+        testing.assert_allclose(h.mass, mass)
+        self.assertRaises(ValueError, h.set_measurement, 'Lj3x', 0.1)
+        self.assertRaises(ValueError, h.set_measurement, 'Lj3p', -0.1)
+
     def test_read_measurements(self):
         # -- Measurement input file errors.
         measPath = os.path.join(os.path.split(__file__)[0],
@@ -1234,6 +1356,119 @@ class TestHuman(unittest.TestCase):
         testing.assert_almost_equal(c_inertia[0, 2], 0.0)
         self.assertEquals(c_inertia[1, 2], 0.0)
 
+    def test_inertia_transformed_batch(self):
+        """The batched version agrees with inertia_transformed for every
+        point, frame, and configuration."""
+        h = hum.Human(self.male1meas)
+        h.set_CFG('somersault', np.pi * 0.25)
+        random = np.random.RandomState(0)
+        pos = random.uniform(-1.0, 1.0, (4, 3))
+        rotmats = inertia.euler_123_batch(random.uniform(-3.0, 3.0, (2, 3)))
+
+        grid = h.inertia_transformed_batch(pos, rotmats)
+        assert grid.shape == (4, 2, 3, 3)
+        for p in range(4):
+            for r in range(2):
+                testing.assert_allclose(grid[p, r], h.inertia_transformed(
+                    pos[p], np.asmatrix(rotmats[r])), atol=1e-12)
+        testing.assert_allclose(h.inertia_transformed_batch(pos)[1],
+                                h.inertia_transformed(pos[1]), atol=1e-12)
+        testing.assert_allclose(h.inertia_transformed_batch(), h.inertia)
+
+        bounds = np.array(hum.Human.CFGbounds)
+        CFGs = bounds[:, 0] + random.uniform(0.05, 0.95, (3, 21)) * \
+                (bounds[:, 1] - bounds[:, 0])
+        # The same points, frames per configuration.
+        per_CFG = inertia.euler_123_batch(random.uniform(-3.0, 3.0,
+                                                         (3, 2, 3)))
+        grid = h.inertia_transformed_batch(pos, per_CFG, CFGs)
+        assert grid.shape == (3, 4, 2, 3, 3)
+        points = h.inertia_transformed_batch(pos[np.newaxis].repeat(3, 0),
+                                             CFGs=CFGs)
+        assert points.shape == (3, 4, 3, 3)
+        for n in range(3):
+            h.set_CFG_dict(dict(zip(hum.Human.CFGnames, CFGs[n])))
+            testing.assert_allclose(grid[n, 3, 1], h.inertia_transformed(
+                pos[3], np.asmatrix(per_CFG[n, 1])), atol=1e-12)
+            testing.assert_allclose(points[n, 2],
+                                    h.inertia_transformed(pos[2]), atol=1e-12)
+
+        self.assertRaises(ValueError, h.inertia_transformed_batch,
+                          pos=[1.0, 2.0, 3.0])
+        self.assertRaises(ValueError, h.inertia_transformed_batch,
+                          rotmat=np.eye(3))
+
+    def test_compile_combination(self):
+        """The compiled combinations agree with combine_inertia, in the
+        current configuration and in many configurations."""
+        h = hum.Human(self.male1meas)
+        h.set_CFG('CA1adduction', -0.6)
+        h.set_CFG('somersault', 0.4)
+        h.set_CFG('J1J2flexion', 0.8)
+        objlists = [['A1', 'A2', 's3'], ['P'], ['j3', 'K2', 'b0', 'T'],
+                    list(h.segment_keys)]
+        bounds = np.array(hum.Human.CFGbounds)
+        CFGs = bounds[:, 0] + np.random.RandomState(0).uniform(
+                0.05, 0.95, (3, 21)) * (bounds[:, 1] - bounds[:, 0])
+        for objlist in objlists:
+            combination = h.compile_combination(objlist)
+            mass, com, inertia = h.combine_inertia(objlist)
+            c_mass, c_com, c_inertia = combination.evaluate()
+            testing.assert_allclose(c_mass, mass)
+            assert c_com.shape == (3, 1)
+            testing.assert_allclose(c_com, com)
+            testing.assert_allclose(c_inertia, inertia, atol=1e-12)
+
+            c_mass, c_coms, c_inertias = combination.evaluate_batch(CFGs)
+            assert c_coms.shape == (3, 3) and c_inertias.shape == (3, 3, 3)
+            original = dict(h.CFG)
+            for n, CFG in enumerate(CFGs):
+                h.set_CFG_dict(dict(zip(hum.Human.CFGnames, CFG)))
+                mass, com, inertia = h.combine_inertia(objlist)
+                testing.assert_allclose(c_coms[n], np.ravel(com))
+                testing.assert_allclose(c_inertias[n], inertia, atol=1e-12)
+            h.set_CFG_dict(original)
+        # The whole human.
+        testing.assert_allclose(combination.evaluate()[2], h.inertia,
+                                atol=1e-12)
+
+        with self.assertRaises(Exception) as e:
+            h.compile_combination(['k2', 'K1'])
+        self.assertEquals(str(e.exception), "A solid k2 and its parent "
+                "segment K1 have both been given as inputs. This duplicates "
+                "that solid's contribution.")
+        with self.assertRaises(Exception) as e:
+            h.compile_combination(['abracadabra'])
+
+    def test_subtree_inertia(self):
+        h = hum.Human(self.male1meas)
+        h.set_CFG('CB1abduction', 0.6)
+        h.set_CFG('PTsagittalFlexion', 0.3)
+        subtrees = h.subtree_inertia()
+        assert sorted(subtrees) == sorted(h.segment_keys)
+        c_mass, c_com, c_inertia = h.combine_inertia(['B1', 'B2'])
+        testing.assert_allclose(subtrees['B1'][0], c_mass)
+        testing.assert_allclose(subtrees['B1'][1], c_com)
+        testing.assert_allclose(subtrees['B1'][2], c_inertia, atol=1e-12)
+        testing.assert_allclose(subtrees['P'][2], h.inertia, atol=1e-12)
+        # About the right shoulder.
+        about_joint = h.subtree_inertia(about_joint=True)['B1'][2]
+        d = np.ravel(subtrees['B1'][1] - h.B1.pos)
+        testing.assert_allclose(about_joint,
+                                inertia.parallel_axis(subtrees['B1'][2],
+                                                      subtrees['B1'][0], d),
+                                atol=1e-12)
+
+    def test_get_segment_by_name(self):
+        h = hum.Human(self.male1meas)
+        assert h.get_segment_by_name('A1') is h.A1
+        assert h.get_segment_by_name('K2: Right shank-foot') is h.K2
+        # The first segment whose label starts with the name.
+        assert h.get_segment_by_name('A') is h.A1
+        h.set_CFG('CA1adduction', -0.6)
+        assert h.get_segment_by_name('A1') is h.A1
+        self.assertRaises(ValueError, h.get_segment_by_name, 'X1')
+
     def test_inertia_transformed(self):
         """Tests the functionality of getting an inertia tensor about a
         different point and in a different frame.
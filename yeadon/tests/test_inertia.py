@@ -158,3 +158,50 @@ def test_rotate_inertia():
                         [0.0, 0.0, 10.0]])
 
     testing.assert_allclose(I_b, expected_I_b, atol=1e-16)
+
+
+def test_principal_axes_batch():
+    import numpy as np
+    rng = np.random.RandomState(0)
+    A = rng.uniform(-1.0, 1.0, (50, 3, 3))
+    I = np.matmul(A, np.swapaxes(A, 1, 2)) + np.eye(3)
+    for closed_form in [False, True]:
+        Ip, C = inertia.principal_axes_batch(I, closed_form=closed_form)
+        assert Ip.shape == (50, 3) and C.shape == (50, 3, 3)
+        for n in range(0, 50, 7):
+            Ip1, C1 = inertia.principal_axes(I[n])
+            testing.assert_allclose(Ip[n], Ip1, rtol=1e-10)
+            # The same axes, up to their signs.
+            testing.assert_allclose(np.abs(np.sum(C[n] * C1, axis=1)), 1.0,
+                                    rtol=1e-8)
+        # I = C^T diag(Ip) C.
+        testing.assert_allclose(
+            np.einsum('nki,nk,nkj->nij', C, Ip, C), I, atol=1e-10)
+
+    # Repeated moments fall back to eigh.
+    I = np.array([np.diag([1.0, 1.0, 2.0]), np.eye(3)])
+    Ip, C = inertia.principal_axes_batch(I, closed_form=True)
+    testing.assert_allclose(Ip, [[1.0, 1.0, 2.0], [1.0, 1.0, 1.0]])
+    testing.assert_allclose(np.einsum('nki,nk,nkj->nij', C, Ip, C), I,
+                            atol=1e-12)
+
+
+def test_principal_axes_continuity():
+    import numpy as np
+    # A body that twists while two of its moments cross (at t = 1, which
+    # is not sampled).
+    t = np.linspace(0.0, 1.9, 200)
+    moments = np.column_stack((1.0 + t, 2.0 * np.ones_like(t), 5.0 - t))
+    R = inertia.euler_123_batch(np.column_stack((0.3 * t, 0.2 * t, 2.0 * t)))
+    I = np.einsum('nij,nj,nkj->nik', R, moments, R)
+    for closed_form in [False, True]:
+        Ip, C = inertia.principal_axes_batch(I, continuous=True,
+                                             closed_form=closed_form)
+        # Each axis follows the body, with a constant sign.
+        testing.assert_allclose(Ip, moments, atol=1e-8)
+        signs = np.sign(np.einsum('ij,ji->i', C[0], R[0]))
+        testing.assert_allclose(C, np.swapaxes(R, 1, 2) *
+                                signs[np.newaxis, :, np.newaxis], atol=1e-6)
+    # Without continuity, the moments are sorted and the axes jump.
+    Ip, C = inertia.principal_axes_batch(I)
+    testing.assert_allclose(Ip, np.sort(moments, axis=1), atol=1e-8)
@@ -0,0 +1,165 @@
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+from numpy import testing
+
+from yeadon.human import Human
+from yeadon import mesh
+
+warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+
+def enclosed_volume(vertices, faces):
+    a, b, c = (vertices[faces[:, i]] for i in range(3))
+    return np.sum(a * np.cross(b, c)) / 6.0
+
+
+class TestMesh(unittest.TestCase):
+    """Tests the triangle mesh export."""
+
+    male1meas = os.path.join(os.path.split(__file__)[0], '..', '..',
+            'misc', 'samplemeasurements', 'male1.txt')
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.h = Human(self.male1meas)
+        self.h.set_CFG('CA1adduction', -0.6)
+        self.h.set_CFG('somersault', 0.4)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_closed_solids(self):
+        for segment in self.h.segments:
+            for solid in segment.solids:
+                vertices, faces = solid._triangle_mesh()
+                # Every edge is shared by exactly two triangles, which
+                # traverse it in opposite directions.
+                edges = np.vstack((faces[:, [0, 1]], faces[:, [1, 2]],
+                                   faces[:, [2, 0]]))
+                counts = np.unique(edges, axis=0, return_counts=True)[1]
+                assert np.all(counts == 1), solid.label
+                counts = np.unique(np.sort(edges, axis=1), axis=0,
+                                   return_counts=True)[1]
+                assert np.all(counts == 2), solid.label
+                # Outward facing, and close to the volume of the solid.
+                testing.assert_allclose(enclosed_volume(vertices, faces),
+                                        solid.mass / solid.density,
+                                        rtol=0.05, err_msg=solid.label)
+
+    def test_human_mesh(self):
+        vertices, faces = mesh.human_mesh(self.h)
+        assert faces.max() == len(vertices) - 1
+        testing.assert_allclose(enclosed_volume(vertices, faces),
+                sum(solid.mass / solid.density
+                    for segment in self.h.segments
+                    for solid in segment.solids), rtol=0.03)
+        # The vertices are posed with the solids.
+        offset = 0
+        for segment in self.h.segments:
+            for solid in segment.solids:
+                local = solid._triangle_mesh()[0]
+                testing.assert_allclose(
+                    vertices[offset:offset + len(local)],
+                    np.asarray(solid._rot_mat * np.asmatrix(local).T +
+                               solid.pos).T, atol=1e-12)
+                offset += len(local)
+
+    def test_write(self):
+        vertices, faces = mesh.human_mesh(self.h)
+
+        fname = os.path.join(self.tmpdir, 'human.stl')
+        self.h.write_mesh(fname)
+        with open(fname, 'rb') as fid:
+            fid.read(80)
+            n_faces = np.frombuffer(fid.read(4), dtype='<u4')[0]
+            records = np.frombuffer(fid.read(), dtype=[
+                ('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)),
+                ('attribute', '<u2')])
+        assert n_faces == len(faces) == len(records)
+        testing.assert_allclose(records['vertices'], vertices[faces],
+                                atol=1e-6)
+        testing.assert_allclose(np.linalg.norm(records['normal'], axis=1), 1.0,
+                                rtol=1e-6)
+
+        fname = os.path.join(self.tmpdir, 'human.obj')
+        self.h.write_mesh(fname)
+        with open(fname) as fid:
+            lines = fid.read().splitlines()
+        v = np.array([line.split()[1:] for line in lines
+                      if line.startswith('v ')], dtype=float)
+        f = np.array([line.split()[1:] for line in lines
+                      if line.startswith('f ')], dtype=int)
+        testing.assert_allclose(v, vertices, atol=1e-9)
+        testing.assert_array_equal(f - 1, faces)
+
+        fname = os.path.join(self.tmpdir, 'human.mesh')
+        self.h.write_mesh(fname, file_format='PLY')
+        with open(fname, 'rb') as fid:
+            data = fid.read()
+        body = data[data.index(b'end_header\n') + len(b'end_header\n'):]
+        v = np.frombuffer(body[:12 * len(vertices)], dtype='<f4')
+        f = np.frombuffer(body[12 * len(vertices):],
+                          dtype=[('count', 'u1'), ('indices', '<i4', (3,))])
+        testing.assert_allclose(v.reshape((-1, 3)), vertices, atol=1e-6)
+        testing.assert_array_equal(f['count'], 3)
+        testing.assert_array_equal(f['indices'], faces)
+
+        self.assertRaises(ValueError, self.h.write_mesh, fname)
+
+    def test_trajectory(self):
+        CFGs = np.zeros((3, len(Human.CFGnames)))
+        CFGs[:, Human.CFGnames.index('twist')] = [0.0, 0.5, 1.0]
+        CFG = dict(self.h.CFG)
+        vertices, faces = mesh.trajectory_vertices(self.h, CFGs)
+        assert vertices.shape[0] == 3
+        assert self.h.CFG == CFG
+        testing.assert_array_equal(faces, mesh.human_mesh(self.h)[1])
+
+        self.h.set_CFG_dict(dict(zip(Human.CFGnames, CFGs[1])))
+        testing.assert_allclose(vertices[1], mesh.human_mesh(self.h)[0],
+                                atol=1e-12)
+
+        fnames = mesh.write_trajectory(
+                self.h, CFGs, os.path.join(self.tmpdir, 'frame{0:02d}.obj'))
+        assert [os.path.basename(fname) for fname in fnames] == \
+                ['frame00.obj', 'frame01.obj', 'frame02.obj']
+        assert all(os.path.exists(fname) for fname in fnames)
+
+    def test_mesh_level(self):
+        assert self.h.mesh_level == 'medium'
+        n_faces = dict((level, len(mesh.human_mesh(self.h, level)[1]))
+                       for level in ['low', 'medium', 'high'])
+        assert n_faces['low'] < n_faces['medium'] < n_faces['high']
+
+        # The templates of each level are kept.
+        solid = self.h.segments[0].solids[0]
+        template = solid._triangle_mesh('low')
+        self.h.mesh_level = 'low'
+        assert len(mesh.human_mesh(self.h)[1]) == n_faces['low']
+        assert solid._triangle_mesh('low') is template
+        assert solid._triangle_mesh('high') is not template
+
+        h = Human(self.male1meas, mesh_level='high')
+        assert len(mesh.human_mesh(h)[1]) == n_faces['high']
+        self.assertRaises(ValueError, Human, self.male1meas,
+                          mesh_level='ultra')
+        self.assertRaises(ValueError, mesh.human_mesh, h, 'ultra')
+
+    def test_inertia_ellipsoid_level(self):
+        eigvals, eigvecs = np.linalg.eig(self.h.inertia)
+        for level in ['low', 'high']:
+            x, y, z = self.h._make_inertia_ellipsoid_pos(level)
+            N = Human.n_ellipsoid_points[level]
+            assert x.shape == (N, N)
+            # Each point satisfies the equation of the ellipsoid.
+            points = np.vstack((x.ravel(), y.ravel(), z.ravel())) - \
+                    np.asarray(self.h.center_of_mass)
+            principal = np.dot(np.asarray(eigvecs).T, points)
+            testing.assert_allclose(
+                np.sum(principal**2 * eigvals[:, np.newaxis], axis=0), 1.0)
+        assert self.h._make_sphere_octant(1, 'low')[0].shape == (8, 8)
@@ -0,0 +1,92 @@
+import os
+import unittest
+import warnings
+
+import numpy as np
+from numpy import testing
+
+from yeadon.human import Human
+from yeadon import flight, optimize
+from yeadon.tree import SegmentTree
+
+warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+
+class TestOptimize(unittest.TestCase):
+    """Tests the optimization of the technique of a twisting somersault."""
+
+    male1meas = os.path.join(os.path.split(__file__)[0], '..', '..',
+            'misc', 'samplemeasurements', 'male1.txt')
+
+    def setUp(self):
+        self.h = Human(self.male1meas)
+        self.problem = optimize.TechniqueProblem(self.h, 0.5, [60.0, 0, 0],
+                joint_names=('CA1adduction', 'CB1abduction'), n_knots=3,
+                tree=SegmentTree(self.h))
+
+    def test_problem(self):
+        problem = self.problem
+        self.assertEqual(problem.n_parameters, 6)
+        testing.assert_allclose(problem.lower[:3], -3 * np.pi / 2)
+        testing.assert_allclose(problem.upper[3:], 3 * np.pi / 2)
+        x = np.array([0.0, -1.0, -2.0, 0.0, 0.5, 1.0])
+        motion = problem.motion(x)
+        column = flight.joint_names.index('CB1abduction')
+        testing.assert_allclose(motion.angles[:, column], [0.0, 0.5, 1.0])
+        testing.assert_allclose(motion(problem.knot_times)[0][:, column],
+                                [0.0, 0.5, 1.0])
+        # The objective is the negative twist at landing, one per flight.
+        objective = problem.objective(np.vstack((x, -x)))
+        self.assertEqual(objective.shape, (2,))
+        twist = problem.simulate(x, [0.0, 0.5]).twist[-1]
+        # Batched flights take different steps.
+        testing.assert_allclose(objective[0], -twist, rtol=1e-5)
+        # No twist without asymmetry.
+        testing.assert_allclose(problem.objective(problem.x0), 0.0,
+                                atol=1e-10)
+
+        value, gradient = problem.gradient(x)
+        testing.assert_allclose(value, objective[0], rtol=1e-5)
+        step = 1e-3
+        for i in range(len(x)):
+            dx = np.zeros(len(x))
+            dx[i] = step
+            estimate = (problem.objective(x + dx) -
+                        problem.objective(x - dx)) / (2 * step)
+            testing.assert_allclose(gradient[i], estimate, rtol=1e-3,
+                                    atol=1e-4)
+
+        target = optimize.TechniqueProblem(self.h, 0.5, [60.0, 0, 0],
+                joint_names=('CA1adduction', 'CB1abduction'), n_knots=3,
+                target=[1.0, 0.0, 0.0], tree=problem.tree)
+        orientation = problem.simulate(x, [0.5]).orientations[-1]
+        testing.assert_allclose(target.objective(x),
+                np.sum((orientation - [1.0, 0.0, 0.0])**2), rtol=1e-5)
+
+        self.assertRaises(ValueError, optimize.TechniqueProblem, self.h,
+                          0.5, [60.0, 0, 0], joint_names=('twist',))
+        self.assertRaises(ValueError, optimize.TechniqueProblem, self.h,
+                          0.5, [60.0, 0, 0], n_knots=2)
+
+    def test_optimize(self):
+        problem = self.problem
+        result = optimize.optimize(problem, max_iterations=4)
+        self.assertLess(result.objective, -0.5)
+        self.assertTrue(np.all(np.diff(result.history) <= 0.0))
+        self.assertTrue(np.all(result.x >= problem.lower))
+        self.assertTrue(np.all(result.x <= problem.upper))
+        testing.assert_allclose(result.objective, problem.objective(result.x),
+                                rtol=1e-5)
+        self.assertEqual(result.n_iterations, 4)
+        self.assertEqual(result.n_flights, 5 * 13 + 4 * 8)
+
+        results = optimize.multi_start(problem, n_starts=3, processes=1,
+                                       seed=0, max_iterations=2)
+        self.assertEqual(len(results), 3)
+        objectives = [result.objective for result in results]
+        self.assertEqual(objectives, sorted(objectives))
+        # The starting points are the same in a pool of processes.
+        pooled = optimize.multi_start(problem, n_starts=3, processes=2,
+                                      seed=0, max_iterations=2)
+        testing.assert_allclose([result.objective for result in pooled],
+                                objectives)
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+
+from yeadon.human import Human
+from yeadon import mesh, render
+
+warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def is_png(fname):
+    with open(fname, 'rb') as fid:
+        return fid.read(8) == PNG_SIGNATURE
+
+
+class TestRender(unittest.TestCase):
+    """Tests the matplotlib renderer."""
+
+    male1meas = os.path.join(os.path.split(__file__)[0], '..', '..',
+            'misc', 'samplemeasurements', 'male1.txt')
+
+    def setUp(self):
+        try:
+            import matplotlib
+        except ImportError:
+            self.skipTest('matplotlib is not installed.')
+        self.tmpdir = tempfile.mkdtemp()
+        self.h = Human(self.male1meas, mesh_level='low')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_render_human(self):
+        fname = os.path.join(self.tmpdir, 'human.png')
+        fig = render.render_human(self.h, fname, size=(2.0, 2.0), dpi=50)
+        assert is_png(fname)
+        assert tuple(fig.get_size_inches()) == (2.0, 2.0)
+        # All solids are one collection, with one color per triangle.
+        collection = fig.axes[0].collections[0]
+        assert len(collection.get_facecolors()) == len(
+                mesh.human_mesh(self.h)[1])
+
+    def test_render_configurations(self):
+        CFGs = np.zeros((3, len(Human.CFGnames)))
+        CFGs[:, Human.CFGnames.index('CA1adduction')] = [0.0, -0.5, -1.0]
+        for processes in [1, 2]:
+            pattern = os.path.join(self.tmpdir,
+                                   'p{0}_{{0:02d}}.png'.format(processes))
+            fnames = render.render_configurations(
+                    self.h, CFGs, pattern, processes=processes,
+                    fixed_limits=True, size=(2.0, 2.0), dpi=50)
+            assert [os.path.basename(fname) for fname in fnames] == [
+                    'p{0}_{1:02d}.png'.format(processes, i) for i in range(3)]
+            assert all(is_png(fname) for fname in fnames)
+
+    def test_limits(self):
+        vertices = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0],
+                             [0.0, 2.0, 0.0], [0.0, 0.0, 0.5]])
+        faces = np.array([[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]])
+        fig = render.draw_mesh(vertices, faces, np.ones((4, 3)))
+        ax = fig.axes[0]
+        # A cube that contains all vertices.
+        np.testing.assert_allclose(ax.get_xlim(), [-0.5, 1.5])
+        np.testing.assert_allclose(ax.get_ylim(), [0.0, 2.0])
+        np.testing.assert_allclose(ax.get_zlim(), [-0.75, 1.25])
+        limits = [[-1.0, 1.0], [-2.0, 2.0], [-3.0, 3.0]]
+        fig = render.draw_mesh(vertices, faces, np.ones((4, 3)),
+                               limits=limits)
+        np.testing.assert_allclose(fig.axes[0].get_zlim(), [-3.0, 3.0])
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+from numpy import testing
+
+from yeadon.human import Human
+from yeadon import results
+
+warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+
+class TestResultStore(unittest.TestCase):
+    """Tests the result stores."""
+
+    male1meas = os.path.join(os.path.split(__file__)[0], '..', '..',
+            'misc', 'samplemeasurements', 'male1.txt')
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def check_append_and_resume(self, path):
+        metadata = {'fingerprint': 'abc', 'CFGnames': ['a', 'b']}
+        first = np.arange(18.0).reshape((2, 3, 3))
+        second = np.arange(18.0, 45.0).reshape((3, 3, 3))
+
+        with results.open_result_store(path, metadata=metadata) as store:
+            assert len(store) == 0
+            store.append(inertia=first, index=[0, 1])
+            store.append(inertia=second, index=[2, 3, 4])
+            assert len(store) == 5
+            assert store.fields == ['index', 'inertia']
+
+        # Reopen to resume.
+        with results.open_result_store(path, metadata=metadata) as store:
+            assert len(store) == 5
+            store.append(inertia=first, index=[5, 6])
+            self.assertRaises(ValueError, store.append, inertia=first)
+            self.assertRaises(ValueError, store.append,
+                              inertia=np.zeros((2, 3)), index=[7, 8])
+
+        with results.open_result_store(path, mode='r') as store:
+            assert store.metadata == metadata
+            testing.assert_array_equal(store['inertia'],
+                                       np.concatenate([first, second, first]))
+            testing.assert_array_equal(store['index'], np.arange(7))
+            self.assertRaises(IOError, store.append, inertia=first,
+                              index=[0, 1])
+
+        # Mismatched metadata.
+        self.assertRaises(ValueError, results.open_result_store, path,
+                          metadata={'fingerprint': 'xyz'})
+
+    def test_npy(self):
+        path = os.path.join(self.tmpdir, 'sweep')
+        self.check_append_and_resume(path)
+
+        # Zero-copy reads.
+        store = results.open_result_store(path, mode='r')
+        assert isinstance(store['inertia'], np.memmap)
+
+        # A field that was appended to without the others is overwritten.
+        store = results.open_result_store(path)
+        store._append_field('index', np.array([7, 8]), 7)
+        assert len(store) == 7
+        store.append(inertia=np.zeros((1, 3, 3)), index=[100])
+        testing.assert_array_equal(store['index'][-1:], [100])
+        assert np.load(os.path.join(path, 'index.npy')).shape == (8,)
+
+    def test_hdf5(self):
+        try:
+            import h5py
+        except ImportError:
+            return
+        self.check_append_and_resume(os.path.join(self.tmpdir, 'sweep.h5'))
+
+    def test_zarr(self):
+        try:
+            import zarr
+        except ImportError:
+            return
+        self.check_append_and_resume(os.path.join(self.tmpdir, 'sweep.zarr'))
+
+    def test_sweep_configurations(self):
+        h = Human(self.male1meas)
+        CFGs = np.zeros((5, len(Human.CFGnames)))
+        CFGs[:, Human.CFGnames.index('CA1adduction')] = \
+                np.linspace(-1.0, 0.0, 5)
+        path = os.path.join(self.tmpdir, 'sweep')
+        metadata = results.human_metadata(h)
+
+        store = results.open_result_store(path, metadata=metadata)
+        results.sweep_configurations(h, CFGs[:3], store, chunk_size=2)
+        assert len(store) == 3
+        # Resumes where the previous sweep stopped.
+        results.sweep_configurations(h, CFGs, store, chunk_size=2)
+        assert len(store) == 5
+        assert h.CFG['CA1adduction'] == 0.0
+
+        testing.assert_array_equal(store['CFG'], CFGs)
+        h.set_CFG('CA1adduction', -0.5)
+        testing.assert_allclose(store['inertia'][2], h.inertia)
+        testing.assert_allclose(store['center_of_mass'][2],
+                                np.ravel(h.center_of_mass))
+
+        # A combination of segments.
+        arm = results.open_result_store(os.path.join(self.tmpdir, 'arm'))
+        results.sweep_configurations(h, CFGs, arm, objlist=('A1', 'A2'))
+        testing.assert_allclose(arm['inertia'][2],
+                                h.combine_inertia(('A1', 'A2'))[2],
+                                atol=1e-12)
+
+        other = Human(self.male1meas, density_set='Chandler')
+        self.assertRaises(ValueError, results.sweep_configurations, other,
+                          CFGs, store)
+        # Resuming with other, or reordered, configurations.
+        self.assertRaises(ValueError, results.sweep_configurations, h,
+                          CFGs[::-1], store)
+        other_CFGs = CFGs.copy()
+        other_CFGs[1, Human.CFGnames.index('PTbending')] = 0.1
+        self.assertRaises(ValueError, results.sweep_configurations, h,
+                          np.vstack((other_CFGs, CFGs)), store)
+        assert len(store) == 5
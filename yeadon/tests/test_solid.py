@@ -11,7 +11,7 @@ import warnings
 from numpy import testing, pi, array, matrix, sin, cos, zeros, array, mat, \
         arctan
 
-from yeadon.solid import Stadium, Solid, StadiumSolid
+from yeadon.solid import Stadium, Solid, StadiumSolid, Semiellipsoid
 from yeadon import inertia
 
 warnings.filterwarnings('ignore', category=DeprecationWarning)
@@ -525,3 +525,40 @@ def test_rotate_inertia():
                         [0.0, 0.0, 10.0]])
 
     testing.assert_allclose(I_b, expected_I_b, atol=1e-16)
+
+
+def test_lazy_mesh():
+    """Meshes are only generated when they are needed for drawing, once per
+    level of detail."""
+
+    stad1 = Stadium('Ls1: umbilicus', 'thicknessradius', 1, 3)
+    stad2 = Stadium('Lb1: mid-arm', 'thicknessradius', 2, 2)
+    solid = StadiumSolid('solid', 1.5, stad1, stad2, 4)
+    rot_mat = inertia.rotate_space_123((0.3, -0.2, 1.1))
+    solid.set_orientation(array([[1.0], [2.0], [3.0]]), rot_mat, True)
+    assert solid._orig_mesh == {}
+
+    solid._generate_mesh()
+    mesh = solid._orig_mesh['medium']
+    assert len(mesh) == 2 and mesh[0].shape == (3, 20)
+    testing.assert_allclose(mesh[1][2], 4.0)
+    solid._generate_mesh()
+    assert solid._orig_mesh['medium'] is mesh
+
+    X, Y, Z = solid._make_pos(0, 'high')
+    assert X.shape == (1, 68)
+    assert solid._orig_mesh['medium'] is mesh
+    assert solid._get_orig_mesh_points('low')[1].shape == (3, 12)
+
+    head = Semiellipsoid('s7: above ear', 1.5, 2 * pi * 0.1, 0.2)
+    head.set_orientation(array([[1.0], [2.0], [3.0]]), rot_mat, True)
+    assert head._orig_mesh == {}
+    x, y, z = head._make_pos()
+    mesh_x, mesh_y, mesh_z = head._get_orig_mesh_points()
+    for i, j in [(0, 0), (3, 7), (29, 29)]:
+        point = rot_mat * array([[mesh_x[i, j]], [mesh_y[i, j]],
+                                 [mesh_z[i, j]]]) + head.pos
+        testing.assert_allclose([x[i, j], y[i, j], z[i, j]],
+                                array(point).flatten())
+    assert head._make_pos('low')[0].shape == (12, 12)
+    testing.assert_raises(ValueError, head._make_pos, 'ultra')
@@ -0,0 +1,142 @@
+import os
+import unittest
+import warnings
+
+import numpy as np
+from numpy import testing
+
+from yeadon.human import Human
+from yeadon.tree import SegmentTree
+
+warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+
+class TestSegmentTree(unittest.TestCase):
+    """Tests the batched kinematics of the segment tree."""
+
+    male1meas = os.path.join(os.path.split(__file__)[0], '..', '..',
+            'misc', 'samplemeasurements', 'male1.txt')
+
+    def setUp(self):
+        self.h = Human(self.male1meas)
+        self.h._rotate_coord_sys([0.1, 0.2, 0.3])
+        self.h._translate_coord_sys([0.3, -0.2, 0.1])
+        bounds = np.array(Human.CFGbounds)
+        fraction = np.random.RandomState(2).uniform(0.05, 0.95, (4, 21))
+        self.CFGs = bounds[:, 0] + fraction * (bounds[:, 1] - bounds[:, 0])
+        self.tree = SegmentTree(self.h)
+
+    def test_points(self):
+        joint_centers = self.tree.joint_centers(self.CFGs)
+        end_points = self.tree.end_points(self.CFGs)
+        origins, ends = self.tree.solid_points(self.CFGs)
+        assert joint_centers.shape == end_points.shape == (4, 11, 3)
+        assert origins.shape == ends.shape == (4, 40, 3)
+        assert len(self.tree.solid_labels) == 40
+        for n, CFG in enumerate(self.CFGs):
+            self.h.set_CFG_dict(dict(zip(Human.CFGnames, CFG)))
+            for i, segment in enumerate(self.h.segments):
+                testing.assert_allclose(joint_centers[n, i],
+                                        np.ravel(segment.pos), atol=1e-12)
+                testing.assert_allclose(end_points[n, i],
+                                        np.ravel(segment.end_pos), atol=1e-12)
+            solids = [solid for segment in self.h.segments
+                      for solid in segment.solids]
+            for j, solid in enumerate(solids):
+                assert self.tree.solid_labels[j] == solid.label
+                testing.assert_allclose(origins[n, j], np.ravel(solid.pos),
+                                        atol=1e-12)
+                testing.assert_allclose(ends[n, j], np.ravel(solid.end_pos),
+                                        atol=1e-12)
+            # The wrist is the end of the solid named after it.
+            testing.assert_allclose(
+                ends[n, self.tree.solid_labels.index('a4: wrist joint centre')],
+                np.ravel(self.h.A2.solids[2].end_pos), atol=1e-12)
+
+    def test_point_positions(self):
+        # A marker 0.1 m along the local x axis of the left shank.
+        points = self.tree.point_positions(self.CFGs, [8], [[0.1, 0.0, 0.0]])
+        assert points.shape == (4, 1, 3)
+        rot_mats, positions = self.tree.forward_kinematics(self.CFGs)
+        testing.assert_allclose(points[:, 0],
+                                positions[:, 8] + 0.1 * rot_mats[:, 8, :, 0])
+
+    def test_velocities(self):
+        rates = np.random.RandomState(3).uniform(-2.0, 2.0, self.CFGs.shape)
+        angular_velocities, velocities = self.tree.velocities(self.CFGs,
+                                                              rates)
+        # Central differences along the direction of the rates.
+        h = 1e-6
+        R_plus, p_plus = self.tree.forward_kinematics(self.CFGs + h * rates)
+        R_minus, p_minus = self.tree.forward_kinematics(self.CFGs - h * rates)
+        R, p = self.tree.forward_kinematics(self.CFGs)
+        testing.assert_allclose(velocities, (p_plus - p_minus) / (2 * h),
+                                atol=1e-7)
+        # The derivative of R is omega x R.
+        skew = np.einsum('nsij,nskj->nsik', (R_plus - R_minus) / (2 * h), R)
+        testing.assert_allclose(skew, -np.swapaxes(skew, 2, 3), atol=1e-7)
+        testing.assert_allclose(angular_velocities[..., 0], skew[..., 2, 1],
+                                atol=1e-7)
+        testing.assert_allclose(angular_velocities[..., 1], skew[..., 0, 2],
+                                atol=1e-7)
+        testing.assert_allclose(angular_velocities[..., 2], skew[..., 1, 0],
+                                atol=1e-7)
+
+    def test_accelerations(self):
+        random = np.random.RandomState(6)
+        rates = random.uniform(-2.0, 2.0, self.CFGs.shape)
+        accelerations = random.uniform(-5.0, 5.0, self.CFGs.shape)
+        omega, alpha, acc = self.tree.accelerations(self.CFGs, rates,
+                                                    accelerations)
+        testing.assert_allclose(omega,
+                                self.tree.velocities(self.CFGs, rates)[0])
+        # Central differences along q(t) = q + q' t + q'' t^2 / 2.
+        h = 1e-6
+        plus = self.tree.velocities(self.CFGs + h * rates +
+                                    0.5 * h**2 * accelerations,
+                                    rates + h * accelerations)
+        minus = self.tree.velocities(self.CFGs - h * rates +
+                                     0.5 * h**2 * accelerations,
+                                     rates - h * accelerations)
+        testing.assert_allclose(alpha, (plus[0] - minus[0]) / (2 * h),
+                                atol=1e-6)
+        testing.assert_allclose(acc, (plus[1] - minus[1]) / (2 * h),
+                                atol=1e-6)
+
+    def test_center_of_mass_jacobian(self):
+        jacobian = self.tree.center_of_mass_jacobian(self.CFGs)
+        assert jacobian.shape == (4, 3, 21)
+        h = 1e-6
+        for k in range(21):
+            step = np.zeros(21)
+            step[k] = h
+            difference = (self.tree.mass_properties(self.CFGs + step)[0] -
+                          self.tree.mass_properties(self.CFGs - step)[0])
+            testing.assert_allclose(jacobian[:, :, k], difference / (2 * h),
+                                    atol=1e-8)
+
+    def test_subtree_properties(self):
+        masses, coms, inertias = self.tree.subtree_properties(self.CFGs)
+        assert coms.shape == (4, 11, 3) and inertias.shape == (4, 11, 3, 3)
+        # The subtree of the pelvis is the whole human.
+        testing.assert_allclose(masses[0], self.tree.mass)
+        com, inertia = self.tree.mass_properties(self.CFGs)
+        testing.assert_allclose(coms[:, 0], com)
+        testing.assert_allclose(inertias[:, 0], inertia, atol=1e-12)
+        # The whole left arm, and the chest-head with both arms.
+        for i, objlist in [(3, ['A1', 'A2']),
+                           (2, ['C', 'A1', 'A2', 'B1', 'B2']),
+                           (8, ['J2'])]:
+            combination = self.h.compile_combination(objlist)
+            mass, com, inertia = combination.evaluate_batch(self.CFGs)
+            testing.assert_allclose(masses[i], mass)
+            testing.assert_allclose(coms[:, i], com)
+            testing.assert_allclose(inertias[:, i], inertia, atol=1e-12)
+
+        # About the joint centers, by the parallel axis theorem.
+        about_joint = self.tree.subtree_properties(self.CFGs,
+                                                   about_joint=True)[2]
+        d = coms[2, 3] - self.tree.joint_centers(self.CFGs)[2, 3]
+        testing.assert_allclose(about_joint[2, 3], inertias[2, 3] + masses[3] *
+                                (np.dot(d, d) * np.eye(3) - np.outer(d, d)),
+                                atol=1e-12)
@@ -0,0 +1,74 @@
+import os
+import unittest
+import warnings
+
+import numpy as np
+from numpy import testing
+
+from yeadon.human import Human
+from yeadon.cohort import Cohort
+from yeadon.validation import validate_measurements
+
+warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+
+class TestValidation(unittest.TestCase):
+    """Tests :py:func:`validate_measurements`."""
+
+    sample_dir = os.path.join(os.path.split(__file__)[0], '..', '..',
+            'misc', 'samplemeasurements')
+
+    def setUp(self):
+        self.cohort = Cohort.from_measurement_files(self.sample_dir)
+        self.column = dict((name, i) for i, name in
+                           enumerate(Human.measnames))
+
+    def test_sample_measurements(self):
+        report = validate_measurements(self.cohort.meas,
+                                       self.cohort.subject_ids)
+        # The toes of female1 are too narrow (Human warns and uses circles).
+        stadia = report.for_subject(0)
+        stadia = stadia[stadia['check'] == 'stadium']
+        assert set(['Lj9p/Lj9w', 'Lk9p/Lk9w']) <= set(stadia['names'])
+        toes = stadia[stadia['names'] == 'Lj9p/Lj9w']
+        testing.assert_allclose(toes['value'], 3.3653846153846154)
+        assert 'female1: stadium Lj9p/Lj9w = 3.36538' in str(report)
+
+        # male4 only differs between the left and right foot.
+        assert set(report.for_subject(4)['names']) == set(['Lj6L/Lk6L'])
+        assert list(report.valid) == [False] * 5
+        assert len(validate_measurements(self.cohort.meas[4:],
+                                         asymmetry_tolerance=0.5)) == 0
+
+    def test_all_problems_in_one_pass(self):
+        meas = np.array(self.cohort.meas[[4, 4, 4]])
+        meas[0, self.column['Ls2L']] = np.nan
+        meas[0, self.column['La3p']] = -1.0
+        # Ls1L >= Ls2L.
+        meas[1, self.column['Ls1L']] = meas[1, self.column['Ls2L']] + 1.0
+        # A round stadium has perimeter / width = pi; this is wider.
+        meas[1, self.column['Ls0p']] = 1.9 * meas[1, self.column['Ls0w']]
+        meas[1, self.column['Ls4d']] = 2.0 * meas[1, self.column['Ls4w']]
+        meas[1, self.column['Lk3L']] = 1.7 * meas[1, self.column['Lj3L']]
+
+        report = validate_measurements(meas, asymmetry_tolerance=0.5)
+
+        assert list(report.valid) == [False, False, True]
+        checks = set(zip(report.issues['subject'], report.issues['check'],
+                         report.issues['names']))
+        expected = set([(0, 'missing', 'Ls2L'),
+                        (0, 'nonpositive', 'La3p'),
+                        (1, 'length-chain', 'Ls1L<Ls2L'),
+                        (1, 'stadium', 'Ls0p/Ls0w'),
+                        (1, 'stadium', 'Ls4d/Ls4w'),
+                        (1, 'asymmetry', 'Lj3L/Lk3L')])
+        assert expected <= checks
+        assert set(report.for_subject(2)['check']) == set()
+
+    def test_cohort_validate(self):
+        report = self.cohort.validate(chunk_size=2)
+        expected = validate_measurements(self.cohort.meas_in_meters())
+        testing.assert_array_equal(report.issues, expected.issues)
+        assert list(report.subject_ids) == list(self.cohort.subject_ids)
+
+        self.assertRaises(ValueError, validate_measurements, np.ones((2, 3)))
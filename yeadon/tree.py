@@ -0,0 +1,745 @@
+"""The tree module describes the kinematic tree of a human, the segments and
+the joints that connect them, with constant arrays, so that the pose and the
+inertia properties of a human can be computed for many configurations at once
+without updating the Human object.
+
+The segments are the 11 segments of :py:class:`yeadon.Human`, in the order of
+`Human.segments`. Each segment is attached to its parent at a point that is
+fixed in the parent's frame, and its orientation relative to the parent is
+given by a body-fixed 1-2-3 rotation (see :py:func:`yeadon.inertia.euler_123`)
+through up to three of the joint angles of `Human.CFGnames`.
+
+"""
+# Use Python3 integer division rules.
+from __future__ import division
+
+import numpy as np
+
+from . import inertia
+
+
+class SegmentTree(object):
+    """The kinematic tree of a human: the constant data that is needed to
+    pose the segments and solids, and to compute inertia properties, for any
+    configuration of the joint angles.
+
+    The tree is a snapshot of the human: it must be created again if the
+    measurements, densities, or global coordinate system of the human
+    change. Changing the configuration of the human does not affect it.
+
+    Attributes
+    ----------
+    names : tuple of str
+        Short names of the segments.
+    parents : tuple of int
+        Index of the parent of each segment, -1 for the pelvis.
+    joint_angles : tuple of tuple of str or None
+        For each segment, the CFG names of the three angles of its euler_123
+        rotation relative to its parent; None for an angle that is always
+        zero.
+    joint_indices : np.ndarray of int, shape(11, 3)
+        Indices into Human.CFGnames of the angles in `joint_angles`, -1 for
+        None.
+    joint_offsets : np.ndarray, shape(11, 3)
+        Position of the origin of each segment from the origin of its
+        parent, expressed in the parent's frame. For the pelvis, the position
+        of its origin in the global frame.
+    root_orientation : np.ndarray, shape(3, 3)
+        Orientation of the global coordinate system of the human; the
+        orientation of the pelvis is this times its euler_123 rotation.
+    masses : np.ndarray, shape(11,)
+        Mass of each segment.
+    rel_centers_of_mass : np.ndarray, shape(11, 3)
+        Center of mass of each segment, in the segment's frame from its
+        origin.
+    rel_inertias : np.ndarray, shape(11, 3, 3)
+        Inertia tensor of each segment about its center of mass, in the
+        segment's frame.
+    solid_segments : np.ndarray of int, shape(40,)
+        Index of the segment of each solid, for the solids in the order of
+        the segments.
+    solid_offsets : np.ndarray, shape(40, 3)
+        Position of the origin of each solid, in the frame of its segment
+        from the segment's origin.
+    solid_end_offsets : np.ndarray, shape(40, 3)
+        Position of the end point (Solid.end_pos) of each solid, in the
+        frame of its segment from the segment's origin.
+    end_offsets : np.ndarray, shape(11, 3)
+        Position of the end point (Segment.end_pos) of each segment, in the
+        segment's frame from its origin.
+    solid_labels : tuple of str
+        Labels of the solids, in the order of `solid_segments`.
+
+    """
+    names = ('P', 'T', 'C', 'A1', 'A2', 'B1', 'B2', 'J1', 'J2', 'K1', 'K2')
+    parents = (-1, 0, 1, 2, 3, 2, 5, 0, 7, 0, 9)
+    joint_angles = (
+            ('somersault', 'tilt', 'twist'),
+            ('PTsagittalFlexion', 'PTbending', None),
+            ('TCsagittalSpinalFlexion', None, 'TCspinalTorsion'),
+            ('CA1extension', 'CA1adduction', 'CA1rotation'),
+            ('A1A2extension', None, None),
+            ('CB1extension', 'CB1abduction', 'CB1rotation'),
+            ('B1B2extension', None, None),
+            ('PJ1extension', 'PJ1adduction', None),
+            ('J1J2flexion', None, None),
+            ('PK1extension', 'PK1abduction', None),
+            ('K1K2flexion', None, None))
+
+    def __init__(self, human):
+        """Extracts the tree from a human.
+
+        Parameters
+        ----------
+        human : :py:class:`yeadon.Human`
+
+        """
+        self.CFGnames = human.CFGnames
+        self.joint_indices = np.array([[-1 if name is None else
+                                        self.CFGnames.index(name)
+                                        for name in angles]
+                                       for angles in self.joint_angles])
+        segments = human.segments
+        rot_mats = [np.asarray(segment.rot_mat) for segment in segments]
+        positions = [np.asarray(segment.pos, dtype=float).ravel()
+                     for segment in segments]
+
+        # The offsets are constant in the parent's frame, so they can be
+        # read from the human in its current configuration.
+        self.joint_offsets = np.empty((len(segments), 3))
+        for i, parent in enumerate(self.parents):
+            if parent < 0:
+                self.joint_offsets[i] = np.ravel(human._coord_sys_pos)
+            else:
+                self.joint_offsets[i] = np.dot(rot_mats[parent].T,
+                        positions[i] - positions[parent])
+        self.root_orientation = np.array(human._coord_sys_orient, dtype=float)
+
+        self.masses = np.array([segment.mass for segment in segments])
+        self.rel_centers_of_mass = np.array(
+                [np.ravel(segment.rel_center_of_mass) for segment in segments])
+        self.rel_inertias = np.array(
+                [np.asarray(segment.rel_inertia) for segment in segments])
+
+        self.solid_segments = np.array([i for i, segment in enumerate(segments)
+                                        for solid in segment.solids])
+        self.solid_offsets = np.array([
+            np.dot(rot_mats[i].T, np.ravel(solid.pos) - positions[i])
+            for i, segment in enumerate(segments)
+            for solid in segment.solids])
+        self.solid_end_offsets = np.array([
+            np.dot(rot_mats[i].T, np.ravel(solid.end_pos) - positions[i])
+            for i, segment in enumerate(segments)
+            for solid in segment.solids])
+        self.end_offsets = np.array([
+            np.dot(rot_mats[i].T, np.ravel(segment.end_pos) - positions[i])
+            for i, segment in enumerate(segments)])
+        self.solid_labels = tuple(solid.label for segment in segments
+                                  for solid in segment.solids)
+
+    @property
+    def mass(self):
+        """Total mass of the human, a float in units of kg."""
+        return self.masses.sum()
+
+    def joint_rotations(self, CFGs):
+        """Returns the rotation matrix of each segment relative to its
+        parent (for the pelvis, relative to the global coordinate system).
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+
+        Returns
+        -------
+        rotations : np.ndarray, shape(N, 11, 3, 3)
+
+        """
+        CFGs = np.asarray(CFGs, dtype=float)
+        # Append a column of zeros for the angles that are always zero.
+        padded = np.concatenate((CFGs, np.zeros((len(CFGs), 1))), axis=1)
+        rotations = inertia.euler_123_batch(padded[:, self.joint_indices])
+        rotations[:, 0] = np.einsum('ij,njk->nik', self.root_orientation,
+                                    rotations[:, 0])
+        return rotations
+
+    def forward_kinematics(self, CFGs):
+        """Returns the orientation and position of each segment, in the
+        global frame, for many configurations.
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+
+        Returns
+        -------
+        rot_mats : np.ndarray, shape(N, 11, 3, 3)
+            Rotation matrix of each segment, such that v_global =
+            rot_mats[n, i] * v_segment.
+        positions : np.ndarray, shape(N, 11, 3)
+            Position of the origin of each segment.
+
+        """
+        rot_mats = self.joint_rotations(CFGs)
+        positions = np.empty(rot_mats.shape[:2] + (3,))
+        # The parents precede their children, so one pass suffices.
+        for i, parent in enumerate(self.parents):
+            if parent < 0:
+                positions[:, i] = self.joint_offsets[i]
+            else:
+                rot_mats[:, i] = np.matmul(rot_mats[:, parent],
+                                           rot_mats[:, i])
+                positions[:, i] = positions[:, parent] + np.einsum(
+                        'nij,j->ni', rot_mats[:, parent],
+                        self.joint_offsets[i])
+        return rot_mats, positions
+
+    def _per_joint(self, values):
+        """Returns values given per CFG angle, shape(N, 21), rearranged per
+        joint, shape(N, 11, 3), with zeros for the angles that are always
+        zero."""
+        values = np.asarray(values, dtype=float)
+        return np.concatenate((values, np.zeros((len(values), 1))),
+                              axis=1)[:, self.joint_indices]
+
+    def joint_axes(self, CFGs):
+        """Returns the axes of the three angles of each joint, expressed in
+        the parent's frame (for the pelvis, in the global frame).
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+
+        Returns
+        -------
+        axes : np.ndarray, shape(N, 11, 3, 3)
+            The columns are the unit axes of the angles in `joint_angles`.
+
+        Notes
+        -----
+        For the body-fixed 1-2-3 rotation R1(q1) R2(q2) R3(q3) of
+        :py:func:`yeadon.inertia.euler_123`, the axes are e1, R1 e2, and
+        R1 R2 e3, and the angular velocity is q1' e1 + q2' R1 e2 +
+        q3' R1 R2 e3.
+
+        """
+        angles = self._per_joint(CFGs)
+        s1, s2 = np.sin(angles[..., 0]), np.sin(angles[..., 1])
+        c1, c2 = np.cos(angles[..., 0]), np.cos(angles[..., 1])
+        axes = np.zeros(angles.shape + (3,))
+        axes[..., 0, 0] = 1.0
+        axes[..., 1, 1] = c1
+        axes[..., 2, 1] = s1
+        axes[..., 0, 2] = s2
+        axes[..., 1, 2] = -s1 * c2
+        axes[..., 2, 2] = c1 * c2
+        axes[:, 0] = np.matmul(self.root_orientation, axes[:, 0])
+        return axes
+
+    def joint_angular_velocities(self, CFGs, CFG_rates):
+        """Returns the angular velocity of each segment relative to its
+        parent (for the pelvis, relative to the global coordinate system),
+        expressed in the parent's frame.
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+        CFG_rates : array_like, shape(N, 21)
+            Time derivatives of the joint angles (rad/s).
+
+        Returns
+        -------
+        angular_velocities : np.ndarray, shape(N, 11, 3)
+
+        """
+        return np.matmul(self.joint_axes(CFGs),
+                         self._per_joint(CFG_rates)[..., np.newaxis])[..., 0]
+
+    def velocities(self, CFGs, CFG_rates, rot_mats=None, positions=None):
+        """Returns the angular velocity of each segment and the velocity of
+        its origin, in the global frame, for many configurations. The origin
+        of the pelvis is fixed.
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+        CFG_rates : array_like, shape(N, 21)
+            Time derivatives of the joint angles (rad/s).
+        rot_mats, positions : np.ndarray, optional
+            The output of :py:meth:`forward_kinematics` for `CFGs`, if it
+            has already been computed.
+
+        Returns
+        -------
+        angular_velocities : np.ndarray, shape(N, 11, 3)
+            Angular velocity of each segment (rad/s).
+        velocities : np.ndarray, shape(N, 11, 3)
+            Velocity of the origin of each segment (m/s).
+
+        """
+        if rot_mats is None or positions is None:
+            rot_mats, positions = self.forward_kinematics(CFGs)
+        angular_velocities = self.joint_angular_velocities(CFGs, CFG_rates)
+        velocities = np.zeros(angular_velocities.shape)
+        # The parents precede their children, so one pass suffices.
+        for i, parent in enumerate(self.parents):
+            if parent >= 0:
+                angular_velocities[:, i] = (angular_velocities[:, parent] +
+                        np.einsum('nij,nj->ni', rot_mats[:, parent],
+                                  angular_velocities[:, i]))
+                velocities[:, i] = velocities[:, parent] + np.cross(
+                        angular_velocities[:, parent],
+                        positions[:, i] - positions[:, parent])
+        return angular_velocities, velocities
+
+    def accelerations(self, CFGs, CFG_rates, CFG_accelerations,
+                      rot_mats=None, positions=None):
+        """Returns the angular acceleration of each segment and the
+        acceleration of its origin, in the global frame, for many
+        configurations. The origin of the pelvis is fixed.
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+        CFG_rates : array_like, shape(N, 21)
+            Time derivatives of the joint angles (rad/s).
+        CFG_accelerations : array_like, shape(N, 21)
+            Second time derivatives of the joint angles (rad/s^2).
+        rot_mats, positions : np.ndarray, optional
+            The output of :py:meth:`forward_kinematics` for `CFGs`, if it
+            has already been computed.
+
+        Returns
+        -------
+        angular_velocities : np.ndarray, shape(N, 11, 3)
+            Angular velocity of each segment (rad/s).
+        angular_accelerations : np.ndarray, shape(N, 11, 3)
+            Angular acceleration of each segment (rad/s^2).
+        accelerations : np.ndarray, shape(N, 11, 3)
+            Acceleration of the origin of each segment (m/s^2).
+
+        """
+        if rot_mats is None or positions is None:
+            rot_mats, positions = self.forward_kinematics(CFGs)
+        axes = self.joint_axes(CFGs)
+        rates = self._per_joint(CFG_rates)
+        relative = np.matmul(axes, rates[..., np.newaxis])[..., 0]
+        # Derivative of the relative angular velocity in the parent's
+        # frame: the axes R1 e2 and R1 R2 e3 turn with q1' e1 and with
+        # q1' e1 + q2' R1 e2, respectively.
+        relative_accelerations = (
+            np.matmul(axes, self._per_joint(CFG_accelerations)
+                      [..., np.newaxis])[..., 0] +
+            (rates[..., 0] * rates[..., 1])[..., np.newaxis] *
+            np.cross(axes[..., 0], axes[..., 1]) +
+            rates[..., 2, np.newaxis] * np.cross(
+                rates[..., 0, np.newaxis] * axes[..., 0] +
+                rates[..., 1, np.newaxis] * axes[..., 1], axes[..., 2]))
+
+        angular_velocities = relative
+        angular_accelerations = relative_accelerations
+        accelerations = np.zeros(relative.shape)
+        # The parents precede their children, so one pass suffices.
+        for i, parent in enumerate(self.parents):
+            if parent >= 0:
+                omega = angular_velocities[:, parent]
+                rotated = np.einsum('nij,nj->ni', rot_mats[:, parent],
+                                    relative[:, i])
+                angular_velocities[:, i] = omega + rotated
+                angular_accelerations[:, i] = (
+                    angular_accelerations[:, parent] +
+                    np.einsum('nij,nj->ni', rot_mats[:, parent],
+                              relative_accelerations[:, i]) +
+                    np.cross(omega, rotated))
+                offset = positions[:, i] - positions[:, parent]
+                accelerations[:, i] = (accelerations[:, parent] +
+                    np.cross(angular_accelerations[:, parent], offset) +
+                    np.cross(omega, np.cross(omega, offset)))
+        return angular_velocities, angular_accelerations, accelerations
+
+    def center_of_mass_jacobian(self, CFGs, rot_mats=None, positions=None):
+        """Returns the Jacobian of the center of mass of the human with
+        respect to the joint angles, for many configurations: the velocity
+        of the center of mass is the Jacobian times the joint angle rates.
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+        rot_mats, positions : np.ndarray, optional
+            The output of :py:meth:`forward_kinematics` for `CFGs`, if it
+            has already been computed.
+
+        Returns
+        -------
+        jacobian : np.ndarray, shape(N, 3, 21)
+            Derivatives of the center of mass (m/rad), with columns in the
+            order of Human.CFGnames.
+
+        Notes
+        -----
+        A rotation q about the world axis u of a joint moves the subtree of
+        the joint, of mass m_s and center of mass c_s, about the joint
+        center p, so the column of q is u x (c_s - p) * m_s / m.
+
+        """
+        if rot_mats is None or positions is None:
+            rot_mats, positions = self.forward_kinematics(CFGs)
+        axes = self.joint_axes(CFGs)
+        segment_coms = positions + np.einsum('nsij,sj->nsi', rot_mats,
+                                             self.rel_centers_of_mass)
+        # Mass and first moment of the subtree of each segment; the children
+        # follow their parents, so a reverse pass suffices.
+        subtree_masses = self.masses.copy()
+        moments = self.masses[:, np.newaxis] * segment_coms
+        for i in range(len(self.parents) - 1, 0, -1):
+            subtree_masses[self.parents[i]] += subtree_masses[i]
+            moments[:, self.parents[i]] += moments[:, i]
+        jacobian = np.zeros((len(positions), 3, len(self.CFGnames)))
+        for i, parent in enumerate(self.parents):
+            if parent >= 0:
+                axes[:, i] = np.matmul(rot_mats[:, parent], axes[:, i])
+            arm = (moments[:, i] - subtree_masses[i] * positions[:, i]) / \
+                    self.mass
+            for k, index in enumerate(self.joint_indices[i]):
+                if index >= 0:
+                    jacobian[:, :, index] = np.cross(axes[:, i, :, k], arm)
+        return jacobian
+
+    def point_positions(self, CFGs, segments, offsets, rot_mats=None,
+                        positions=None):
+        """Returns the global positions of points that are fixed in the
+        segments (e.g. joint centers or markers), for many configurations.
+        Only the kinematics are computed.
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+        segments : array_like of int, shape(P,)
+            Index of the segment of each point.
+        offsets : array_like, shape(P, 3)
+            Position of each point, in the frame of its segment from the
+            segment's origin.
+        rot_mats, positions : np.ndarray, optional
+            The output of :py:meth:`forward_kinematics` for `CFGs`, if it
+            has already been computed.
+
+        Returns
+        -------
+        points : np.ndarray, shape(N, P, 3)
+
+        """
+        if rot_mats is None or positions is None:
+            rot_mats, positions = self.forward_kinematics(CFGs)
+        segments = np.asarray(segments, dtype=int)
+        return positions[:, segments] + np.einsum(
+                'npij,pj->npi', rot_mats[:, segments],
+                np.asarray(offsets, dtype=float))
+
+    def joint_centers(self, CFGs):
+        """Returns the origin of each segment, which is at the joint with
+        its parent (e.g. the shoulder for A1, the knee for J2), for many
+        configurations; equal to Segment.pos.
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+
+        Returns
+        -------
+        points : np.ndarray, shape(N, 11, 3)
+
+        """
+        return self.forward_kinematics(CFGs)[1]
+
+    def end_points(self, CFGs, rot_mats=None, positions=None):
+        """Returns the end point of each segment (Segment.end_pos), for
+        many configurations.
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+        rot_mats, positions : np.ndarray, optional
+            The output of :py:meth:`forward_kinematics` for `CFGs`, if it
+            has already been computed.
+
+        Returns
+        -------
+        points : np.ndarray, shape(N, 11, 3)
+
+        """
+        return self.point_positions(CFGs, np.arange(len(self.names)),
+                                    self.end_offsets, rot_mats, positions)
+
+    def solid_points(self, CFGs, rot_mats=None, positions=None):
+        """Returns the origin and the end point of each solid (Solid.pos
+        and Solid.end_pos), for many configurations. For the solids of the
+        limbs, which are stacked away from the pelvis along -z, the end
+        point is the proximal end, at the level in the solid's label (e.g.
+        the wrist for 'a4: wrist joint centre').
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+        rot_mats, positions : np.ndarray, optional
+            The output of :py:meth:`forward_kinematics` for `CFGs`, if it
+            has already been computed.
+
+        Returns
+        -------
+        origins : np.ndarray, shape(N, 40, 3)
+            Origin of each solid, in the order of `solid_labels`.
+        ends : np.ndarray, shape(N, 40, 3)
+            End point of each solid.
+
+        """
+        if rot_mats is None or positions is None:
+            rot_mats, positions = self.forward_kinematics(CFGs)
+        points = self.point_positions(
+                CFGs, np.concatenate((self.solid_segments,
+                                      self.solid_segments)),
+                np.vstack((self.solid_offsets, self.solid_end_offsets)),
+                rot_mats, positions)
+        n_solids = len(self.solid_segments)
+        return points[:, :n_solids], points[:, n_solids:]
+
+    def mass_properties(self, CFGs, rot_mats=None, positions=None):
+        """Returns the center of mass and inertia tensor of the human for
+        many configurations.
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+        rot_mats, positions : np.ndarray, optional
+            The output of :py:meth:`forward_kinematics` for `CFGs`, if it
+            has already been computed.
+
+        Returns
+        -------
+        centers_of_mass : np.ndarray, shape(N, 3)
+            Center of mass of the human, in the global frame.
+        inertias : np.ndarray, shape(N, 3, 3)
+            Inertia tensor of the human about its center of mass, in the
+            global frame, equal to Human.inertia in each configuration.
+
+        Notes
+        -----
+        As in :py:meth:`yeadon.segment.Segment.calc_properties`, the inertia
+        of each segment is obtained from its relative inertia with
+        :py:func:`yeadon.inertia.rotate_inertia`, i.e. as R^T * I * R.
+
+        """
+        if rot_mats is None or positions is None:
+            rot_mats, positions = self.forward_kinematics(CFGs)
+        segment_coms = positions + np.einsum('nsij,sj->nsi', rot_mats,
+                                             self.rel_centers_of_mass)
+        centers_of_mass = np.einsum('s,nsi->ni', self.masses,
+                                    segment_coms) / self.mass
+        inertias = np.einsum('nsji,sjk,nskl->nil', rot_mats,
+                             self.rel_inertias, rot_mats)
+        # Parallel axis theorem: sum of m (|d|^2 I - d d^T).
+        d = segment_coms - centers_of_mass[:, np.newaxis]
+        inertias += (np.einsum('s,nsi,nsi->n', self.masses, d, d)
+                     [:, np.newaxis, np.newaxis] * np.eye(3) -
+                     np.einsum('s,nsi,nsj->nij', self.masses, d, d))
+        return centers_of_mass, inertias
+
+    def subtree_properties(self, CFGs, rot_mats=None, positions=None,
+                           about_joint=False):
+        """Returns the mass, center of mass, and inertia tensor of the
+        subtree of every segment (the segment and all segments distal to it,
+        e.g. the whole left arm for A1), for many configurations, in one
+        backward pass over the tree.
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+        rot_mats, positions : np.ndarray, optional
+            The output of :py:meth:`forward_kinematics` for `CFGs`, if it
+            has already been computed.
+        about_joint : bool, optional
+            If True, the inertia tensors are about the origin of the
+            subtree's root segment (its joint center, e.g. the shoulder for
+            A1) instead of about the subtree's center of mass.
+
+        Returns
+        -------
+        masses : np.ndarray, shape(11,)
+            Mass of each subtree.
+        centers_of_mass : np.ndarray, shape(N, 11, 3)
+            Center of mass of each subtree, in the global frame.
+        inertias : np.ndarray, shape(N, 11, 3, 3)
+            Inertia tensor of each subtree, in the global frame. The subtree
+            of the pelvis is the whole human, as in
+            :py:meth:`mass_properties`.
+
+        """
+        if rot_mats is None or positions is None:
+            rot_mats, positions = self.forward_kinematics(CFGs)
+        segment_coms = positions + np.einsum('nsij,sj->nsi', rot_mats,
+                                             self.rel_centers_of_mass)
+        # As in mass_properties, R^T * I * R about each segment's center of
+        # mass, then moved to the global origin, where the inertias of the
+        # segments of a subtree can simply be added.
+        inertias = np.matmul(np.matmul(np.swapaxes(rot_mats, 2, 3),
+                                       self.rel_inertias), rot_mats)
+        inertias += self._point_mass_inertia(self.masses, segment_coms)
+        masses = self.masses.copy()
+        moments = self.masses[:, np.newaxis] * segment_coms
+        # The children follow their parents, so one reverse pass suffices.
+        for i in range(len(self.parents) - 1, 0, -1):
+            parent = self.parents[i]
+            masses[parent] += masses[i]
+            moments[:, parent] += moments[:, i]
+            inertias[:, parent] += inertias[:, i]
+        centers_of_mass = moments / masses[:, np.newaxis]
+        inertias -= self._point_mass_inertia(masses, centers_of_mass)
+        if about_joint:
+            inertias += self._point_mass_inertia(masses,
+                                                 centers_of_mass - positions)
+        return masses, centers_of_mass, inertias
+
+    @staticmethod
+    def _point_mass_inertia(masses, points):
+        """Returns the inertia tensors of point masses about the origin,
+        m (|r|^2 I - r r^T), for masses of shape(S,) and points of shape(N,
+        S, 3)."""
+        return (masses[:, np.newaxis, np.newaxis] *
+                (np.einsum('nsi,nsi->ns', points, points)
+                 [..., np.newaxis, np.newaxis] * np.eye(3) -
+                 points[..., np.newaxis] * points[..., np.newaxis, :]))
+
+
+class Combination(object):
+    """A combination of solids and/or segments of a human (see
+    :py:meth:`yeadon.Human.combine_inertia`), validated once, whose inertia
+    properties are evaluated with vectorized reductions, in the current
+    configuration of the human or in many configurations. Create it with
+    :py:meth:`yeadon.Human.compile_combination`.
+
+    Like :py:class:`SegmentTree`, a combination is a snapshot of the
+    measurements and densities of the human; it must be compiled again if
+    they change.
+
+    Attributes
+    ----------
+    objlist : tuple of str
+        The solids and segments of the combination.
+    segments : np.ndarray of int, shape(K,)
+        Index of the segment of each object (for a segment, its own index).
+    masses : np.ndarray, shape(K,)
+        Mass of each object.
+    mass : float
+        Mass of the combination.
+    rel_centers_of_mass : np.ndarray, shape(K, 3)
+        Center of mass of each object, in the frame of its segment from the
+        segment's origin.
+    rel_inertias : np.ndarray, shape(K, 3, 3)
+        Inertia tensor of each object about its center of mass, in the frame
+        of its segment.
+
+    """
+
+    def __init__(self, human, objlist):
+        """Validates and compiles a combination.
+
+        Parameters
+        ----------
+        human : :py:class:`yeadon.Human`
+        objlist : tuple of str
+            See :py:meth:`yeadon.Human.combine_inertia`.
+
+        """
+        human._check_combination(objlist)
+        self.human = human
+        self.tree = SegmentTree(human)
+        self.objlist = tuple(objlist)
+        segment_keys = list(human.segment_keys)
+        self.segments = np.array([
+            segment_keys.index(human._solid_parents.get(key, key))
+            for key in self.objlist])
+        objects = [human._objects[key] for key in self.objlist]
+        self.masses = np.array([obj.mass for obj in objects])
+        self.mass = self.masses.sum()
+        self.rel_centers_of_mass = np.array([
+            np.dot(np.asarray(human.segments[i].rot_mat).T,
+                   np.ravel(obj.center_of_mass) -
+                   np.ravel(human.segments[i].pos))
+            for i, obj in zip(self.segments, objects)])
+        # The frame of a solid is the frame of its segment.
+        self.rel_inertias = np.array([np.asarray(obj.rel_inertia)
+                                      for obj in objects])
+
+    def _reduce(self, rot_mats, positions):
+        """Returns the center of mass and inertia of the combination for
+        the given orientations and positions of the segment of each object,
+        shape(N, K, 3, 3) and shape(N, K, 3)."""
+        centers = positions + np.einsum(
+                'nkij,kj->nki', rot_mats, self.rel_centers_of_mass)
+        center_of_mass = np.einsum('k,nki->ni', self.masses,
+                                   centers) / self.mass
+        # As in yeadon.inertia.rotate_inertia: R^T * I * R.
+        inertias = np.matmul(np.matmul(np.swapaxes(rot_mats, 2, 3),
+                                       self.rel_inertias),
+                             rot_mats).sum(axis=1)
+        # Parallel axis theorem: sum of m (|d|^2 I - d d^T).
+        d = centers - center_of_mass[:, np.newaxis]
+        inertias += (np.einsum('k,nki,nki->n', self.masses, d, d)
+                     [:, np.newaxis, np.newaxis] * np.eye(3) -
+                     np.einsum('k,nki,nkj->nij', self.masses, d, d))
+        return center_of_mass, inertias
+
+    def evaluate(self):
+        """Returns the inertia properties of the combination in the current
+        configuration of the human, like
+        :py:meth:`yeadon.Human.combine_inertia`.
+
+        Returns
+        -------
+        combined_mass : float
+        combined_COM : np.array (3,1)
+        combined_inertia : np.matrix (3,3)
+
+        """
+        segments = [self.human.segments[i] for i in self.segments]
+        rot_mats = np.array([np.asarray(s.rot_mat) for s in segments])
+        positions = np.array([np.ravel(s.pos) for s in segments])
+        center_of_mass, inertias = self._reduce(rot_mats[np.newaxis],
+                                                positions[np.newaxis])
+        return (self.mass, center_of_mass.reshape((3, 1)),
+                np.asmatrix(inertias[0]))
+
+    def evaluate_batch(self, CFGs):
+        """Returns the inertia properties of the combination in many
+        configurations. The human itself is not modified.
+
+        Parameters
+        ----------
+        CFGs : array_like, shape(N, 21)
+            Joint angles, with columns in the order of Human.CFGnames.
+
+        Returns
+        -------
+        combined_mass : float
+        centers_of_mass : np.ndarray, shape(N, 3)
+        inertias : np.ndarray, shape(N, 3, 3)
+            Inertia tensor about the center of mass of the combination, in
+            the global frame.
+
+        """
+        rot_mats, positions = self.tree.forward_kinematics(CFGs)
+        center_of_mass, inertias = self._reduce(rot_mats[:, self.segments],
+                                                positions[:, self.segments])
+        return self.mass, center_of_mass, inertias
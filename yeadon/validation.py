@@ -0,0 +1,188 @@
+"""The validation module checks the measurements of many subjects at once.
+Instead of stopping at the first problem, as reading a measurement input file
+does, it runs every check on every subject and returns a report of all the
+problems that were found.
+
+"""
+# Use Python3 integer division rules.
+from __future__ import division
+
+import numpy as np
+
+from .human import Human
+
+# Stadia defined by a perimeter and a width (or, at the heels, a depth). For
+# the stadium to be valid, 2 < perimeter / width <= pi, see
+# yeadon.solid.Stadium.
+_perimwidth_stadia = (
+        ('Ls0p', 'Ls0w'), ('Ls1p', 'Ls1w'), ('Ls2p', 'Ls2w'), ('Ls3p', 'Ls3w'),
+        ('La4p', 'La4w'), ('La5p', 'La5w'), ('La6p', 'La6w'), ('La7p', 'La7w'),
+        ('Lb4p', 'Lb4w'), ('Lb5p', 'Lb5w'), ('Lb6p', 'Lb6w'), ('Lb7p', 'Lb7w'),
+        ('Lj6p', 'Lj6d'), ('Lj8p', 'Lj8w'), ('Lj9p', 'Lj9w'),
+        ('Lk6p', 'Lk6d'), ('Lk8p', 'Lk8w'), ('Lk9p', 'Lk9w'))
+
+# Stadia defined by a depth and a width. For the stadium to be valid,
+# 0 < depth / width <= 1.
+_depthwidth_stadia = (('Ls4d', 'Ls4w'),)
+
+# Lengths that are measured from the same origin, in increasing order. The
+# difference between consecutive lengths is the height of a solid, which must
+# be positive.
+_length_chains = (
+        ('Ls1L', 'Ls2L', 'Ls3L', 'Ls4L', 'Ls5L'),
+        ('Ls6L', 'Ls7L', 'Ls8L'),
+        ('La2L', 'La3L', 'La4L'), ('La5L', 'La6L', 'La7L'),
+        ('Lb2L', 'Lb3L', 'Lb4L'), ('Lb5L', 'Lb6L', 'Lb7L'),
+        ('Lj1L', 'Lj3L', 'Lj4L', 'Lj5L'), ('Lj6L', 'Lj8L', 'Lj9L'),
+        ('Lk1L', 'Lk3L', 'Lk4L', 'Lk5L'), ('Lk6L', 'Lk8L', 'Lk9L'))
+
+
+class ValidationReport(object):
+    """The problems found by :py:func:`validate_measurements`.
+
+    Attributes
+    ----------
+    issues : np.ndarray
+        Structured array with one record per problem and the fields:
+
+        * 'subject': index of the subject (row of the measurement matrix).
+        * 'check': 'missing', 'nonpositive', 'stadium', 'length-chain', or
+          'asymmetry'.
+        * 'names': the measurement(s) involved, e.g. 'Ls0p/Ls0w'.
+        * 'value': the offending value: the measurement, the perimeter/width
+          (or depth/width) ratio, the difference between the two lengths, or
+          the relative left/right difference, respectively.
+
+    subject_ids : np.ndarray of str
+        Identifier of each subject.
+
+    """
+    dtype = [('subject', int), ('check', 'U12'), ('names', 'U9'),
+             ('value', float)]
+
+    def __init__(self, issues, subject_ids):
+        self.issues = issues
+        self.subject_ids = np.asarray(subject_ids, dtype=str)
+
+    def __len__(self):
+        return len(self.issues)
+
+    def __str__(self):
+        if len(self.issues) == 0:
+            return "No problems found in {0} subjects.".format(
+                    len(self.subject_ids))
+        lines = ["{0} problems found in {1} of {2} subjects:".format(
+                 len(self.issues), np.sum(~self.valid),
+                 len(self.subject_ids))]
+        for issue in self.issues:
+            lines.append("{0}: {1} {2} = {3:g}".format(
+                self.subject_ids[issue['subject']], issue['check'],
+                issue['names'], issue['value']))
+        return '\n'.join(lines)
+
+    @property
+    def valid(self):
+        """Whether each subject passed all checks, a bool np.ndarray of
+        shape (S,)."""
+        valid = np.ones(len(self.subject_ids), dtype=bool)
+        valid[self.issues['subject']] = False
+        return valid
+
+    def for_subject(self, i):
+        """Returns the problems of one subject, as a structured array.
+
+        Parameters
+        ----------
+        i : int
+            Index of the subject.
+
+        """
+        return self.issues[self.issues['subject'] == i]
+
+
+def validate_measurements(meas, subject_ids=None, asymmetry_tolerance=0.2):
+    """Checks the measurements of many subjects in one pass. The checks
+    are:
+
+    * missing: the measurement is NaN or infinite.
+    * nonpositive: the measurement is zero or negative.
+    * stadium: the perimeter and width of a stadium do not satisfy
+      2 < perimeter / width <= pi (or, for Ls4, 0 < depth <= width). Such
+      stadia are replaced by circles when a :py:class:`yeadon.Human` is
+      constructed.
+    * length-chain: a length is not larger than the previous length measured
+      from the same origin (e.g. Ls2L <= Ls1L), which would give a solid a
+      non-positive height.
+    * asymmetry: the relative difference between a measurement of a left
+      limb and of the corresponding right limb, abs(left - right) / mean,
+      exceeds `asymmetry_tolerance`.
+
+    Parameters
+    ----------
+    meas : array_like, shape(S, 95)
+        Measurements of S subjects, in any unit, with columns in the order
+        of :py:attr:`yeadon.Human.measnames`.
+    subject_ids : sequence of str, optional
+        Identifier of each subject, used when printing the report. By
+        default, the row indices.
+    asymmetry_tolerance : float, optional
+        Largest acceptable relative difference between left and right limbs.
+
+    Returns
+    -------
+    report : :py:class:`ValidationReport`
+
+    """
+    meas = np.asarray(meas, dtype=float)
+    if meas.ndim != 2 or meas.shape[1] != len(Human.measnames):
+        raise ValueError("Measurements must have shape (S, {0}), not "
+                "{1}.".format(len(Human.measnames), meas.shape))
+    if subject_ids is None:
+        subject_ids = [str(i) for i in range(len(meas))]
+    column = dict((name, i) for i, name in enumerate(Human.measnames))
+    issues = []
+
+    def flag(check, names, values, bad):
+        # bad has shape (S, len(names)).
+        subjects, which = np.nonzero(bad)
+        records = np.empty(len(subjects), dtype=ValidationReport.dtype)
+        records['subject'] = subjects
+        records['check'] = check
+        records['names'] = np.asarray(names)[which]
+        records['value'] = values[subjects, which]
+        issues.append(records)
+
+    names = np.asarray(Human.measnames)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        missing = ~np.isfinite(meas)
+        flag('missing', names, meas, missing)
+        flag('nonpositive', names, meas, ~missing & (meas <= 0))
+
+        def columns(pairs, i):
+            return meas[:, [column[pair[i]] for pair in pairs]]
+
+        ratio = columns(_perimwidth_stadia, 0) / columns(_perimwidth_stadia, 1)
+        flag('stadium', ['/'.join(pair) for pair in _perimwidth_stadia],
+             ratio, (ratio <= 2.0) | (ratio > np.pi))
+        ratio = (columns(_depthwidth_stadia, 0) /
+                 columns(_depthwidth_stadia, 1))
+        flag('stadium', ['/'.join(pair) for pair in _depthwidth_stadia],
+             ratio, (ratio <= 0.0) | (ratio > 1.0))
+
+        pairs = [(chain[i], chain[i + 1]) for chain in _length_chains
+                 for i in range(len(chain) - 1)]
+        difference = columns(pairs, 1) - columns(pairs, 0)
+        flag('length-chain', ['<'.join(pair) for pair in pairs],
+             difference, difference <= 0.0)
+
+        left = meas[:, Human._left_limb_indices]
+        right = meas[:, Human._right_limb_indices]
+        asymmetry = np.abs(left - right) / (0.5 * (left + right))
+        flag('asymmetry', ['{0}/{1}'.format(names[i], names[j]) for i, j in
+                           zip(Human._left_limb_indices,
+                               Human._right_limb_indices)],
+             asymmetry, asymmetry > asymmetry_tolerance)
+
+    issues = np.concatenate(issues)
+    issues = issues[np.argsort(issues['subject'], kind='mergesort')]
+    return ValidationReport(issues, subject_ids)